@@ -1,7 +1,7 @@
 import os
 import sys
 import base64
-from datetime import datetime
+import threading
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
@@ -11,8 +11,25 @@ from utils.learning_agent import (
     handle_screenshot_event,
     user_state,
     generate_and_send_popup_message,
+    task_agents,
+    screener_agents,
 )
 from utils.database_context import db_context
+from utils.frame_dedup import frame_deduplicator, frame_fingerprint
+from utils.verdict_cache import verdict_cache
+from utils.image_prep import image_preparer
+from utils.frame_coordinator import frame_coordinator, SUPERSEDED
+from utils.analysis_jobs import analysis_jobs
+from utils.capture_pacing import capture_pacer
+from utils.popup_dispatcher import popup_dispatcher, SocketIOPopupEmitter
+from utils.lesson_cache import lesson_cache
+from utils.lesson_repository import lesson_repository
+from utils.lesson_warmup import lesson_warmup
+from utils.lesson_replica import create_lesson_replica
+from utils.progress_writer import progress_writer
+from utils.agent_context import agent_context
+from utils.completion_context import completion_context
+from utils.completion_router import completion_router
 
 # Add the backend directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -21,7 +38,24 @@ app = Flask(__name__)
 CORS(app)  # Allow React to make requests
 
 # Initialize SocketIO
-socketio = SocketIO(app, cors_allowed_origins="*")
+# With more than one worker process, set SOCKETIO_MESSAGE_QUEUE (e.g. redis://localhost:6379/0)
+# so that rooms and emits are shared: a popup emitted on one worker reaches a client on another
+socketio = SocketIO(app, cors_allowed_origins="*", message_queue=os.getenv("SOCKETIO_MESSAGE_QUEUE"))
+
+# Deliver popups from the learning agent directly on this server instead of looping back over HTTP
+popup_dispatcher.set_emitter(SocketIOPopupEmitter(socketio))
+
+# Serve lesson/step reads from a local SQLite mirror when LESSON_REPLICA_PATH is set
+lesson_replica = create_lesson_replica()
+if lesson_replica is not None:
+    lesson_replica.start()
+
+# Rebuild sessions from unflushed progress and persist step advances in the background
+# (no-op unless PROGRESS_WRITER_ENABLED)
+progress_writer.start(user_state)
+
+# Preload every lesson into the cache (no-op unless LESSON_WARMUP_ENABLED); see /ready
+lesson_warmup.start()
 
 # Import routes
 from routes import api_routes
@@ -35,54 +69,45 @@ app.register_blueprint(test_db_bp, url_prefix="/api")
 app.register_blueprint(lesson_plans_bp, url_prefix='/api')
 app.register_blueprint(media_bp, url_prefix='/api')
 
-@app.route('/screenshot', methods=['POST'])
-def screenshot():
-    try:
-        # Get the request data
-        data = request.get_json()
+# Resolve the Letta agents off the import path; /ready reports when they are available
+task_agents.warm()
+if completion_router.enabled:
+    screener_agents.warm()
 
-        if not data or 'image' not in data:
-            return jsonify({
-                "message": "No image data provided",
-                "status": "error"
-            }), 400
+# Upper bound for a single screenshot body on the binary ingest route
+MAX_SCREENSHOT_BYTES = int(os.getenv("MAX_SCREENSHOT_BYTES", str(32 * 1024 * 1024)))
 
-        # Extract the base64 image data from the request
-        base64_image = data['image']
+# Metadata field -> header used by the binary ingest route (form fields use the field name)
+SCREENSHOT_METADATA_HEADERS = {
+    "user_id": "X-User-Id",
+    "lesson_id": "X-Lesson-Id",
+    "step_order": "X-Step-Order",
+    "stateless": "X-Stateless",
+    "finish_criteria": "X-Finish-Criteria",
+    "async": "X-Async",
+}
 
-        # Optional: Log metadata if provided
-        if 'metadata' in data:
-            print(f"Screenshot metadata: {data['metadata']}")
 
-        # Determine finish_criteria and lesson_id if provided
-        finish_criteria = data.get('finish_criteria')
-        lesson_id = data.get('lesson_id')
-        step_order = data.get('step_order')
-        user_id = data.get('user_id')
-
-        # If lesson_id and step_order provided but no explicit finish_criteria, derive via batched fetch
-        if (not finish_criteria) and (lesson_id is not None) and (step_order is not None):
-            try:
-                lesson_id_int = int(lesson_id)
-                step_order_int = int(step_order)
-                lesson_data = db_context.get_lesson_steps_batch(lesson_id_int)
-                if step_order_int in lesson_data:
-                    finish_criteria = lesson_data[step_order_int].get('finish_criteria') or ""
-                else:
-                    finish_criteria = ""
-            except Exception as derive_err:
-                print(f"Warning: failed to derive finish_criteria from lesson data: {derive_err}")
-                finish_criteria = ""
+def _is_truthy(value):
+    return str(value or "").lower() in ("1", "true", "yes")
 
-    except Exception as e:
-        return jsonify({
-            "message": f"Error processing request: {str(e)}",
-            "status": "error"
-        }), 400
 
-    # Decide flow: default to progression-aware handler. If explicitly stateless, skip progression.
-    stateless = bool(data.get('stateless', False))
+def _session_position(user_id):
+    """(lesson_id, step_order) the user's session is on right now, read when a frame arrives."""
+    existing = user_state.get(str(user_id or os.getenv("DEFAULT_USER_ID", "default-user"))) or {}
+    return existing.get("lesson_id"), existing.get("step_order")
+
 
+def _process_screenshot(image, user_id=None, lesson_id=None, step_order=None, finish_criteria=None, stateless=False, state_at_arrival=None):
+    """
+    Shared screenshot handling for the JSON and binary ingest routes.
+
+    `image` is either a base64 string (JSON route) or raw image bytes (binary route).
+    `state_at_arrival` is the session position when the frame arrived (see _session_position);
+    queued callers must capture it before submitting, inline callers may leave it None.
+    Returns a (payload, status_code) tuple for the caller to jsonify.
+    """
+    # Decide flow: default to progression-aware handler. If explicitly stateless, skip progression.
     if not stateless:
         # Resolve identifiers from data, then from current user_state, then from defaults
         resolved_user_id = str(user_id or os.getenv("DEFAULT_USER_ID", "default-user"))
@@ -100,38 +125,221 @@ def screenshot():
             resolved_lesson_id = int(os.getenv("DEFAULT_LESSON_ID", "1"))
             resolved_step_order = 1
 
+        if state_at_arrival is None:
+            state_at_arrival = _session_position(resolved_user_id)
+
+        def analyze_latest():
+            # A frame that waited behind another analysis may carry a step the user has
+            # already moved past; evaluate it against the current step instead of rewinding
+            current = user_state.get(resolved_user_id) or {}
+            lesson, step = resolved_lesson_id, resolved_step_order
+            if current and (current.get("lesson_id"), current.get("step_order")) != state_at_arrival:
+                lesson, step = current["lesson_id"], current["step_order"]
+            return handle_screenshot_event(resolved_user_id, int(lesson), int(step), image)
+
         try:
-            progression_result = handle_screenshot_event(
-                resolved_user_id,
-                int(resolved_lesson_id),
-                int(resolved_step_order),
-                base64_image,
-            )
-            return jsonify({
+            # At most one analysis per user; newer frames replace queued older ones
+            progression_result = frame_coordinator.run(resolved_user_id, analyze_latest)
+            if progression_result is SUPERSEDED:
+                return {
+                    "status": "superseded",
+                    "completed": False,
+                    "next_capture_after_ms": capture_pacer.next_capture_after_ms(resolved_user_id)
+                }, 200
+            return {
                 "status": "success",
                 **progression_result
-            })
+            }, 200
         except Exception as event_err:
-            return jsonify({
+            return {
                 "message": f"Event handling failed: {str(event_err)}",
                 "status": "error"
-            }), 500
+            }, 500
+
+    # If lesson_id and step_order provided but no explicit finish_criteria, derive via batched fetch
+    if (not finish_criteria) and (lesson_id is not None) and (step_order is not None):
+        try:
+            lesson_id_int = int(lesson_id)
+            step_order_int = int(step_order)
+            step = lesson_repository.get_step(lesson_id_int, step_order_int)
+            finish_criteria = (step or {}).get('finish_criteria') or ""
+        except Exception as derive_err:
+            print(f"Warning: failed to derive finish_criteria from lesson data: {derive_err}")
+            finish_criteria = ""
 
     # Stateless analysis path: compute completion and return
     try:
-        analysis = analyze_screenshot(base64_image, finish_criteria or "", lesson_id)
+        # Reuse the previous verdict when the screen has not changed for these criteria
+        dedup_user_id = str(user_id or os.getenv("DEFAULT_USER_ID", "default-user"))
+        scope = ("stateless", finish_criteria or "")
+        fingerprint = frame_fingerprint(image)
+        analysis = frame_deduplicator.previous_verdict(dedup_user_id, scope, fingerprint)
+        skipped = {"skipped": "unchanged"} if analysis is not None else {}
+        capture_pacer.record_frame(dedup_user_id, changed=analysis is None)
+        if analysis is None:
+            analysis = frame_coordinator.run(
+                dedup_user_id,
+                lambda: analyze_screenshot(image, finish_criteria or "", lesson_id, dedup_user_id),
+            )
+            if analysis is SUPERSEDED:
+                return {
+                    "status": "superseded",
+                    "completed": False,
+                    "next_capture_after_ms": capture_pacer.next_capture_after_ms(dedup_user_id)
+                }, 200
+            frame_deduplicator.remember(dedup_user_id, scope, fingerprint, analysis)
         completed = str(analysis).strip().upper() == "YES"
-        return jsonify({
+        return {
             "message": "Screenshot analyzed successfully",
             "status": "success",
             "analysis": analysis,
-            "completed": completed
-        })
+            "completed": completed,
+            "next_capture_after_ms": capture_pacer.next_capture_after_ms(dedup_user_id),
+            **skipped
+        }, 200
     except Exception as analyze_err:
-        return jsonify({
+        return {
             "message": f"Analysis failed: {str(analyze_err)}",
             "status": "error"
-        }), 500
+        }, 500
+
+
+def _respond_to_screenshot(image, run_async=False, **params):
+    """
+    Run the screenshot pipeline inline, or queue it and return 202 with a job id.
+
+    In async mode the verdict is emitted as `screenshot_verdict` to the user's
+    Socket.IO room (joined via `join_user_room`) once analysis finishes.
+    """
+    if not run_async:
+        payload, status_code = _process_screenshot(image, **params)
+        return jsonify(payload), status_code
+
+    room = str(params.get("user_id") or os.getenv("DEFAULT_USER_ID", "default-user"))
+    # Captured now: the job may start long after the frame arrived
+    params["state_at_arrival"] = _session_position(room)
+
+    def work():
+        payload, _ = _process_screenshot(image, **params)
+        return payload
+
+    def deliver(job_id, payload):
+        socketio.emit('screenshot_verdict', {"job_id": job_id, **payload}, room=room)
+
+    job_id = analysis_jobs.submit(work, deliver)
+    if job_id is None:
+        return jsonify({
+            "message": "Analysis queue is full, retry later",
+            "status": "error"
+        }), 503
+    return jsonify({
+        "status": "accepted",
+        "job_id": job_id,
+        "user_id": room
+    }), 202
+
+
+@app.route('/screenshot', methods=['POST'])
+def screenshot():
+    try:
+        # Get the request data
+        data = request.get_json()
+
+        if not data or 'image' not in data:
+            return jsonify({
+                "message": "No image data provided",
+                "status": "error"
+            }), 400
+
+        # Optional: Log metadata if provided
+        if 'metadata' in data:
+            print(f"Screenshot metadata: {data['metadata']}")
+    except Exception as e:
+        return jsonify({
+            "message": f"Error processing request: {str(e)}",
+            "status": "error"
+        }), 400
+
+    return _respond_to_screenshot(
+        data['image'],
+        run_async=bool(data.get('async', False)),
+        user_id=data.get('user_id'),
+        lesson_id=data.get('lesson_id'),
+        step_order=data.get('step_order'),
+        finish_criteria=data.get('finish_criteria'),
+        stateless=bool(data.get('stateless', False)),
+    )
+
+
+def _read_bounded(stream, limit, chunk_size=256 * 1024):
+    """Read a stream into memory, returning None as soon as it exceeds `limit` bytes."""
+    buf = bytearray()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return bytes(buf)
+        buf += chunk
+        if len(buf) > limit:
+            return None
+
+
+@app.route('/screenshot/raw', methods=['POST'])
+def screenshot_raw():
+    """
+    Binary screenshot ingest: same behaviour as /screenshot without base64-in-JSON.
+
+    Accepts either
+      - a raw image body (Content-Type: image/png, image/jpeg, application/octet-stream)
+        with metadata in X-User-Id, X-Lesson-Id, X-Step-Order, X-Stateless,
+        X-Finish-Criteria and X-Async headers, or
+      - multipart/form-data with an `image` file part and metadata as form fields
+        (user_id, lesson_id, step_order, stateless, finish_criteria, async).
+    """
+    if request.content_length is not None and request.content_length > MAX_SCREENSHOT_BYTES:
+        return jsonify({
+            "message": f"Screenshot exceeds {MAX_SCREENSHOT_BYTES} bytes",
+            "status": "error"
+        }), 413
+
+    try:
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('image')
+            if upload is None:
+                return jsonify({
+                    "message": "No image file provided",
+                    "status": "error"
+                }), 400
+            image_bytes = _read_bounded(upload.stream, MAX_SCREENSHOT_BYTES)
+            metadata = {name: request.form.get(name) for name in SCREENSHOT_METADATA_HEADERS}
+        else:
+            image_bytes = _read_bounded(request.stream, MAX_SCREENSHOT_BYTES)
+            metadata = {name: request.headers.get(header) for name, header in SCREENSHOT_METADATA_HEADERS.items()}
+    except Exception as e:
+        return jsonify({
+            "message": f"Error processing request: {str(e)}",
+            "status": "error"
+        }), 400
+
+    if image_bytes is None:
+        return jsonify({
+            "message": f"Screenshot exceeds {MAX_SCREENSHOT_BYTES} bytes",
+            "status": "error"
+        }), 413
+    if not image_bytes:
+        return jsonify({
+            "message": "No image data provided",
+            "status": "error"
+        }), 400
+
+    return _respond_to_screenshot(
+        image_bytes,
+        run_async=_is_truthy(metadata["async"]),
+        user_id=metadata["user_id"],
+        lesson_id=metadata["lesson_id"],
+        step_order=metadata["step_order"],
+        finish_criteria=metadata["finish_criteria"],
+        stateless=_is_truthy(metadata["stateless"]),
+    )
 
 @app.route('/')
 def index():
@@ -148,6 +356,73 @@ def health():
         "service": "calhacks2025-backend"
     })
 
+@app.route('/ready')
+def ready():
+    """Readiness probe: 503 until the lesson warm-up has finished and a task-completion agent is available."""
+    warmup = lesson_warmup.stats()
+    pool = task_agents.status()
+    if any(not agent["available"] and agent["error"] for agent in pool["agents"]):
+        # Retry in the background so the worker recovers once Letta is reachable again
+        task_agents.warm()
+    is_ready = warmup["ready"] and pool["available"] > 0
+    return jsonify({
+        "status": "ready" if is_ready else "warming_up",
+        "lesson_warmup": warmup,
+        "agents": {"task_completion": pool}
+    }), 200 if is_ready else 503
+
+@app.route('/api/stats')
+def pipeline_stats():
+    return jsonify({
+        "status": "success",
+        "verdict_cache": verdict_cache.stats(),
+        "frames_skipped_unchanged": frame_deduplicator.skipped,
+        "image_prep": image_preparer.stats(),
+        "analysis_jobs": analysis_jobs.stats(),
+        "capture_pacing": capture_pacer.stats(),
+        "lesson_cache": lesson_cache.stats(),
+        "lesson_repository": lesson_repository.stats(),
+        "completion_context": completion_context.stats(),
+        "agent_pool": task_agents.stats(),
+        "screener_pool": screener_agents.stats() if completion_router.enabled else None,
+        "completion_router": completion_router.stats(),
+        "lesson_warmup": lesson_warmup.stats(),
+        "progress_writer": progress_writer.stats(),
+        "agent_context": agent_context.stats(),
+        "lesson_replica": lesson_replica.stats() if lesson_replica is not None else None
+    })
+
+@app.route('/api/lesson-cache', methods=['GET'])
+def lesson_cache_info():
+    """Introspect this worker's lesson cache: limits, counters and per-lesson entries."""
+    return jsonify({
+        "status": "success",
+        "stats": lesson_cache.stats(),
+        "repository": lesson_repository.stats(),
+        "entries": lesson_cache.describe()
+    })
+
+@app.route('/api/lesson-cache/invalidate', methods=['POST'])
+def invalidate_lesson_cache():
+    """Drop one lesson ({"lesson_id": 3}) or, with no lesson_id, every cached lesson and the lesson_order index."""
+    data = request.get_json(silent=True) or {}
+    lesson_id = data.get('lesson_id')
+    if lesson_id is not None:
+        try:
+            lesson_id = int(lesson_id)
+        except (TypeError, ValueError):
+            return jsonify({
+                "status": "error",
+                "message": "lesson_id must be an integer"
+            }), 400
+    lesson_cache.invalidate(lesson_id)
+    if lesson_id is None:
+        db_context.forget_lesson_orders()
+    return jsonify({
+        "status": "success",
+        "invalidated": lesson_id if lesson_id is not None else "all"
+    })
+
 ## Removed consolidated event endpoint; use /screenshot only
 
 # Explicit start endpoint to trigger popup and set state before first screenshot
@@ -171,7 +446,7 @@ def start_step():
         step_order = int(step_order)
 
         # Load lesson data and send popup for current step
-        lesson_data = db_context.get_lesson_steps_batch(lesson_id)
+        lesson_data = lesson_repository.get_steps(lesson_id)
         if step_order not in lesson_data:
             return jsonify({
                 "status": "error",
@@ -182,10 +457,7 @@ def start_step():
         generate_and_send_popup_message("", step_description, resolved_user_id)
 
         # Update state to indicate popup already sent for this step
-        state = user_state.setdefault(resolved_user_id, {"lesson_id": lesson_id, "step_order": step_order, "popup_sent_for_step": True})
-        state["lesson_id"] = lesson_id
-        state["step_order"] = step_order
-        state["popup_sent_for_step"] = True
+        user_state.update(resolved_user_id, lesson_id=lesson_id, step_order=step_order, popup_sent_for_step=True)
 
         return jsonify({
             "status": "success",
@@ -223,29 +495,13 @@ def send_popup():
                 "status": "error"
             }), 400
         
-        # Extract popup data
-        popup_message = data['message']
-        popup_type = data.get('type', 'popup')
-        user_id = data.get('user_id')
-        timestamp = data.get('timestamp', datetime.now().isoformat())
-        
-        # Prepare the popup data to send
-        popup_data = {
-            "message": popup_message,
-            "type": popup_type,
-            "timestamp": timestamp,
-            "user_id": user_id
-        }
-        
-        # Send popup to all connected clients or specific user
-        if user_id:
-            # Send to specific user (if user rooms are implemented)
-            socketio.emit('popup_message', popup_data, room=user_id)
-            print(f"Popup sent to user {user_id}: {popup_message[:50]}...")
-        else:
-            # Send to all connected clients
-            socketio.emit('popup_message', popup_data)
-            print(f"Popup broadcasted to all clients: {popup_message[:50]}...")
+        popup_data = popup_dispatcher.send(
+            data['message'],
+            user_id=data.get('user_id'),
+            popup_type=data.get('type', 'popup'),
+            timestamp=data.get('timestamp'),
+        )
+        popup_data.pop("delivered", None)
         
         return jsonify({
             "message": "Popup sent successfully",
@@ -269,6 +525,8 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
+    with _frames_in_flight_lock:
+        _frames_in_flight.pop(request.sid, None)
     print(f"Client disconnected: {request.sid}")
 
 @socketio.on('join_user_room')
@@ -280,6 +538,80 @@ def handle_join_user_room(data):
         print(f"User {user_id} joined room")
         emit('status', {'message': f'Joined room for user {user_id}'})
 
+# Per-connection flow control for the screenshot_frame channel: { sid: frames being analyzed }
+SOCKET_MAX_FRAMES_IN_FLIGHT = int(os.getenv("SOCKET_MAX_FRAMES_IN_FLIGHT", "2"))
+SOCKET_SLOW_DOWN_MS = int(os.getenv("SOCKET_SLOW_DOWN_MS", "2000"))
+_frames_in_flight = {}
+_frames_in_flight_lock = threading.Lock()
+
+
+def _release_frame_slot(sid):
+    with _frames_in_flight_lock:
+        if _frames_in_flight.get(sid, 0) > 0:
+            _frames_in_flight[sid] -= 1
+
+
+@socketio.on('screenshot_frame')
+def handle_screenshot_frame(data):
+    """
+    Socket.IO equivalent of /screenshot for clients that already hold a connection.
+
+    Expected payload:
+    {
+        "image": <binary image bytes or base64 string>,
+        "user_id": "...", "lesson_id": 1, "step_order": 1,
+        "stateless": false, "finish_criteria": "optional", "frame_id": "optional client id"
+    }
+
+    The verdict comes back on the same socket as `screenshot_verdict`. If this connection
+    already has too many frames in analysis, or the worker pool is full, the frame is dropped
+    and a `slow_down` event tells the client how long to back off.
+    """
+    sid = request.sid
+    data = data if isinstance(data, dict) else {}
+    frame_id = data.get('frame_id')
+    image = data.get('image')
+    if not image:
+        emit('screenshot_verdict', {"frame_id": frame_id, "status": "error", "message": "No image data provided"})
+        return {"status": "error"}
+
+    user_id = data.get('user_id')
+    if user_id:
+        # Popups for this user are emitted to their room; make sure this socket receives them
+        join_room(str(user_id))
+
+    with _frames_in_flight_lock:
+        in_flight = _frames_in_flight.get(sid, 0)
+        if in_flight >= SOCKET_MAX_FRAMES_IN_FLIGHT:
+            emit('slow_down', {"frame_id": frame_id, "retry_after_ms": SOCKET_SLOW_DOWN_MS, "reason": "connection_busy"})
+            return {"status": "dropped"}
+        _frames_in_flight[sid] = in_flight + 1
+
+    params = {
+        "user_id": user_id,
+        "lesson_id": data.get('lesson_id'),
+        "step_order": data.get('step_order'),
+        "finish_criteria": data.get('finish_criteria'),
+        "stateless": bool(data.get('stateless', False)),
+        # Captured now: the job may start long after the frame arrived
+        "state_at_arrival": _session_position(user_id),
+    }
+
+    def work():
+        payload, _ = _process_screenshot(bytes(image) if isinstance(image, (bytes, bytearray)) else image, **params)
+        return payload
+
+    def deliver(job_id, payload):
+        _release_frame_slot(sid)
+        socketio.emit('screenshot_verdict', {"frame_id": frame_id, "job_id": job_id, **payload}, room=sid)
+
+    job_id = analysis_jobs.submit(work, deliver)
+    if job_id is None:
+        _release_frame_slot(sid)
+        emit('slow_down', {"frame_id": frame_id, "retry_after_ms": SOCKET_SLOW_DOWN_MS, "reason": "server_busy"})
+        return {"status": "dropped"}
+    return {"status": "accepted", "job_id": job_id}
+
 if __name__ == '__main__':
     print("Starting Flask backend with WebSocket support...")
     print("Backend will be available at: http://localhost:5000")
@@ -8,6 +8,8 @@ from flask import Blueprint, jsonify, request
 from lesson_generator import generate_full_course
 from tools.bright_data_tool import scrape_to_txt
 from upload_to_supabase_simple import upload_course_to_supabase
+from utils.database_context import db_context
+from utils.lesson_cache import lesson_cache
 
 load_dotenv()
 
@@ -123,6 +125,10 @@ def generateLessonPlan():
 
         print(f"🎉 Successfully uploaded course to Supabase!")
 
+        # The course was regenerated; drop every cached lesson so steps are reloaded on next use
+        lesson_cache.invalidate()
+        db_context.forget_lesson_orders()
+
         # Return the generated lesson plan
         return jsonify({
             'status': 'success',
@@ -0,0 +1,121 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def serve_stub_letta(latency_ms: float, port_queue) -> None:
+    """
+    Minimal Letta API that, like Letta, processes one agent's messages at a time: each
+    agent has a lock held for `latency_ms` per message call.
+    """
+    agents = {}
+    agents_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1
+
+        def _reply(self, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._reply([])
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            match = re.match(r"^/v1/agents/([^/?]+)/messages", self.path)
+            if match:
+                with agents[match.group(1)]:
+                    time.sleep(latency_ms / 1000)
+                return self._reply({"messages": [{"message_type": "assistant_message", "id": "m", "date": "2025-01-01T00:00:00Z", "content": "NO"}]})
+            with agents_lock:
+                agent_id = f"agent-{len(agents) + 1}"
+                agents[agent_id] = threading.Lock()
+            self._reply({"id": agent_id, "name": body.get("name"), "message_buffer_autoclear": bool(body.get("message_buffer_autoclear"))})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_stub_letta(latency_ms: float) -> str:
+    port_queue = multiprocessing.Queue()
+    multiprocessing.Process(target=serve_stub_letta, args=(latency_ms, port_queue), daemon=True).start()
+    return f"http://127.0.0.1:{port_queue.get()}"
+
+
+def bench(la, pool_size: int, users: int, requests: int) -> float:
+    """Run `requests` checks from `users` concurrent users over a pool of `pool_size` agents; return checks/s."""
+    from utils.agent_pool import AgentPool
+    from utils.letta_agents import LettaAgentHandle
+
+    la.task_agents = AgentPool([
+        LettaAgentHandle(f"Bench Decider {pool_size}.{i}", enforce=la.completion_context.agent_settings(), system=la.SYSTEM_PROMPT)
+        for i in range(pool_size)
+    ])
+    la.task_agents.warm(background=False)
+    counter = iter(range(requests))
+    counter_lock = threading.Lock()
+
+    def user(user_index: int) -> None:
+        while True:
+            with counter_lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            # Distinct criteria so the verdict cache never short-circuits the call
+            verdict = la.analyze_screenshot("bm90LWFuLWltYWdl", f"bench criteria {pool_size} {i}", user_id=f"user-{user_index}")
+            assert verdict == "NO", verdict
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure analyze_screenshot throughput against the task-agent pool size.")
+    parser.add_argument("--pool-sizes", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--users", type=int, default=32, help="Concurrent users")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Simulated model latency per check")
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, backend_dir)
+    os.environ["LETTA_BASE_URL"] = start_stub_letta(args.latency_ms)
+    os.environ["LETTA_API_KEY"] = "bench-key"
+    os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("SUPABASE_KEY", "bench-key")
+    os.environ.pop("LETTA_AGENT_STATE_PATH", None)
+    logging.disable(logging.WARNING)
+
+    from utils import learning_agent as la
+
+    print(f"{args.requests} checks from {args.users} concurrent users ({args.latency_ms:.0f} ms per check, one at a time per agent)")
+    baseline = None
+    for pool_size in args.pool_sizes:
+        throughput = bench(la, pool_size, args.users, args.requests)
+        baseline = baseline or throughput
+        print(f"pool={pool_size:<3} {throughput:7.1f} checks/s   {throughput / baseline:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import re
+import statistics
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def serve_stub_letta(base_ms: float, per_message_us: float, port_queue) -> None:
+    """
+    Minimal Letta API with history-dependent latency.
+
+    Each agent keeps a count of the messages in its buffer; a message call takes
+    `base_ms` plus `per_message_us` per buffered message (the prompt the model has to read),
+    then appends the user/assistant pair unless the agent has message_buffer_autoclear set.
+    reset-messages empties the buffer.
+    """
+    agents = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+        def _reply(self, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _agent(self, agent_id):
+            agent = agents[agent_id]
+            return {"id": agent_id, "name": agent["name"], "message_buffer_autoclear": agent["autoclear"]}
+
+        def do_GET(self):
+            match = re.match(r"^/v1/agents/([^/?]+)", self.path)
+            if match and match.group(1) in agents:
+                return self._reply(self._agent(match.group(1)))
+            self._reply([])
+
+        def do_POST(self):
+            body = self._body()
+            match = re.match(r"^/v1/agents/([^/?]+)/messages", self.path)
+            if match:
+                agent = agents[match.group(1)]
+                time.sleep((base_ms * 1000 + per_message_us * agent["history"]) / 1e6)
+                if not agent["autoclear"]:
+                    agent["history"] += 2
+                return self._reply({
+                    "messages": [{"message_type": "assistant_message", "id": "m", "date": "2025-01-01T00:00:00Z", "content": "NO"}],
+                    "stop_reason": {"message_type": "stop_reason", "stop_reason": "end_turn"},
+                    "usage": {"message_type": "usage_statistics"},
+                })
+            agent_id = f"agent-{len(agents) + 1}"
+            agents[agent_id] = {"name": body.get("name"), "autoclear": bool(body.get("message_buffer_autoclear")), "history": 0}
+            self._reply(self._agent(agent_id))
+
+        def do_PATCH(self):
+            body = self._body()
+            agent_id = re.match(r"^/v1/agents/([^/?]+)", self.path).group(1)
+            if self.path.split("?")[0].rstrip("/").endswith("/reset-messages"):
+                agents[agent_id]["history"] = 0
+            elif "message_buffer_autoclear" in body:
+                agents[agent_id]["autoclear"] = bool(body["message_buffer_autoclear"])
+            self._reply(self._agent(agent_id))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_stub_letta(base_ms: float, per_message_us: float) -> str:
+    port_queue = multiprocessing.Queue()
+    multiprocessing.Process(target=serve_stub_letta, args=(base_ms, per_message_us, port_queue), daemon=True).start()
+    return f"http://127.0.0.1:{port_queue.get()}"
+
+
+def soak(la, mode: str, calls: int, window: int):
+    """Run `calls` completion checks against a fresh agent bounded per `mode`; return per-call latencies."""
+    from utils.agent_pool import AgentPool
+    from utils.completion_context import CompletionContextPolicy
+    from utils.letta_agents import LettaAgentHandle
+
+    la.completion_context = CompletionContextPolicy(mode=mode, window=window)
+    la.task_agents = AgentPool([
+        LettaAgentHandle(f"Task Completion Decider ({mode})", enforce=la.completion_context.agent_settings(), system=la.SYSTEM_PROMPT)
+    ])
+    la.task_agents.warm(background=False)
+
+    latencies = []
+    for i in range(calls):
+        started = time.perf_counter()
+        # Distinct criteria so the verdict cache never short-circuits the call
+        verdict = la.analyze_screenshot("bm90LWFuLWltYWdl", f"soak criteria {mode} {i}")
+        latencies.append(time.perf_counter() - started)
+        assert verdict == "NO", verdict
+    return latencies
+
+
+def report(mode: str, latencies, buckets: int) -> None:
+    size = max(1, len(latencies) // buckets)
+    medians = [statistics.median(latencies[i:i + size]) * 1000 for i in range(0, size * buckets, size)]
+    drift = medians[-1] / medians[0]
+    cells = " ".join(f"{m:6.2f}" for m in medians)
+    print(f"{mode:<10} {cells}   last/first={drift:5.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak the task-completion agent and track per-call latency as its history grows.")
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument("--modes", nargs="*", default=["autoclear", "window", "reset", "stateful"])
+    parser.add_argument("--window", type=int, default=50, help="COMPLETION_HISTORY_WINDOW for the window mode")
+    parser.add_argument("--base-ms", type=float, default=1.0, help="Simulated model latency with an empty history")
+    parser.add_argument("--per-message-us", type=float, default=1.0, help="Simulated extra latency per buffered message")
+    parser.add_argument("--buckets", type=int, default=10)
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, backend_dir)
+    os.environ["LETTA_BASE_URL"] = start_stub_letta(args.base_ms, args.per_message_us)
+    os.environ["LETTA_API_KEY"] = "bench-key"
+    os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("SUPABASE_KEY", "bench-key")
+    os.environ.pop("LETTA_AGENT_STATE_PATH", None)
+    logging.disable(logging.WARNING)
+
+    from utils import learning_agent as la
+
+    print(f"{args.calls} calls per mode; p50 ms per {args.calls // args.buckets}-call bucket "
+          f"(stub: {args.base_ms} ms + {args.per_message_us} us per buffered message)")
+    for mode in args.modes:
+        report(mode, soak(la, mode, args.calls, args.window), args.buckets)
+
+
+if __name__ == "__main__":
+    main()
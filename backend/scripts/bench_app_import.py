@@ -0,0 +1,87 @@
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+
+
+def serve_stub_letta(latency_ms: float, port_queue) -> None:
+    """Minimal Letta API: list agents (none), create agent and modify agent, each after a fixed latency."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1
+
+        def _reply(self, payload):
+            time.sleep(latency_ms / 1000)
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._reply([])
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._reply({"id": "agent-bench", "name": "Task Completion Decider"})
+
+        def do_PATCH(self):
+            # Settings enforced on a reused agent (e.g. message_buffer_autoclear) are echoed back
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            self._reply({"id": "agent-bench", "name": "Task Completion Decider", **body})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def time_import(backend_dir: str, env: dict, runs: int):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            cwd=backend_dir, env=env, capture_output=True, text=True, check=True,
+        )
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time `import app` with eager vs lazy Letta agent initialization.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--letta-latency-ms", type=float, default=300.0, help="Simulated latency per Letta API call")
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    port_queue = multiprocessing.Queue()
+    multiprocessing.Process(target=serve_stub_letta, args=(args.letta_latency_ms, port_queue), daemon=True).start()
+    base_env = {
+        **os.environ,
+        "LETTA_BASE_URL": f"http://127.0.0.1:{port_queue.get()}",
+        "LETTA_API_KEY": "bench",
+        # Supabase clients are built (not contacted) at import; they only need syntactically valid settings
+        "SUPABASE_URL": os.getenv("SUPABASE_URL", "http://127.0.0.1:9"),
+        "SUPABASE_KEY": os.getenv("SUPABASE_KEY", "bench"),
+    }
+    print(f"Stub Letta API: {base_env['LETTA_BASE_URL']} ({args.letta_latency_ms:.0f} ms per call)")
+
+    # Eager mode reproduces the previous behaviour: letta_client imported and the agent resolved during import
+    for label, extra in (("eager (before)", {"LETTA_EAGER_INIT": "true"}), ("lazy (after)", {"LETTA_EAGER_INIT": "false"})):
+        samples = time_import(backend_dir, {**base_env, **extra}, args.runs)
+        print(f"{label:<16} import app: median {statistics.median(samples) * 1000:7.0f} ms   min {min(samples) * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
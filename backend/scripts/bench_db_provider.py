@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+STEP_ROWS = [
+    {"step_order": i, "name": f"Step {i}", "description": "Click the button " * 20, "finish_criteria": "Button clicked"}
+    for i in range(1, 13)
+]
+
+
+def serve_stub_postgrest(latency_ms: float, port_queue) -> None:
+    """
+    Answer every GET like PostgREST's /rest/v1/step would, after a fixed simulated
+    network/database latency. asyncio-based so the stub itself never limits concurrency.
+    """
+    body = json.dumps(STEP_ROWS).encode("utf-8")
+    response = (
+        b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+        + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii")
+        + body
+    )
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                await asyncio.sleep(latency_ms / 1000)
+                writer.write(response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0, backlog=512)
+        port_queue.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def start_stub_postgrest(latency_ms: float) -> str:
+    """Run the stub in its own process so it does not compete with the client for the GIL."""
+    port_queue = multiprocessing.Queue()
+    multiprocessing.Process(target=serve_stub_postgrest, args=(latency_ms, port_queue), daemon=True).start()
+    return f"http://127.0.0.1:{port_queue.get()}"
+
+
+def report(label: str, latencies, elapsed: float) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{label:<28} {len(ordered) / elapsed:8.0f} req/s   "
+        f"p50={statistics.median(ordered) * 1000:7.2f} ms  p95={p95 * 1000:7.2f} ms",
+        file=sys.__stdout__,
+    )
+
+
+def bench_sync(provider, requests: int, concurrency: int) -> None:
+    latencies = []
+
+    def one(_):
+        started = time.perf_counter()
+        assert provider.get_lesson_steps_batch(1)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        for i in range(requests):
+            one(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(requests)))
+    report(f"sync  concurrency={concurrency}", latencies, time.perf_counter() - started)
+
+
+async def bench_async(provider, requests: int, concurrency: int) -> None:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            assert await provider.get_lesson_steps_batch(1)
+            latencies.append(time.perf_counter() - started)
+
+    await provider.get_lesson_steps_batch(1)  # open the pool outside the measurement
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    report(f"async concurrency={concurrency}", latencies, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync vs async get_lesson_steps_batch throughput against a stub PostgREST.")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated per-request server latency")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 8, 16, 32])
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, backend_dir)
+    url = start_stub_postgrest(args.latency_ms)
+    os.environ["SUPABASE_URL"] = url
+    os.environ["SUPABASE_KEY"] = "bench-key"
+
+    from utils.async_database_context import AsyncDatabaseContextProvider
+    from utils.database_context import DatabaseContextProvider
+
+    print(f"Stub PostgREST: {url} ({args.latency_ms:.0f} ms per request, HTTP/1.1 keep-alive)")
+    # The sync provider logs every load with print(); keep that out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        sync_provider = DatabaseContextProvider()
+        sync_provider.get_lesson_steps_batch(1)
+        for concurrency in args.concurrency:
+            bench_sync(sync_provider, args.requests, concurrency)
+
+    async def run_async():
+        provider = AsyncDatabaseContextProvider(max_connections=max(args.concurrency), max_keepalive=max(args.concurrency))
+        for concurrency in args.concurrency:
+            await bench_async(provider, args.requests, concurrency)
+        await provider.close_connection()
+
+    asyncio.run(run_async())
+
+
+if __name__ == "__main__":
+    main()
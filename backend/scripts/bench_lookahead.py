@@ -0,0 +1,75 @@
+import argparse
+import logging
+import os
+import sys
+
+
+def simulate(la, steps: int, steps_per_frame: float, lookahead: int) -> dict:
+    """
+    Play one lesson for a learner who finishes `steps_per_frame` steps between captures.
+    The model is simulated: a criterion is met once the learner's position has passed it.
+    Returns the number of model calls and frames until the lesson completed.
+    """
+    from utils.lesson_cache import lesson_cache
+
+    lesson_data = {order: {"name": f"S{order}", "description": f"D{order}", "finish_criteria": f"C{order}"} for order in range(1, steps + 1)}
+    lesson_cache.put(1, lesson_data)
+    la.COMPLETION_LOOKAHEAD_STEPS = lookahead
+    la.generate_and_send_popup_message = lambda img, desc, user_id=None: ""  # noqa: ARG005
+    calls = {"count": 0}
+    state = {"done_through": 0.0}
+
+    def done(criteria: str) -> bool:
+        return int(criteria[1:]) <= state["done_through"]
+
+    def analyze(img, criteria, lesson_id=None, user_id=None):  # noqa: ARG001
+        calls["count"] += 1
+        return "YES" if done(criteria) else "NO"
+
+    def analyze_steps(img, criteria, lesson_id=None, user_id=None):  # noqa: ARG001
+        calls["count"] += 1
+        return [done(c) for c in criteria]
+
+    la.analyze_screenshot = analyze
+    la.analyze_screenshot_steps = analyze_steps
+    la.user_state.clear()
+    la.frame_deduplicator.clear()
+
+    step_order, frames = 1, 0
+    while frames < 10 * steps:
+        frames += 1
+        out = la.handle_screenshot_event("learner", 1, step_order, f"frame-{frames}")
+        if out.get("lesson_completed"):
+            break
+        step_order = out.get("next_step_order", step_order)
+        state["done_through"] += steps_per_frame
+    return {"calls": calls["count"], "frames": frames}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare model calls and frames per lesson with and without multi-step lookahead.")
+    parser.add_argument("--steps", type=int, default=12)
+    parser.add_argument("--steps-per-frame", type=float, nargs="*", default=[0.5, 1.0, 2.0, 3.0], help="Learner speed")
+    parser.add_argument("--lookahead", type=int, nargs="*", default=[0, 1, 3])
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, backend_dir)
+    os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("SUPABASE_KEY", "bench-key")
+    logging.disable(logging.WARNING)
+
+    from utils import learning_agent as la
+
+    print(f"{args.steps}-step lesson; model calls / frames until completion")
+    print("speed (steps/frame)  " + "  ".join(f"k={k:<9}" for k in args.lookahead))
+    for speed in args.steps_per_frame:
+        cells = []
+        for k in args.lookahead:
+            result = simulate(la, args.steps, speed, k)
+            cells.append(f"{result['calls']:>3} / {result['frames']:<3}")
+        print(f"{speed:<20} " + "  ".join(f"{c:<11}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+
+def make_screenshot(width: int, height: int) -> bytes:
+    """Render a synthetic PNG roughly as compressible as a real desktop capture."""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (width, height), (245, 245, 245))
+    draw = ImageDraw.Draw(img)
+    for i in range(0, width, 120):
+        draw.rectangle([i, 40, i + 90, height - 40], outline=(30, 30, 30), fill=((i * 7) % 255, 120, 200))
+    noise = Image.effect_noise((width // 4, height // 4), 40).convert("RGB").resize((width, height))
+    img = Image.blend(img, noise, 0.15)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def measure(label, send, iterations):
+    """Run `send` repeatedly, reporting mean CPU time and peak traced memory per request."""
+    send()  # warm up routing/JSON machinery outside the measurement
+    cpu_total = 0.0
+    peak = 0
+    for _ in range(iterations):
+        tracemalloc.start()
+        cpu_start = time.process_time()
+        response = send()
+        cpu_total += time.process_time() - cpu_start
+        _, request_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak = max(peak, request_peak)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    print(f"{label:<10} cpu/request: {cpu_total / iterations * 1000:8.2f} ms   peak memory: {peak / (1024 * 1024):8.2f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare /screenshot (base64 JSON) with /screenshot/raw (binary) ingest cost.")
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("SUPABASE_KEY", "bench")
+
+    from scripts.mock_agent_demo import install_fake_letta_module  # noqa: WPS433
+
+    install_fake_letta_module()
+    import app as backend_app  # noqa: WPS433 - import after stubbing letta
+
+    # Only the ingest path is measured; the progression engine just touches the frame
+    backend_app.handle_screenshot_event = lambda user_id, lesson_id, step_order, image: {"completed": False, "size": len(image)}  # noqa: ARG005
+    client = backend_app.app.test_client()
+
+    png = make_screenshot(args.width, args.height)
+    body = json.dumps({"image": base64.b64encode(png).decode("ascii"), "user_id": "bench", "lesson_id": 1, "step_order": 1})
+    print(f"Screenshot: {args.width}x{args.height} PNG, {len(png) / 1024:.0f} KiB raw, {len(body) / 1024:.0f} KiB as JSON")
+
+    measure("json", lambda: client.post("/screenshot", data=body, content_type="application/json"), args.iterations)
+    measure("raw", lambda: client.post(
+        "/screenshot/raw",
+        data=png,
+        content_type="image/png",
+        headers={"X-User-Id": "bench", "X-Lesson-Id": "1", "X-Step-Order": "1"},
+    ), args.iterations)
+    measure("multipart", lambda: client.post(
+        "/screenshot/raw",
+        data={"image": (io.BytesIO(png), "frame.png"), "user_id": "bench", "lesson_id": "1", "step_order": "1"},
+        content_type="multipart/form-data",
+    ), args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_embedded_broker() -> str:
+    """Start an in-process Redis-protocol server (fakeredis) for machines without Redis."""
+    from fakeredis import TcpFakeServer
+
+    port = free_port()
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}/0"
+
+
+def start_receiver(queue_url: str) -> int:
+    """Run a Socket.IO server attached to the queue, as the worker holding the client connection."""
+    from flask import Flask
+    from flask_socketio import SocketIO, join_room
+
+    app = Flask("fanout-receiver")
+    socketio = SocketIO(app, message_queue=queue_url)
+
+    @socketio.on("join_user_room")
+    def handle_join(data):
+        join_room(data["user_id"])
+        return True
+
+    port = free_port()
+    threading.Thread(
+        target=lambda: socketio.run(app, port=port, host="127.0.0.1", allow_unsafe_werkzeug=True, log_output=False),
+        daemon=True,
+    ).start()
+    time.sleep(1.0)
+    return port
+
+
+def emitter_worker(queue_url: str, user_id: str, count: int, start_event) -> None:
+    """One simulated backend worker emitting popups for a user connected elsewhere."""
+    from utils.popup_dispatcher import PopupDispatcher, SocketIOPopupEmitter
+
+    dispatcher = PopupDispatcher(SocketIOPopupEmitter.from_message_queue(queue_url))
+    start_event.wait()
+    for seq in range(count):
+        dispatcher.send(f"{time.time()}:{seq}", user_id=user_id)
+
+
+def run_round(queue_url: str, port: int, workers: int, per_worker: int) -> None:
+    import socketio
+
+    user_id = f"bench-{workers}"
+    latencies = []
+    done = threading.Event()
+    expected = workers * per_worker
+
+    client = socketio.Client()
+
+    @client.on("popup_message")
+    def on_popup(data):
+        sent_at = float(data["message"].split(":", 1)[0])
+        latencies.append(time.time() - sent_at)
+        if len(latencies) >= expected:
+            done.set()
+
+    client.connect(f"http://127.0.0.1:{port}", transports=["websocket"])
+    client.call("join_user_room", {"user_id": user_id})
+
+    start_event = multiprocessing.Event()
+    procs = [
+        multiprocessing.Process(target=emitter_worker, args=(queue_url, user_id, per_worker, start_event))
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    time.sleep(1.0)  # let every worker connect to the queue before timing
+
+    started = time.time()
+    start_event.set()
+    done.wait(timeout=60)
+    elapsed = time.time() - started
+    for proc in procs:
+        proc.join()
+    client.disconnect()
+
+    delivered = len(latencies)
+    ordered = sorted(latencies) or [0.0]
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"workers={workers:<3} delivered={delivered}/{expected:<6} "
+        f"throughput={delivered / elapsed:8.0f} msg/s   "
+        f"latency p50={statistics.median(ordered) * 1000:7.2f} ms  p95={p95 * 1000:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emit throughput and delivery latency through the Socket.IO message queue.")
+    parser.add_argument("--queue-url", default=os.getenv("SOCKETIO_MESSAGE_QUEUE"), help="e.g. redis://localhost:6379/0; an embedded broker is used if omitted")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 4, 16])
+    parser.add_argument("--messages", type=int, default=2000, help="Total popups per round, split across workers")
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(backend_dir)
+    sys.path.insert(0, backend_dir)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    queue_url = args.queue_url or start_embedded_broker()
+    print(f"Message queue: {queue_url}")
+    port = start_receiver(queue_url)
+    for workers in args.workers:
+        run_round(queue_url, port, workers, max(1, args.messages // workers))
+
+    # The dev server and embedded broker threads cannot be shut down cleanly
+    sys.stdout.flush()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    multiprocessing.set_start_method("fork")
+    main()
@@ -23,6 +23,9 @@ def install_fake_letta_module():
             self._popup_content = popup_message
             self._completion_queue = list(completion_sequence)
 
+        def reset(self, agent_id, add_default_initial_messages=True):  # noqa: ARG002
+            return None
+
         def set_task_agent_id(self, task_agent_id: str):
             self._task_agent_id = task_agent_id
 
@@ -40,10 +43,24 @@ def install_fake_letta_module():
     class _AgentsAPI:
         def __init__(self):
             self.messages = _MessagesAPI()
+            # { agent_id: agent } so lookups by name/id find agents created earlier in the run
+            self._agents = {}
 
-        def create(self, name, system, model, embedding, tools, include_base_tools):  # noqa: ARG002
+        def create(self, name, system, model, embedding, tools, include_base_tools, **settings):  # noqa: ARG002
             safe_id = str(name).lower().replace(" ", "_")
-            return types.SimpleNamespace(id=f"agent_{safe_id}")
+            agent = types.SimpleNamespace(id=f"agent_{safe_id}", name=name, **settings)
+            self._agents[agent.id] = agent
+            return agent
+
+        def list(self, name=None, limit=None):  # noqa: ARG002
+            return [agent for agent in self._agents.values() if name is None or agent.name == name][:limit]
+
+        def retrieve(self, agent_id):
+            return self._agents[agent_id]
+
+        def modify(self, agent_id, **settings):
+            vars(self._agents[agent_id]).update(settings)
+            return self._agents[agent_id]
 
     class _FakeLetta:
         def __init__(self, token=None):  # noqa: ARG002
@@ -94,6 +111,7 @@ def main():
     fake_letta = install_fake_letta_module()
 
     from utils import learning_agent as la  # noqa: WPS433 - runtime import after stubbing
+    from utils.database_context import db_context  # noqa: WPS433
 
     # Speed up demo by patching sleep
     import types as _types
@@ -101,7 +119,7 @@ def main():
     la.time.sleep = lambda s: None if args.sleep <= 0 else __import__("time").sleep(args.sleep)  # type: ignore
 
     # Provide mock lesson data
-    def mock_get_lesson_steps_batch(lesson_id):  # noqa: ARG001
+    def mock_fetch_lesson_steps(lesson_id):  # noqa: ARG001
         steps = {}
         for i in range(1, args.steps + 1):
             steps[i] = {
@@ -111,7 +129,7 @@ def main():
             }
         return steps
 
-    la.db_context.get_lesson_steps_batch = mock_get_lesson_steps_batch  # type: ignore
+    db_context.fetch_lesson_steps = mock_fetch_lesson_steps  # type: ignore
 
     # Mock websocket sender to log instead of HTTP
     def mock_send_popup(message: str, user_id: Optional[str] = None) -> bool:
@@ -0,0 +1,78 @@
+import os
+import sys
+import types
+from collections import Counter
+
+import pytest
+
+# Ensure backend path is importable
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils.agent_pool import AgentPool  # noqa: E402
+from utils.letta_agents import LettaAgentHandle  # noqa: E402
+
+
+def _pool(size, **kwargs):
+    client = types.SimpleNamespace(agents=None)
+    handles = [LettaAgentHandle(f"Decider {i + 1}", client_factory=lambda: client) for i in range(size)]
+    return AgentPool(handles, **kwargs)
+
+
+USERS = [f"user-{i}" for i in range(400)]
+
+
+def test_users_are_spread_and_pinned():
+    pool = _pool(4)
+    assignment = {user: pool.agent_for(user) for user in USERS}
+    load = Counter(handle.name for handle in assignment.values())
+    assert len(load) == 4
+    assert min(load.values()) > len(USERS) / 4 * 0.5
+    assert all(pool.agent_for(user) is handle for user, handle in assignment.items())
+
+
+def test_failing_agent_is_drained_and_only_its_users_move():
+    pool = _pool(4, failure_threshold=2, drain_seconds=60)
+    before = {user: pool.agent_for(user) for user in USERS}
+    bad = pool.handles[1]
+    pool.record(bad, 0.1, ok=False)
+    assert pool.agent_for(next(u for u, h in before.items() if h is bad)) is bad
+    pool.record(bad, 0.1, ok=False)
+
+    after = {user: pool.agent_for(user) for user in USERS}
+    assert bad not in after.values()
+    assert all(after[user] is handle for user, handle in before.items() if handle is not bad)
+    assert pool.stats()["agents"][1]["drains"] == 1
+    assert pool.status()["available"] == 0  # none resolved with Letta yet
+    assert pool.status()["agents"][1]["drained"] is True
+
+
+def test_slow_agent_is_drained_and_returns_after_drain(monkeypatch):
+    pool = _pool(3, slow_factor=3, min_slow_seconds=0.5, drain_seconds=30)
+    for _ in range(5):
+        pool.record(pool.handles[0], 0.2, ok=True)
+        pool.record(pool.handles[1], 0.25, ok=True)
+    pool.record(pool.handles[2], 5.0, ok=True)
+    assert pool.stats()["agents"][2]["drained"] is True
+    assert "latency" in pool.stats()["agents"][2]["drain_reason"]
+
+    import utils.agent_pool as agent_pool
+    real_monotonic = agent_pool.time.monotonic
+    monkeypatch.setattr(agent_pool.time, "monotonic", lambda: real_monotonic() + 31)
+    assert pool.stats()["agents"][2]["drained"] is False
+    assert pool.stats()["agents"][2]["ewma_ms"] is None
+
+
+def test_all_drained_falls_back_to_owner():
+    pool = _pool(2, failure_threshold=1)
+    owner = pool.agent_for("user-1")
+    for handle in pool.handles:
+        pool.record(handle, 0.1, ok=False)
+    assert pool.agent_for("user-1") is owner
+
+
+def test_empty_pool_is_rejected():
+    with pytest.raises(ValueError):
+        AgentPool([])
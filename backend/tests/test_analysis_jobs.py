@@ -0,0 +1,32 @@
+import os
+import sys
+import threading
+
+# Ensure backend path is importable
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils.analysis_jobs import AnalysisJobRunner  # noqa: E402
+
+
+def test_analysis_job_runner_delivers_and_sheds_load():
+    runner = AnalysisJobRunner(max_workers=1, max_pending=1)
+    release = threading.Event()
+    delivered = {}
+    done = threading.Event()
+
+    def deliver(job_id, result):
+        delivered[job_id] = result
+        done.set()
+
+    job_id = runner.submit(lambda: release.wait(5) and "verdict", deliver)
+    assert job_id is not None
+    # The only slot is taken, so the next job is refused rather than queued
+    assert runner.submit(lambda: "late", deliver) is None
+
+    release.set()
+    done.wait(5)
+    assert delivered == {job_id: "verdict"}
+    assert runner.stats()["rejected"] == 1
@@ -0,0 +1,230 @@
+import io
+import os
+import sys
+
+import pytest
+
+# Ensure backend path is importable
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# app.py needs Supabase settings at import; nothing here talks to Supabase
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+from scripts.mock_agent_demo import install_fake_letta_module  # noqa: E402
+from utils.popup_dispatcher import popup_dispatcher  # noqa: E402
+
+# Stub letta_client before app import, as the learning agent tests do
+install_fake_letta_module()
+
+_previous_popup_emitter = popup_dispatcher.emitter
+import app as backend_app  # noqa: E402
+
+# Importing app points the shared popup dispatcher at its Socket.IO server; keep that to these tests
+_app_popup_emitter = popup_dispatcher.emitter
+popup_dispatcher.set_emitter(_previous_popup_emitter)
+
+
+@pytest.fixture(autouse=True)
+def app_popup_emitter():
+    popup_dispatcher.set_emitter(_app_popup_emitter)
+    yield
+    popup_dispatcher.set_emitter(_previous_popup_emitter)
+
+
+class _QueuedJobs:
+    """Stand-in for analysis_jobs that holds jobs until the test runs them."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, work, deliver):
+        job_id = f"job-{len(self.jobs) + 1}"
+        self.jobs.append((job_id, work, deliver))
+        return job_id
+
+    def run_all(self):
+        jobs, self.jobs = self.jobs, []
+        for job_id, work, deliver in jobs:
+            deliver(job_id, work())
+
+
+@pytest.fixture
+def events(monkeypatch):
+    """Record the (lesson_id, step_order) each frame is evaluated against."""
+    calls = []
+
+    def fake_handle(user_id, lesson_id, step_order, image):  # noqa: ARG001
+        calls.append((lesson_id, step_order))
+        return {"completed": False, "step_order": step_order}
+
+    monkeypatch.setattr(backend_app, "handle_screenshot_event", fake_handle)
+    backend_app.user_state.clear()
+    yield calls
+    backend_app.user_state.clear()
+
+
+@pytest.fixture
+def queued_jobs(monkeypatch):
+    jobs = _QueuedJobs()
+    monkeypatch.setattr(backend_app, "analysis_jobs", jobs)
+    return jobs
+
+
+def test_queued_http_frame_does_not_rewind_session(events, queued_jobs):
+    backend_app.user_state.update("u1", lesson_id=1, step_order=1, popup_sent_for_step=True)
+    client = backend_app.app.test_client()
+
+    response = client.post("/screenshot", json={"image": "aW1n", "user_id": "u1", "lesson_id": 1, "step_order": 1, "async": True})
+    assert response.status_code == 202
+
+    # The session advances while the frame waits in the queue
+    backend_app.user_state.update("u1", lesson_id=1, step_order=2, popup_sent_for_step=True)
+    queued_jobs.run_all()
+
+    assert events == [(1, 2)]
+
+
+def test_queued_socket_frame_does_not_rewind_session(events, queued_jobs):
+    backend_app.user_state.update("u2", lesson_id=1, step_order=1, popup_sent_for_step=True)
+    client = backend_app.socketio.test_client(backend_app.app)
+
+    ack = client.emit("screenshot_frame", {"image": "aW1n", "user_id": "u2", "lesson_id": 1, "step_order": 1}, callback=True)
+    assert ack["status"] == "accepted"
+
+    backend_app.user_state.update("u2", lesson_id=1, step_order=2, popup_sent_for_step=True)
+    queued_jobs.run_all()
+
+    assert events == [(1, 2)]
+    client.disconnect()
+
+
+class _FullJobs:
+    """Stand-in for analysis_jobs whose queue is always full."""
+
+    def submit(self, work, deliver):  # noqa: ARG002
+        return None
+
+
+def _events_named(client, name):
+    return [event["args"][0] for event in client.get_received() if event["name"] == name]
+
+
+def test_flooded_socket_connection_is_told_to_slow_down(events, queued_jobs):
+    client = backend_app.socketio.test_client(backend_app.app)
+    frames = backend_app.SOCKET_MAX_FRAMES_IN_FLIGHT + 3
+
+    acks = [
+        client.emit("screenshot_frame", {"image": "aW1n", "user_id": "u3", "lesson_id": 1, "step_order": 1, "frame_id": i}, callback=True)
+        for i in range(frames)
+    ]
+
+    assert [ack["status"] for ack in acks].count("accepted") == backend_app.SOCKET_MAX_FRAMES_IN_FLIGHT
+    slow_downs = _events_named(client, "slow_down")
+    assert len(slow_downs) == frames - backend_app.SOCKET_MAX_FRAMES_IN_FLIGHT
+    assert all(event["reason"] == "connection_busy" for event in slow_downs)
+    assert sum(backend_app._frames_in_flight.values()) == backend_app.SOCKET_MAX_FRAMES_IN_FLIGHT
+
+    queued_jobs.run_all()
+
+    assert len(_events_named(client, "screenshot_verdict")) == backend_app.SOCKET_MAX_FRAMES_IN_FLIGHT
+    assert sum(backend_app._frames_in_flight.values()) == 0
+    # Slots are free again, so the next frame is accepted
+    ack = client.emit("screenshot_frame", {"image": "aW1n", "user_id": "u3", "lesson_id": 1, "step_order": 1}, callback=True)
+    assert ack["status"] == "accepted"
+    queued_jobs.run_all()
+    client.disconnect()
+
+
+def test_socket_frame_dropped_when_server_queue_is_full(events, monkeypatch):
+    monkeypatch.setattr(backend_app, "analysis_jobs", _FullJobs())
+    client = backend_app.socketio.test_client(backend_app.app)
+
+    ack = client.emit("screenshot_frame", {"image": "aW1n", "user_id": "u4", "lesson_id": 1, "step_order": 1}, callback=True)
+
+    assert ack["status"] == "dropped"
+    assert [event["reason"] for event in _events_named(client, "slow_down")] == ["server_busy"]
+    assert sum(backend_app._frames_in_flight.values()) == 0
+    assert events == []
+    client.disconnect()
+
+
+def test_async_http_verdict_is_delivered_to_user_room(events, queued_jobs):
+    socket_client = backend_app.socketio.test_client(backend_app.app)
+    socket_client.emit("join_user_room", {"user_id": "u5"})
+    socket_client.get_received()
+
+    response = backend_app.app.test_client().post(
+        "/screenshot", json={"image": "aW1n", "user_id": "u5", "lesson_id": 1, "step_order": 1, "async": True}
+    )
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body["status"] == "accepted" and body["user_id"] == "u5"
+
+    queued_jobs.run_all()
+
+    verdicts = _events_named(socket_client, "screenshot_verdict")
+    assert [verdict["job_id"] for verdict in verdicts] == [body["job_id"]]
+    assert events == [(1, 1)]
+    socket_client.disconnect()
+
+
+def test_async_http_frame_rejected_when_queue_is_full(events, monkeypatch):
+    monkeypatch.setattr(backend_app, "analysis_jobs", _FullJobs())
+
+    response = backend_app.app.test_client().post(
+        "/screenshot", json={"image": "aW1n", "user_id": "u6", "lesson_id": 1, "step_order": 1, "async": True}
+    )
+
+    assert response.status_code == 503
+    assert events == []
+
+
+def test_raw_screenshot_reads_metadata_from_headers(events):
+    response = backend_app.app.test_client().post(
+        "/screenshot/raw",
+        data=b"\x89PNG raw bytes",
+        headers={"Content-Type": "image/png", "X-User-Id": "u7", "X-Lesson-Id": "3", "X-Step-Order": "2"},
+    )
+
+    assert response.status_code == 200
+    assert events == [(3, 2)]
+
+
+def test_raw_screenshot_accepts_multipart_upload(events):
+    response = backend_app.app.test_client().post(
+        "/screenshot/raw",
+        data={"image": (io.BytesIO(b"\x89PNG multipart"), "frame.png"), "user_id": "u8", "lesson_id": "4", "step_order": "1"},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 200
+    assert events == [(4, 1)]
+
+
+def test_raw_screenshot_rejects_empty_and_oversized_bodies(events, monkeypatch):
+    client = backend_app.app.test_client()
+
+    assert client.post("/screenshot/raw", data=b"", headers={"Content-Type": "image/png"}).status_code == 400
+    assert client.post("/screenshot/raw", data={"user_id": "u9"}, content_type="multipart/form-data").status_code == 400
+
+    monkeypatch.setattr(backend_app, "MAX_SCREENSHOT_BYTES", 8)
+    assert client.post("/screenshot/raw", data=b"x" * 9, headers={"Content-Type": "image/png"}).status_code == 413
+    assert events == []
+
+
+def test_lesson_cache_invalidate_rejects_non_integer_lesson_id():
+    client = backend_app.app.test_client()
+    backend_app.lesson_cache.put(11, {1: {"name": "N", "description": "D", "finish_criteria": "C"}})
+
+    response = client.post("/api/lesson-cache/invalidate", json={"lesson_id": "eleven"})
+    assert response.status_code == 400
+    assert backend_app.lesson_cache.get(11) is not None
+
+    response = client.post("/api/lesson-cache/invalidate", json={"lesson_id": "11"})
+    assert response.status_code == 200
+    assert response.get_json()["invalidated"] == 11
+    assert backend_app.lesson_cache.get(11) is None
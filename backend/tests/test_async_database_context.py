@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+# Ensure backend path is importable
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils.async_database_context import AsyncDatabaseContextProvider  # noqa: E402
+
+STEPS = [
+    {"step_order": 2, "name": "Two", "description": "D2", "finish_criteria": None},
+    {"step_order": 1, "name": "One", "description": "D1", "finish_criteria": "Click"},
+]
+
+
+def _provider(handler, **kwargs):
+    provider = AsyncDatabaseContextProvider(url="http://stub", key="k", retry_backoff=0, **kwargs)
+    provider._client = httpx.AsyncClient(base_url="http://stub/rest/v1", transport=httpx.MockTransport(handler))
+    return provider
+
+
+def test_get_lesson_steps_batch_matches_sync_shape():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=STEPS)
+
+    provider = _provider(handler)
+    result = asyncio.run(provider.get_lesson_steps_batch(7))
+
+    assert result == {
+        1: {"name": "One", "description": "D1", "finish_criteria": "Click"},
+        2: {"name": "Two", "description": "D2", "finish_criteria": "Step 2 completion criteria"},
+    }
+    assert requests[0].url.path == "/rest/v1/step"
+    assert requests[0].url.params["lesson_id"] == "eq.7"
+
+
+def test_transient_failures_are_retried():
+    calls = {"count": 0}
+
+    def handler(request):  # noqa: ARG001
+        calls["count"] += 1
+        if calls["count"] == 1:
+            raise httpx.ConnectError("refused")
+        if calls["count"] == 2:
+            return httpx.Response(503)
+        return httpx.Response(200, json=[{"id": 42}])
+
+    provider = _provider(handler, retries=2)
+    assert asyncio.run(provider.get_lesson_id_by_order(1)) == 42
+    assert calls["count"] == 3
+
+
+def test_errors_fall_back_to_defaults_after_retries():
+    def handler(request):  # noqa: ARG001
+        return httpx.Response(500, content=json.dumps({"message": "boom"}))
+
+    provider = _provider(handler, retries=1)
+    assert asyncio.run(provider.get_lesson_steps_batch(1)) == {}
+    assert asyncio.run(provider.get_step_finish_criteria(3, 1)) == "Step 3 completion criteria"
+
+
+def test_step_by_lesson_order_is_one_round_trip_then_cached():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.path.endswith("/lesson"):
+            return httpx.Response(200, json=[{"id": 10, "step": [{"name": "N", "description": "D"}]}])
+        return httpx.Response(200, json=[{"name": "N2", "description": "D2"}])
+
+    provider = _provider(handler)
+
+    async def run():
+        first = await provider.get_step_by_order_and_lesson_order(step_order=1, lesson_order=4)
+        second = await provider.get_step_by_order_and_lesson_order(step_order=2, lesson_order=4)
+        return first, second
+
+    assert asyncio.run(run()) == (("N", "D"), ("N2", "D2"))
+    assert [r.url.path for r in requests] == ["/rest/v1/lesson", "/rest/v1/step"]
+    assert requests[0].url.params["step.step_order"] == "eq.1"
+
+
+def test_user_and_lesson_context_match_sync_shape():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.path.endswith("/lesson"):
+            return httpx.Response(200, json=[{"name": "Intro", "description": "", "lesson_order": 1}])
+        return httpx.Response(200, json=[{"lesson_id": 3, "step_order": 2, "completed": False}])
+
+    provider = _provider(handler)
+
+    assert asyncio.run(provider.get_lesson_context("3")) == {"lesson": "Intro", "lesson_order": 1}
+    assert asyncio.run(provider.get_user_context("u1")) == {"current_lesson": 3, "current_step": 2, "lesson_completed": False}
+    assert asyncio.run(provider.get_relevant_context("lesson", "3")) == "Additional Context:\n- lesson: Intro\n- lesson_order: 1\n"
+    assert requests[0].url.params["id"] == "eq.3"
+    assert requests[1].url.path == "/rest/v1/user_progress"
+    assert requests[1].url.params["user_id"] == "eq.u1"
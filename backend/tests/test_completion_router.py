@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+# Ensure backend path is importable
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils.completion_router import CompletionRouter  # noqa: E402
+
+
+@pytest.mark.parametrize("answer,expected", [
+    ("YES", "YES"),
+    (" no.\n", "NO"),
+    ("**Yes**", "YES"),
+    ("UNSURE", None),
+    ("Yes, the rectangle is blue", None),
+    ("", None),
+    (None, None),
+])
+def test_only_clean_answers_are_decisive(answer, expected):
+    assert CompletionRouter.decisive(answer) == expected
+
+
+def test_hard_marker_is_detected_and_stripped():
+    router = CompletionRouter(enabled=True)
+    assert router.split_hard("[HARD] The chart shows a 3-month moving average") == (True, "The chart shows a 3-month moving average")
+    assert router.split_hard("A blue rectangle appears") == (False, "A blue rectangle appears")
+
+
+def test_stats_report_escalation_rate_and_tier_latency():
+    router = CompletionRouter(enabled=True)
+    for route in ["fast", "fast", "fast", "escalated_unsure", "hard"]:
+        router.record_route(route)
+    router.record_latency("fast", 0.2)
+    router.record_latency("strong", 1.5)
+
+    stats = router.stats()
+    assert stats["routes"] == {"fast": 3, "escalated_unsure": 1, "hard": 1}
+    # Hard criteria skip the fast tier, so they do not count towards escalations
+    assert stats["escalation_rate"] == 0.25
+    assert stats["latency"]["fast"] == {"calls": 1, "p50_ms": 200.0, "p95_ms": 200.0}
+    assert stats["latency"]["strong"]["p50_ms"] == 1500.0
@@ -19,6 +19,7 @@ class _SupabaseQuery:
         self.columns = None
         self._order = None
         self._limit = None
+        self._range = None
 
     def select(self, columns):
         self.columns = columns
@@ -28,6 +29,10 @@ class _SupabaseQuery:
         self.filters.append((col, val))
         return self
 
+    def gte(self, col, val):
+        self.filters.append((col, lambda v: v is not None and v >= val))
+        return self
+
     def order(self, col):
         self._order = col
         return self
@@ -36,14 +41,33 @@ class _SupabaseQuery:
         self._limit = n
         return self
 
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
     def execute(self):
+        self.store.setdefault("_requests", []).append((self.table_name, self.columns))
         data = list(self.store.get(self.table_name, []))
-        for col, val in self.filters:
-            data = [row for row in data if row.get(col) == val]
+        filters = [(col, val if callable(val) else (lambda v, val=val: v == val)) for col, val in self.filters]
+        for col, match in filters:
+            if "." not in col:
+                data = [row for row in data if match(row.get(col))]
         if self._order:
             data.sort(key=lambda r: r.get(self._order))
+        if self._range is not None:
+            data = data[self._range[0]: self._range[1] + 1]
         if self._limit is not None:
             data = data[: self._limit]
+        if self.table_name == "lesson" and self.columns and "step(" in self.columns:
+            # Embedded resource, as PostgREST does for lesson?select=*,step(*); step.<col> filters apply to it
+            step_filters = [(col.split(".", 1)[1], match) for col, match in filters if col.startswith("step.")]
+            data = [
+                {**row, "step": [
+                    s for s in self.store.get("step", [])
+                    if s.get("lesson_id") == row["id"] and all(match(s.get(col)) for col, match in step_filters)
+                ]}
+                for row in data
+            ]
         return types.SimpleNamespace(data=data)
 
 
@@ -55,6 +79,7 @@ class _SupabaseStub:
         return _SupabaseQuery(name, self._store)
 
 from utils.database_context import DatabaseContextProvider  # noqa: E402
+from utils.lesson_replica import LessonReplica  # noqa: E402
 
 
 class FakeCursor:
@@ -192,6 +217,94 @@ def test_get_lesson_steps_batch_error(monkeypatch, sb_store):
     assert result == {}
 
 
+def test_lesson_repository_does_not_cache_an_outage_as_missing(sb_store):
+    from utils.lesson_cache import LessonCache
+    from utils.lesson_repository import LessonRepository
+
+    class _DownSupabase:
+        def table(self, name):
+            raise ConnectionError("supabase down")
+
+    sb_store["step"] += [{"lesson_id": 12, "step_order": 1, "name": "N", "description": "D", "finish_criteria": "C"}]
+    ctx = DatabaseContextProvider()
+    working = ctx.sb
+    ctx.sb = _DownSupabase()
+    repo = LessonRepository(ctx, LessonCache(ttl_seconds=60), negative_ttl_seconds=60)
+
+    assert ctx.get_lesson_steps_batch(12) == {}
+    with pytest.raises(ConnectionError):
+        repo.get_steps(12)
+    assert repo.stats()["fetch_errors"] == 1
+
+    # Once Supabase is back the lesson loads instead of staying "not found"
+    ctx.sb = working
+    assert repo.get_steps(12)[1]["name"] == "N"
+
+
+def test_get_all_lesson_steps_pages_embedded_query(sb_store):
+    # Arrange: three lessons, fetched two per page
+    for lesson_id in (1, 2, 3):
+        sb_store["lesson"].append({"id": lesson_id, "lesson_order": lesson_id})
+        sb_store["step"].append({"lesson_id": lesson_id, "step_order": 1, "name": f"L{lesson_id}", "description": "D", "finish_criteria": None})
+    ctx = DatabaseContextProvider()
+
+    # Act
+    result = ctx.get_all_lesson_steps(page_size=2)
+
+    # Assert: every lesson loaded with its steps in two round trips
+    assert sorted(result) == [1, 2, 3]
+    assert result[3] == {1: {"name": "L3", "description": "D", "finish_criteria": "Step 1 completion criteria"}}
+    assert sb_store["_requests"] == [("lesson", "*,step(*)")] * 2
+
+
+def test_lesson_replica_serves_reads_locally_and_survives_outage(sb_store, tmp_path):
+    # Arrange
+    sb_store["lesson"].append({"id": 10, "lesson_order": 4, "updated_at": "2025-01-01"})
+    sb_store["step"].append({"lesson_id": 10, "step_order": 1, "name": "N", "description": "D", "finish_criteria": None, "updated_at": "2025-01-01"})
+    ctx = DatabaseContextProvider()
+    replica = LessonReplica(str(tmp_path / "replica.db"), ctx, full_refresh_seconds=3600)
+    ctx.attach_replica(replica)
+
+    # Act: initial full refresh, then an incremental pull of a newer step
+    assert replica.sync() is True
+    sb_store["step"].append({"lesson_id": 10, "step_order": 2, "name": "N2", "description": "D2", "finish_criteria": "Done", "updated_at": "2025-01-02"})
+    assert replica.sync() is True
+    sb_store["_requests"].clear()
+
+    # Assert: every read is answered without a Supabase request
+    assert ctx.get_lesson_id_by_order(4) == 10
+    assert ctx.get_step_by_order_and_lesson_order(step_order=2, lesson_order=4) == ("N2", "D2")
+    assert ctx.get_step_finish_criteria(step_order=1, lesson_id=10) == "Step 1 completion criteria"
+    assert ctx.get_lesson_steps_batch(10)[2]["finish_criteria"] == "Done"
+    assert sb_store["_requests"] == []
+    assert replica.stats()["full_refreshes"] == 1
+    assert replica.stats()["watermark"] == "2025-01-02"
+
+    # Supabase becomes unreachable: syncs fail but reads keep working
+    ctx.sb = None
+    assert replica.sync() is False
+    assert ctx.get_lesson_id_by_order(4) == 10
+
+
+def test_lesson_replica_pulls_rows_committed_later_with_the_watermark_timestamp(sb_store, tmp_path):
+    # Arrange: a first sync records the watermark
+    sb_store["lesson"].append({"id": 10, "lesson_order": 4, "updated_at": "2025-01-01"})
+    sb_store["step"].append({"lesson_id": 10, "step_order": 1, "name": "N", "description": "D", "finish_criteria": None, "updated_at": "2025-01-02"})
+    ctx = DatabaseContextProvider()
+    replica = LessonReplica(str(tmp_path / "replica.db"), ctx, full_refresh_seconds=3600)
+    ctx.attach_replica(replica)
+    assert replica.sync() is True
+
+    # Act: another transaction commits a step carrying the same timestamp
+    sb_store["step"].append({"lesson_id": 10, "step_order": 2, "name": "N2", "description": "D2", "finish_criteria": "Done", "updated_at": "2025-01-02"})
+    assert replica.sync() is True
+
+    # Assert: the late row is mirrored and the re-pulled row is not duplicated
+    assert replica.stats()["full_refreshes"] == 1
+    assert replica.stats()["watermark"] == "2025-01-02"
+    assert sorted(ctx.get_lesson_steps_batch(10)) == [1, 2]
+
+
 def test_get_step_by_order_and_lesson_found(sb_store):
     # Arrange
     sb_store["step"].append({"lesson_id": 2, "step_order": 1, "name": "Name", "description": "Desc"})
@@ -235,13 +348,56 @@ def test_get_step_by_order_and_lesson_order_found(sb_store):
     # Arrange
     sb_store["lesson"].append({"id": 10, "lesson_order": 4})
     sb_store["step"].append({"lesson_id": 10, "step_order": 3, "name": "JoinName", "description": "JoinDesc"})
+    sb_store["step"].append({"lesson_id": 10, "step_order": 4, "name": "Other", "description": "OtherDesc"})
     ctx = DatabaseContextProvider()
 
     # Act
     step_name, step_desc = ctx.get_step_by_order_and_lesson_order(step_order=3, lesson_order=4)
 
-    # Assert
+    # Assert: one embedded lesson+step query
     assert (step_name, step_desc) == ("JoinName", "JoinDesc")
+    assert len(sb_store["_requests"]) == 1
+
+
+def test_get_step_by_order_and_lesson_order_uses_cached_lesson_index(sb_store):
+    # Arrange
+    sb_store["lesson"].append({"id": 10, "lesson_order": 4})
+    sb_store["step"].append({"lesson_id": 10, "step_order": 3, "name": "JoinName", "description": "JoinDesc"})
+    sb_store["step"].append({"lesson_id": 10, "step_order": 4, "name": "Next", "description": "NextDesc"})
+    ctx = DatabaseContextProvider()
+    ctx.get_step_by_order_and_lesson_order(step_order=3, lesson_order=4)
+    sb_store["_requests"].clear()
+
+    # Act
+    result = ctx.get_step_by_order_and_lesson_order(step_order=4, lesson_order=4)
+    lesson_id = ctx.get_lesson_id_by_order(4)
+
+    # Assert: the step query is the only round trip; the lesson id comes from the index
+    assert result == ("Next", "NextDesc")
+    assert lesson_id == 10
+    assert sb_store["_requests"] == [("step", "name,description")]
+
+    ctx.forget_lesson_orders()
+    sb_store["_requests"].clear()
+    assert ctx.get_lesson_id_by_order(4) == 10
+    assert len(sb_store["_requests"]) == 1
+
+
+def test_get_lesson_id_by_order_is_cached(sb_store):
+    # Arrange
+    sb_store["lesson"].append({"id": 42, "lesson_order": 1})
+    ctx = DatabaseContextProvider()
+
+    # Act
+    first = ctx.get_lesson_id_by_order(1)
+    second = ctx.get_lesson_id_by_order(1)
+
+    # Assert: one round trip; misses are not cached
+    assert first == second == 42
+    assert len(sb_store["_requests"]) == 1
+    assert ctx.get_lesson_id_by_order(2) is None
+    assert ctx.get_lesson_id_by_order(2) is None
+    assert len(sb_store["_requests"]) == 3
 
 
 def test_get_step_by_order_and_lesson_order_not_found(sb_store):
@@ -0,0 +1,60 @@
+import os
+import sys
+import threading
+
+# Ensure backend path is importable
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils.frame_coordinator import LatestFrameCoordinator, SUPERSEDED  # noqa: E402
+
+
+def test_latest_frame_wins_while_analysis_runs():
+    coordinator = LatestFrameCoordinator()
+    release = threading.Event()
+    started = threading.Event()
+    results = {}
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "first"
+
+    def run(name, work):
+        results[name] = coordinator.run("u", work)
+
+    first = threading.Thread(target=run, args=("first", slow))
+    first.start()
+    started.wait(5)
+
+    # Two frames queue up behind the running one; only the newest survives
+    older = threading.Thread(target=run, args=("older", lambda: "older"))
+    older.start()
+    while coordinator._slots["u"].waiters < 1:
+        pass
+    newer = threading.Thread(target=run, args=("newer", lambda: "newer"))
+    newer.start()
+    older.join(5)
+    assert results["older"] is SUPERSEDED
+
+    release.set()
+    first.join(5)
+    newer.join(5)
+    assert results == {"first": "first", "older": SUPERSEDED, "newer": "newer"}
+    assert coordinator.superseded == 1
+    assert coordinator._slots == {}
+
+
+def test_different_users_do_not_block_each_other():
+    coordinator = LatestFrameCoordinator()
+    inner = {}
+
+    def outer():
+        inner["value"] = coordinator.run("b", lambda: "b")
+        return "a"
+
+    assert coordinator.run("a", outer) == "a"
+    assert inner["value"] == "b"
+
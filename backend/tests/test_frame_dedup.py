@@ -0,0 +1,82 @@
+import io
+import os
+import sys
+
+import pytest
+
+# Ensure backend path is importable
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils import frame_dedup  # noqa: E402
+from utils.frame_dedup import FrameDeduplicator, frame_fingerprint  # noqa: E402
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+
+def _ui_mock():
+    """1920x1080 app window: toolbar, sidebar, a text field and body text."""
+    img = Image.new("RGB", (1920, 1080), (240, 240, 240))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([0, 0, 1919, 40], fill=(60, 60, 70))
+    for i in range(12):
+        draw.rectangle([10 + i * 40, 4, 42 + i * 40, 36], fill=(90, 90, 100))
+    draw.rectangle([0, 41, 260, 1079], fill=(225, 225, 230))
+    draw.rectangle([400, 200, 900, 230], outline=(120, 120, 120), fill=(255, 255, 255))
+    for i in range(25):
+        draw.text((300, 300 + i * 24), "Lorem ipsum dolor sit amet " * 3, fill=(40, 40, 40))
+    return img
+
+
+def _jpeg(img, quality=70):
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _typed(img):
+    img = img.copy()
+    ImageDraw.Draw(img).text((405, 208), "a", fill=(0, 0, 0))
+    return img
+
+
+def _button_highlighted(img):
+    img = img.copy()
+    ImageDraw.Draw(img).rectangle([130, 4, 162, 36], fill=(70, 130, 220))
+    return img
+
+
+@pytest.mark.parametrize("change", [_typed, _button_highlighted])
+def test_small_ui_change_reaches_the_model(change):
+    dedup = FrameDeduplicator(max_skips=100, max_age_seconds=3600)
+    before = _ui_mock()
+    dedup.remember("u", "scope", frame_fingerprint(_jpeg(before)), "NO")
+
+    assert dedup.previous_verdict("u", "scope", frame_fingerprint(_jpeg(change(before)))) is None
+
+
+def test_unchanged_frame_reuses_verdict_despite_encoder_noise():
+    dedup = FrameDeduplicator(max_skips=100, max_age_seconds=3600)
+    frame = _ui_mock()
+    dedup.remember("u", "scope", frame_fingerprint(_jpeg(frame, quality=70)), "NO")
+
+    assert dedup.previous_verdict("u", "scope", frame_fingerprint(_jpeg(frame, quality=60))) == "NO"
+
+
+def test_remembered_verdict_is_reused_a_bounded_number_of_times(monkeypatch):
+    clock = {"now": 100.0}
+    monkeypatch.setattr(frame_dedup.time, "monotonic", lambda: clock["now"])
+    fingerprint = frame_fingerprint(_jpeg(_ui_mock()))
+
+    dedup = FrameDeduplicator(max_skips=2, max_age_seconds=3600)
+    dedup.remember("u", "scope", fingerprint, "NO")
+    assert [dedup.previous_verdict("u", "scope", fingerprint) for _ in range(3)] == ["NO", "NO", None]
+
+    dedup = FrameDeduplicator(max_skips=100, max_age_seconds=30)
+    dedup.remember("u", "scope", fingerprint, "NO")
+    assert dedup.previous_verdict("u", "scope", fingerprint) == "NO"
+    clock["now"] += 31
+    assert dedup.previous_verdict("u", "scope", fingerprint) is None
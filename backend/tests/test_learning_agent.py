@@ -30,10 +30,10 @@ class _FakeAgents:
     def __init__(self):
         self.messages = _FakeAgentsMessages()
 
-    def create(self, name, system, model, embedding, tools, include_base_tools):  # noqa: ARG002
-        # Return an object with an id field as expected by the code
+    def create(self, name, system, model, embedding, tools, include_base_tools, **settings):  # noqa: ARG002
+        # Return an object with an id field (and the requested settings) as expected by the code
         safe_id = str(name).lower().replace(" ", "_")
-        return types.SimpleNamespace(id=f"agent_{safe_id}")
+        return types.SimpleNamespace(id=f"agent_{safe_id}", **settings)
 
 
 class _FakeLetta:
@@ -73,16 +73,28 @@ sys.modules.setdefault("letta_client", fake_letta_mod)
 
 # Import after stubbing external dependency
 from utils import learning_agent as la  # noqa: E402
+from utils.database_context import db_context  # noqa: E402
+from utils.lesson_cache import lesson_cache  # noqa: E402
 
 
 @pytest.fixture(autouse=True)
-def reset_agent_state():
+def reset_agent_state(monkeypatch):
     """Reset in-memory caches between tests for isolation."""
-    la.lesson_cache.clear()
+    # No agent context unless a test provides it; keeps Supabase out of unit tests
+    monkeypatch.setattr(db_context, "get_relevant_context", lambda t, i: "")  # noqa: ARG005
+    lesson_cache.clear()
     la.user_state.clear()
+    la.frame_deduplicator.clear()
+    la.verdict_cache.clear()
+    la.agent_context.clear()
+    la.capture_pacer.forget("u")
     yield
-    la.lesson_cache.clear()
+    lesson_cache.clear()
     la.user_state.clear()
+    la.frame_deduplicator.clear()
+    la.verdict_cache.clear()
+    la.agent_context.clear()
+    la.capture_pacer.forget("u")
 
 
 @pytest.fixture
@@ -97,7 +109,7 @@ def test_analyze_screenshot_returns_yes(monkeypatch):
         return types.SimpleNamespace(messages=[types.SimpleNamespace(content="YES")])
 
     monkeypatch.setattr(la.client.agents.messages, "create", fake_create)
-    monkeypatch.setattr(la.db_context, "get_relevant_context", lambda t, i: "")  # noqa: ARG005
+    monkeypatch.setattr(db_context, "get_relevant_context", lambda t, i: "")  # noqa: ARG005
 
     # Act
     result = la.analyze_screenshot(base64_image="abc", finish_criteria="Click next", lesson_id="1")
@@ -106,6 +118,102 @@ def test_analyze_screenshot_returns_yes(monkeypatch):
     assert result.strip() == "YES"
 
 
+@pytest.mark.parametrize("criteria,fast_answer,expected_agents,route", [
+    ("A blue rectangle appears", "yes", ["screener"], "fast"),
+    ("A blue rectangle appears", "UNSURE", ["screener", "decider"], "escalated_unsure"),
+    ("[hard] The chart shows a moving average", "YES", ["decider"], "hard"),
+])
+def test_analyze_screenshot_cascade(monkeypatch, criteria, fast_answer, expected_agents, route):
+    asked = []
+
+    def fake_create(agent_id, messages):
+        tier = "screener" if "screener" in agent_id else "decider"
+        asked.append(tier)
+        assert "[hard]" not in messages[0].content[1].text
+        return types.SimpleNamespace(messages=[types.SimpleNamespace(content=fast_answer if tier == "screener" else "NO")])
+
+    router = la.completion_router.__class__(enabled=True)
+    pacer = la.capture_pacer.__class__(queue_load=lambda: 0.0)
+    monkeypatch.setattr(la, "completion_router", router)
+    monkeypatch.setattr(la, "capture_pacer", pacer)
+    monkeypatch.setattr(la.client.agents.messages, "create", fake_create)
+
+    result = la.analyze_screenshot(base64_image="YWJj", finish_criteria=criteria, user_id="u")
+
+    assert asked == expected_agents
+    assert result == ("YES" if route == "fast" else "NO")
+    assert router.stats()["routes"] == {route: 1}
+    # Each model call is counted against the budget, labelled with its tier
+    tiers = {"screener": "fast", "decider": "strong"}
+    assert sorted(tier for _, tier in pacer._model_calls) == sorted(tiers[agent] for agent in expected_agents)
+
+
+def test_analyze_screenshot_uses_verdict_cache(monkeypatch):
+    calls = {"count": 0}
+
+    def fake_create(agent_id, messages):  # noqa: ARG001
+        calls["count"] += 1
+        return types.SimpleNamespace(messages=[types.SimpleNamespace(content="NO")])
+
+    monkeypatch.setattr(la.client.agents.messages, "create", fake_create)
+    monkeypatch.setattr(db_context, "get_relevant_context", lambda t, i: "")  # noqa: ARG005
+
+    first = la.analyze_screenshot(base64_image="YWJj", finish_criteria="Click  Next", lesson_id="1")
+    # Same bytes (with a data URL prefix) and equivalent criteria hit the cache
+    second = la.analyze_screenshot(base64_image="data:image/png;base64,YWJj", finish_criteria="click next")
+    third = la.analyze_screenshot(base64_image="YWJj", finish_criteria="Something else")
+
+    assert first == second == third == "NO"
+    assert calls["count"] == 2
+    assert la.verdict_cache.stats()["hits"] == 1
+
+
+def test_verdict_cache_evicts_lru_and_expired():
+    from utils.verdict_cache import VerdictCache
+
+    cache = VerdictCache(max_entries=2, ttl_seconds=60, max_bytes=1 << 20)
+    cache.put(("a", "c"), "YES")
+    cache.put(("b", "c"), "NO")
+    assert cache.get(("a", "c")) == "YES"  # a becomes most recently used
+    cache.put(("c", "c"), "NO")  # evicts b
+    assert cache.get(("b", "c")) is None
+    assert cache.stats()["evictions"] == 1
+
+    expired = VerdictCache(max_entries=2, ttl_seconds=0, max_bytes=1 << 20)
+    expired.put(("a", "c"), "YES")
+    assert expired.get(("a", "c")) is None
+
+    # Errors are never cached
+    cache.put(("d", "c"), "ERROR")
+    assert cache.get(("d", "c")) is None
+
+
+def test_analyze_screenshot_sends_prepared_image(monkeypatch):
+    pytest.importorskip("PIL")
+    import base64
+    import io
+    from PIL import Image
+
+    sent = {}
+
+    def fake_create(agent_id, messages):  # noqa: ARG001
+        sent["source"] = messages[0].content[0].source
+        return types.SimpleNamespace(messages=[types.SimpleNamespace(content="YES")])
+
+    monkeypatch.setattr(la.client.agents.messages, "create", fake_create)
+    monkeypatch.setattr(db_context, "get_relevant_context", lambda t, i: "")  # noqa: ARG005
+    monkeypatch.setattr(la.image_preparer, "max_edge", 640)
+    monkeypatch.setattr(la.image_preparer, "image_format", "jpeg")
+
+    buf = io.BytesIO()
+    Image.effect_noise((2560, 1440), 64).convert("RGB").save(buf, format="PNG")
+    la.analyze_screenshot(base64.b64encode(buf.getvalue()).decode("ascii"), "Crit")
+
+    assert sent["source"]["media_type"] == "image/jpeg"
+    with Image.open(io.BytesIO(base64.b64decode(sent["source"]["data"]))) as out:
+        assert max(out.size) == 640
+
+
 def test_generate_and_send_popup_message_calls_websocket(monkeypatch):
     # Arrange: capture what is sent; function now uses step_description directly
     sent = {}
@@ -141,6 +249,24 @@ def test_send_popup_via_websocket_success_and_failure(monkeypatch):
     assert la.send_popup_via_websocket("msg") is False
 
 
+def test_send_popup_via_websocket_uses_injected_emitter(monkeypatch):
+    from utils.popup_dispatcher import PopupDispatcher, PopupEmitter
+
+    class _RecordingEmitter(PopupEmitter):
+        def __init__(self):
+            self.sent = []
+
+        def emit(self, popup_data):
+            self.sent.append(popup_data)
+            return True
+
+    emitter = _RecordingEmitter()
+    monkeypatch.setattr(la, "popup_dispatcher", PopupDispatcher(emitter))
+
+    assert la.send_popup_via_websocket("msg", "u1") is True
+    assert [(p["message"], p["user_id"], p["type"]) for p in emitter.sent] == [("msg", "u1", "popup")]
+
+
 def test__ensure_lesson_loaded_caches(monkeypatch):
     calls = {"count": 0}
 
@@ -148,7 +274,7 @@ def test__ensure_lesson_loaded_caches(monkeypatch):
         calls["count"] += 1
         return {1: {"name": "N", "description": "D", "finish_criteria": "C"}}
 
-    monkeypatch.setattr(la.db_context, "get_lesson_steps_batch", fake_batch)
+    monkeypatch.setattr(db_context, "fetch_lesson_steps", fake_batch)
 
     first = la._ensure_lesson_loaded(lesson_id=7)
     second = la._ensure_lesson_loaded(lesson_id=7)
@@ -157,12 +283,89 @@ def test__ensure_lesson_loaded_caches(monkeypatch):
     assert calls["count"] == 1  # Only loaded once
 
 
+def test_agent_context_is_computed_once_per_lesson_until_invalidated(monkeypatch):
+    calls = []
+
+    def fake_context(context_type, identifier):
+        calls.append((context_type, identifier))
+        return f"Additional Context:\n- lesson: {identifier}\n"
+
+    monkeypatch.setattr(db_context, "get_relevant_context", fake_context)
+
+    assert la.agent_context.lesson_context(3) == "Additional Context:\n- lesson: 3\n"
+    la.agent_context.lesson_context(3)
+    assert calls == [("lesson", "3")]
+
+    # Regenerating the lesson drops its cached context
+    lesson_cache.invalidate(3)
+    la.agent_context.lesson_context(3)
+    assert len(calls) == 2
+
+    # User context is cached too, and dropped whenever the user's progress changes
+    la.agent_context.user_context("u")
+    la.agent_context.user_context("u")
+    la.progress_writer.record("u", 3, 2)
+    la.agent_context.user_context("u")
+    assert calls[2:] == [("user", "u"), ("user", "u")]
+
+
+def test_agent_context_does_not_keep_empty_lookups(monkeypatch):
+    from utils.agent_context import AgentContextCache
+
+    calls = []
+    clock = {"now": 100.0}
+
+    def fake_context(context_type, identifier):
+        calls.append(identifier)
+        # First lookup fails (the provider reports failures as no context), later ones succeed
+        return "" if len(calls) == 1 else "Additional Context:\n- lesson: 5\n"
+
+    monkeypatch.setattr(db_context, "get_relevant_context", fake_context)
+    monkeypatch.setattr("utils.agent_context.time.monotonic", lambda: clock["now"])
+    cache = AgentContextCache(db_context, empty_ttl_seconds=30)
+
+    assert cache.lesson_context(5) == ""
+    assert cache.lesson_context(5) == ""
+    assert len(calls) == 1
+
+    # Once the empty entry expires the lesson is fetched again, and the real context is kept
+    clock["now"] += 31
+    assert cache.lesson_context(5) == "Additional Context:\n- lesson: 5\n"
+    clock["now"] += 3600
+    cache.lesson_context(5)
+    assert len(calls) == 2
+
+
+def test_lesson_cache_is_bounded_and_invalidatable():
+    from utils.lesson_cache import LessonCache
+
+    steps = {1: {"name": "N", "description": "D", "finish_criteria": "C"}}
+    cache = LessonCache(max_entries=2, max_bytes=1 << 20, ttl_seconds=60)
+    cache.put(1, steps)
+    cache.put(2, steps)
+    cache.get(1)
+    cache.put(3, steps)  # evicts lesson 2, the least recently used
+
+    assert cache.get(2) is None
+    assert cache.get(1) == steps
+    assert cache.stats()["bytes"] > 0
+
+    cache.invalidate(1)
+    assert 1 not in cache
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+    expired = LessonCache(max_entries=2, max_bytes=1 << 20, ttl_seconds=0)
+    expired.put(1, steps)
+    assert expired.get(1) is None
+
+
 def test_handle_screenshot_event_popup_then_not_completed_then_completed(monkeypatch):
     # Arrange lesson data
     lesson_data = {
         1: {"name": "S1", "description": "Do A", "finish_criteria": "Crit"},
     }
-    monkeypatch.setattr(la.db_context, "get_lesson_steps_batch", lambda lesson_id: lesson_data)  # noqa: ARG005
+    monkeypatch.setattr(db_context, "fetch_lesson_steps", lambda lesson_id: lesson_data)  # noqa: ARG005
 
     # First call should send popup
     monkeypatch.setattr(la, "generate_and_send_popup_message", lambda img, desc, user_id=None: "Popup")  # noqa: ARG005
@@ -171,12 +374,12 @@ def test_handle_screenshot_event_popup_then_not_completed_then_completed(monkeyp
     assert out1["step_order"] == 1
 
     # Second call not completed
-    monkeypatch.setattr(la, "analyze_screenshot", lambda img, crit, lesson_id=None: "NO")  # noqa: ARG005
+    monkeypatch.setattr(la, "analyze_screenshot", lambda img, crit, lesson_id=None, user_id=None: "NO")  # noqa: ARG005
     out2 = la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image="img")
     assert out2["completed"] is False
 
     # Third call completed -> lesson_completed (no next step exists)
-    monkeypatch.setattr(la, "analyze_screenshot", lambda img, crit, lesson_id=None: "YES")  # noqa: ARG005
+    monkeypatch.setattr(la, "analyze_screenshot", lambda img, crit, lesson_id=None, user_id=None: "YES")  # noqa: ARG005
     out3 = la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image="img")
     assert out3["completed"] is True
     assert out3["lesson_completed"] is True
@@ -188,9 +391,9 @@ def test_execute_learning_flow_completes_lesson(monkeypatch, no_sleep):
         1: {"name": "S1", "description": "D1", "finish_criteria": "C1"},
         2: {"name": "S2", "description": "D2", "finish_criteria": "C2"},
     }
-    monkeypatch.setattr(la.db_context, "get_lesson_steps_batch", lambda lesson_id: steps)  # noqa: ARG005
+    monkeypatch.setattr(db_context, "fetch_lesson_steps", lambda lesson_id: steps)  # noqa: ARG005
     monkeypatch.setattr(la, "generate_and_send_popup_message", lambda img, desc, user_id=None: "Popup")  # noqa: ARG005
-    monkeypatch.setattr(la, "analyze_screenshot", lambda img, crit, lesson_id=None: "YES")  # noqa: ARG005
+    monkeypatch.setattr(la, "analyze_screenshot", lambda img, crit, lesson_id=None, user_id=None: "YES")  # noqa: ARG005
 
     # Act
     result = la.execute_learning_flow(lesson_id=1, step_order=1, base64_image="img", user_id=None)
@@ -201,9 +404,173 @@ def test_execute_learning_flow_completes_lesson(monkeypatch, no_sleep):
 
 def test_handle_screenshot_event_missing_step_returns_error(monkeypatch):
     # No steps for the lesson
-    monkeypatch.setattr(la.db_context, "get_lesson_steps_batch", lambda lesson_id: {})  # noqa: ARG005
+    monkeypatch.setattr(db_context, "fetch_lesson_steps", lambda lesson_id: {})  # noqa: ARG005
     out = la.handle_screenshot_event(user_id="u", lesson_id=123, step_order=9, base64_image="img")
     assert out["completed"] is False
     assert "error" in out
 
 
+def _png_base64(box):
+    import base64
+    import io
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (64, 48), "white")
+    ImageDraw.Draw(img).rectangle(box, fill="black")
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def test_handle_screenshot_event_skips_unchanged_frames(monkeypatch):
+    pytest.importorskip("PIL")
+    lesson_data = {
+        1: {"name": "S1", "description": "Do A", "finish_criteria": "Crit"},
+    }
+    monkeypatch.setattr(db_context, "fetch_lesson_steps", lambda lesson_id: lesson_data)  # noqa: ARG005
+    monkeypatch.setattr(la, "generate_and_send_popup_message", lambda img, desc, user_id=None: "Popup")  # noqa: ARG005
+    calls = {"count": 0}
+
+    def fake_analyze(img, crit, lesson_id=None, user_id=None):  # noqa: ARG001
+        calls["count"] += 1
+        return "NO"
+
+    monkeypatch.setattr(la, "analyze_screenshot", fake_analyze)
+    idle = _png_base64([8, 8, 40, 30])
+
+    la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image=idle)  # popup
+    first = la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image=idle)
+    second = la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image=idle)
+
+    assert "skipped" not in first
+    assert second["skipped"] == "unchanged"
+    assert second["completed"] is False
+    assert calls["count"] == 1
+
+    # A visibly different frame is analyzed again
+    changed = _png_base64([30, 20, 60, 44])
+    third = la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image=changed)
+    assert "skipped" not in third
+    assert calls["count"] == 2
+
+
+def test_handle_screenshot_event_returns_capture_hint(monkeypatch):
+    lesson_data = {
+        1: {"name": "S1", "description": "Do A", "finish_criteria": "Crit"},
+    }
+    monkeypatch.setattr(db_context, "fetch_lesson_steps", lambda lesson_id: lesson_data)  # noqa: ARG005
+    monkeypatch.setattr(la, "send_popup_via_websocket", lambda message, user_id=None: True)  # noqa: ARG005
+    monkeypatch.setattr(la, "analyze_screenshot", lambda img, crit, lesson_id=None, user_id=None: "NO")  # noqa: ARG005
+    pacer = la.capture_pacer
+
+    # Right after the popup the client is asked to capture faster than on an idle screen
+    after_popup = la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image="img")
+    monkeypatch.setattr(pacer, "popup_boost_seconds", 0)
+    for _ in range(10):
+        pacer.record_frame("u", changed=False)
+    idle = pacer.next_capture_after_ms("u")
+
+    assert after_popup["next_capture_after_ms"] < idle <= pacer.max_ms
+
+
+@pytest.mark.parametrize("answer,expected", [
+    ("1: NO\n2: YES\n3: NO", [False, True, False]),
+    ("**Step 1**: yes\n- 2. No", [True, False, None]),
+    ("YES", [None, None, None]),
+    ("1: YES\n7: YES", [True, None, None]),
+    ("I think so", [None, None, None]),
+    (None, [None, None, None]),
+])
+def test_parse_step_verdicts(answer, expected):
+    assert la._parse_step_verdicts(answer, 3) == expected
+
+
+def test_lookahead_advances_to_furthest_completed_step(monkeypatch):
+    lesson_data = {order: {"name": f"S{order}", "description": f"D{order}", "finish_criteria": f"C{order}"} for order in range(1, 6)}
+    monkeypatch.setattr(db_context, "fetch_lesson_steps", lambda lesson_id: lesson_data)  # noqa: ARG005
+    monkeypatch.setattr(la, "generate_and_send_popup_message", lambda img, desc, user_id=None: "Popup")  # noqa: ARG005
+    monkeypatch.setattr(la, "COMPLETION_LOOKAHEAD_STEPS", 2)
+    monkeypatch.setattr(la, "analyze_screenshot", lambda *a, **k: pytest.fail("single-step check used"))  # noqa: ARG005
+    checked = []
+
+    def fake_steps(img, criteria, lesson_id=None, user_id=None):  # noqa: ARG001
+        checked.append(criteria)
+        # Step 1's result has scrolled away but step 2 is visibly done
+        return [False, True, False]
+
+    monkeypatch.setattr(la, "analyze_screenshot_steps", fake_steps)
+
+    la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image="img")  # popup
+    out = la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image="img")
+
+    assert checked == [["C1", "C2", "C3"]]
+    assert out["completed"] is True
+    assert out["next_step_order"] == 3
+    assert out["steps_completed"] == 2
+    assert la.user_state.get("u")["step_order"] == 3
+
+
+def test_lookahead_completes_lesson_from_an_earlier_step(monkeypatch):
+    lesson_data = {order: {"name": f"S{order}", "description": f"D{order}", "finish_criteria": f"C{order}"} for order in range(1, 3)}
+    monkeypatch.setattr(db_context, "fetch_lesson_steps", lambda lesson_id: lesson_data)  # noqa: ARG005
+    monkeypatch.setattr(la, "generate_and_send_popup_message", lambda img, desc, user_id=None: "Popup")  # noqa: ARG005
+    monkeypatch.setattr(la, "COMPLETION_LOOKAHEAD_STEPS", 3)
+    monkeypatch.setattr(la, "analyze_screenshot_steps", lambda img, criteria, lesson_id=None, user_id=None: [True, True])  # noqa: ARG005
+
+    la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image="img")
+    out = la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image="img")
+
+    assert out["lesson_completed"] is True
+    assert la.user_state.get("u") is None
+
+
+def test_analyze_screenshot_steps_makes_one_structured_call(monkeypatch):
+    prompts = []
+
+    def fake_create(agent_id, messages):  # noqa: ARG001
+        prompts.append(messages[0].content[1].text)
+        return types.SimpleNamespace(messages=[types.SimpleNamespace(content="1: YES\n2: YES\n3: NO")])
+
+    monkeypatch.setattr(la.client.agents.messages, "create", fake_create)
+
+    criteria = ["Open the menu", "[hard] Pick the right layer", "Save"]
+    assert la.analyze_screenshot_steps("YWJj", criteria, user_id="u") == [True, True, False]
+    assert la.analyze_screenshot_steps("YWJj", criteria, user_id="u") == [True, True, False]
+
+    # The per-step verdicts also answer single-step checks of the same frame
+    assert la.analyze_screenshot("YWJj", "Save", user_id="u") == "NO"
+
+    assert len(prompts) == 1
+    assert "1. Open the menu\n2. Pick the right layer\n3. Save" in prompts[0]
+
+
+def test_lookahead_unanswered_criteria_are_not_cached_as_no(monkeypatch):
+    replies = iter(["1: NO", "YES"])
+    prompts = []
+
+    def fake_create(agent_id, messages):  # noqa: ARG001
+        prompts.append(messages[0].content[1].text)
+        return types.SimpleNamespace(messages=[types.SimpleNamespace(content=next(replies))])
+
+    monkeypatch.setattr(la.client.agents.messages, "create", fake_create)
+
+    assert la.analyze_screenshot_steps("YWJj", ["Open the menu", "Save"], user_id="u") == [False, None]
+    # Step 2 was never answered, so a single-step check still asks the model
+    assert la.analyze_screenshot("YWJj", "Save", user_id="u") == "YES"
+    assert len(prompts) == 2
+
+
+def test_lookahead_falls_back_to_single_step_when_current_step_unanswered(monkeypatch):
+    lesson_data = {order: {"name": f"S{order}", "description": f"D{order}", "finish_criteria": f"C{order}"} for order in range(1, 4)}
+    monkeypatch.setattr(db_context, "fetch_lesson_steps", lambda lesson_id: lesson_data)  # noqa: ARG005
+    monkeypatch.setattr(la, "generate_and_send_popup_message", lambda img, desc, user_id=None: "Popup")  # noqa: ARG005
+    monkeypatch.setattr(la, "COMPLETION_LOOKAHEAD_STEPS", 2)
+    monkeypatch.setattr(la, "analyze_screenshot_steps", lambda img, criteria, lesson_id=None, user_id=None: [None, False, None])  # noqa: ARG005
+    single = []
+    monkeypatch.setattr(la, "analyze_screenshot", lambda img, crit, lesson_id=None, user_id=None: single.append(crit) or "YES")  # noqa: ARG005
+
+    la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image="img")
+    out = la.handle_screenshot_event(user_id="u", lesson_id=1, step_order=1, base64_image="img")
+
+    assert single == ["C1"]
+    assert out["next_step_order"] == 2
@@ -0,0 +1,89 @@
+import os
+import sys
+import threading
+import time
+
+# Ensure backend path is importable
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils.lesson_cache import LessonCache  # noqa: E402
+from utils.lesson_repository import LessonRepository  # noqa: E402
+
+STEPS = {1: {"name": "N", "description": "D", "finish_criteria": "C"}}
+
+
+class _CountingDb:
+    def __init__(self, result, delay=0.0):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+
+    def fetch_lesson_steps(self, lesson_id):  # noqa: ARG002
+        self.calls += 1
+        time.sleep(self.delay)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def _load_concurrently(repo, lesson_id, n=8):
+    outcomes = []
+    threads = [threading.Thread(target=lambda: outcomes.append(_outcome(repo, lesson_id))) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+def _outcome(repo, lesson_id):
+    try:
+        return repo.get_steps(lesson_id)
+    except Exception as e:
+        return e
+
+
+def test_concurrent_misses_fetch_once():
+    db = _CountingDb(STEPS, delay=0.2)
+    repo = LessonRepository(db, LessonCache(ttl_seconds=60))
+
+    assert _load_concurrently(repo, 3) == [STEPS] * 8
+    assert db.calls == 1
+    stats = repo.stats()
+    assert stats["remote_fetches"] == 1
+    assert stats["coalesced"] == 7
+    assert stats["in_flight"] == 0
+    assert repo.get_step(3, 1) == STEPS[1]
+    assert repo.get_step(3, 2) is None
+
+
+def test_empty_lessons_are_negatively_cached():
+    db = _CountingDb({})
+    repo = LessonRepository(db, LessonCache(ttl_seconds=60), negative_ttl_seconds=60)
+    assert repo.get_steps(9) == {}
+    assert repo.get_steps(9) == {}
+    assert db.calls == 1
+
+    expiring = LessonRepository(db, LessonCache(ttl_seconds=60), negative_ttl_seconds=0)
+    expiring.get_steps(9)
+    expiring.get_steps(9)
+    assert db.calls == 3
+
+
+def test_concurrent_misses_share_the_fetch_error():
+    db = _CountingDb(RuntimeError("supabase down"), delay=0.2)
+    repo = LessonRepository(db, LessonCache(ttl_seconds=60))
+
+    outcomes = _load_concurrently(repo, 4)
+    assert len(outcomes) == 8
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+    assert db.calls == 1
+    assert repo.stats()["fetch_errors"] == 1
+
+    # Errors are not cached; the next caller retries
+    db.result = STEPS
+    assert repo.get_steps(4) == STEPS
+    assert db.calls == 2
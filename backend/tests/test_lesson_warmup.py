@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+
+# Ensure backend path is importable
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils.lesson_cache import LessonCache  # noqa: E402
+from utils.lesson_warmup import LessonWarmup  # noqa: E402
+
+STEPS = {1: {"name": "N", "description": "D", "finish_criteria": "C"}}
+
+
+class _BulkDb:
+    def __init__(self, lessons=None, error=None):
+        self.lessons = lessons or {}
+        self.error = error
+
+    def get_all_lesson_steps(self, page_size=100):  # noqa: ARG002
+        if self.error:
+            raise self.error
+        return self.lessons
+
+
+def _warmup(monkeypatch, db, cache, path):
+    monkeypatch.setenv("LESSON_WARMUP_ENABLED", "true")
+    return LessonWarmup(db, cache, snapshot_path=str(path))
+
+
+def test_warmup_fills_cache_and_writes_snapshot(monkeypatch, tmp_path):
+    cache = LessonCache(ttl_seconds=60)
+    warmup = _warmup(monkeypatch, _BulkDb({5: STEPS, 6: {}}), cache, tmp_path / "snap.json")
+    assert warmup.ready is False
+
+    warmup.start(background=False)
+
+    assert warmup.ready is True
+    assert warmup.stats()["status"] == "warm"
+    assert cache.get(5) == STEPS
+    assert 6 not in cache
+    assert json.loads((tmp_path / "snap.json").read_text())["lessons"]["5"]["1"]["name"] == "N"
+
+
+def test_restart_serves_snapshot_when_refresh_fails(monkeypatch, tmp_path):
+    path = tmp_path / "snap.json"
+    _warmup(monkeypatch, _BulkDb({5: STEPS}), LessonCache(ttl_seconds=60), path).start(background=False)
+
+    cache = LessonCache(ttl_seconds=60)
+    warmup = _warmup(monkeypatch, _BulkDb(error=RuntimeError("down")), cache, path)
+    warmup.start()
+    assert warmup.wait(timeout=5)
+
+    stats = warmup.stats()
+    assert stats["lessons_from_snapshot"] == 1
+    assert stats["status"] == "failed"
+    assert cache.get(5) == STEPS
+
+
+def test_disabled_warmup_is_ready_immediately(monkeypatch, tmp_path):
+    monkeypatch.setenv("LESSON_WARMUP_ENABLED", "false")
+    warmup = LessonWarmup(_BulkDb(), LessonCache(), snapshot_path=str(tmp_path / "snap.json"))
+    warmup.start()
+    assert warmup.ready is True
+    assert warmup.stats()["status"] == "disabled"
+
+
+def test_warmup_grows_cache_to_fit_every_lesson(monkeypatch, tmp_path):
+    lessons = {lesson_id: STEPS for lesson_id in range(1, 11)}
+    cache = LessonCache(max_entries=4, ttl_seconds=60)
+    warmup = _warmup(monkeypatch, _BulkDb(lessons), cache, tmp_path / "snap.json")
+
+    warmup.start(background=False)
+
+    assert cache.max_entries == 10
+    assert all(lesson_id in cache for lesson_id in lessons)
+    assert cache.stats()["evictions"] == 0
@@ -0,0 +1,211 @@
+import importlib
+import inspect
+import json
+import os
+import sys
+import types
+
+import pytest
+
+# Ensure backend path is importable
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils.completion_context import CompletionContextPolicy  # noqa: E402
+from utils.letta_agents import LettaAgentHandle  # noqa: E402
+
+
+class _Agents:
+    def __init__(self, existing=None, fail=False):
+        self.existing = existing or {}
+        self.fail = fail
+        self.calls = []
+        self.settings = {}
+
+    def retrieve(self, agent_id):
+        self.calls.append(("retrieve", agent_id))
+        if agent_id not in self.existing.values():
+            raise LookupError(agent_id)
+        return types.SimpleNamespace(id=agent_id, message_buffer_autoclear=None)
+
+    def list(self, name, limit):  # noqa: ARG002
+        self.calls.append(("list", name))
+        if self.fail:
+            raise ConnectionError("letta down")
+        return [types.SimpleNamespace(id=self.existing[name], message_buffer_autoclear=None)] if name in self.existing else []
+
+    def create(self, name, **kwargs):  # noqa: ARG002
+        self.calls.append(("create", name))
+        if self.fail:
+            raise ConnectionError("letta down")
+        self.existing[name] = f"agent-{len(self.existing) + 1}"
+        self.settings[self.existing[name]] = kwargs
+        return types.SimpleNamespace(id=self.existing[name], **kwargs)
+
+    def modify(self, agent_id, **kwargs):
+        self.calls.append(("modify", agent_id, kwargs))
+        self.settings.setdefault(agent_id, {}).update(kwargs)
+        return types.SimpleNamespace(id=agent_id, **self.settings[agent_id])
+
+
+def _handle(agents, **kwargs):
+    client = types.SimpleNamespace(agents=agents)
+    return LettaAgentHandle("Decider", client_factory=lambda: client, system="s", **kwargs)
+
+
+def test_nothing_is_resolved_until_first_use():
+    agents = _Agents()
+    handle = _handle(agents)
+    assert agents.calls == []
+    assert handle.status()["available"] is False
+
+    assert handle.id == "agent-1"
+    handle.get()
+    assert agents.calls == [("list", "Decider"), ("create", "Decider")]
+    assert handle.status()["source"] == "created"
+
+
+def test_existing_agent_is_reused_by_name_and_saved_id(monkeypatch, tmp_path):
+    monkeypatch.setenv("LETTA_AGENT_STATE_PATH", str(tmp_path / "agents.json"))
+    agents = _Agents(existing={"Decider": "agent-7"})
+
+    assert _handle(agents).id == "agent-7"
+    assert ("create", "Decider") not in agents.calls
+    assert json.loads((tmp_path / "agents.json").read_text()) == {"Decider": "agent-7"}
+
+    # Next boot goes straight to the saved id
+    agents.calls.clear()
+    restarted = _handle(agents)
+    assert restarted.id == "agent-7"
+    assert agents.calls == [("retrieve", "agent-7")]
+    assert restarted.status()["source"] == "configured_id"
+
+
+def test_unavailable_letta_is_reported_not_raised_at_warmup():
+    handle = _handle(_Agents(fail=True))
+    handle.warm(background=False)
+
+    status = handle.status()
+    assert status["available"] is False
+    assert "letta down" in status["error"]
+    with pytest.raises(ConnectionError):
+        handle.get()
+
+
+def test_enforced_settings_are_created_with_and_patched_onto_reused_agents():
+    settings = CompletionContextPolicy(mode="autoclear").agent_settings()
+    agents = _Agents()
+    _handle(agents, enforce=settings).get()
+    assert agents.settings["agent-1"]["message_buffer_autoclear"] is True
+    assert not any(call[0] == "modify" for call in agents.calls)
+
+    # An agent created before the setting existed is updated once on resolution
+    legacy = _Agents(existing={"Decider": "agent-7"})
+    _handle(legacy, enforce=settings).get()
+    assert ("modify", "agent-7", {"message_buffer_autoclear": True}) in legacy.calls
+
+
+class _Messages:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.resets = []
+
+    def reset(self, agent_id, add_default_initial_messages):  # noqa: ARG002
+        if self.fail:
+            raise ConnectionError("letta down")
+        self.resets.append(agent_id)
+
+
+def _client(messages):
+    return types.SimpleNamespace(agents=types.SimpleNamespace(messages=messages))
+
+
+@pytest.mark.parametrize("mode,calls,expected_resets", [
+    ("autoclear", 10, 0),
+    ("stateful", 10, 0),
+    ("reset", 10, 10),
+    ("window", 10, 3),
+])
+def test_history_is_reset_according_to_mode(mode, calls, expected_resets):
+    policy = CompletionContextPolicy(mode=mode, window=3)
+    messages = _Messages()
+    for _ in range(calls):
+        policy.after_call(_client(messages), "agent-1")
+    assert len(messages.resets) == expected_resets
+    assert policy.stats()["resets"] == expected_resets
+    assert policy.agent_settings()["message_buffer_autoclear"] is (mode == "autoclear")
+
+
+def test_failed_reset_is_counted_not_raised():
+    policy = CompletionContextPolicy(mode="reset")
+    policy.after_call(_client(_Messages(fail=True)), "agent-1")
+    assert policy.stats()["reset_errors"] == 1
+
+
+@pytest.fixture
+def real_letta_client(monkeypatch):
+    """The installed letta_client, even when another test module stubbed it in sys.modules."""
+    for name in [m for m in sys.modules if m == "letta_client" or m.startswith("letta_client.")]:
+        monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module("letta_client")
+
+
+class _StrictAgents:
+    """Agents API that binds every call against the installed letta_client signatures."""
+
+    def __init__(self, agent, agents_client):
+        self._signatures = {name: inspect.signature(getattr(agents_client, name)) for name in ("create", "modify")}
+        self.agent = agent
+        self.calls = []
+
+    def _check(self, method, *args, **kwargs):
+        # Raises TypeError on keyword arguments the real client does not accept
+        self._signatures[method].bind(None, *args, **kwargs)
+        self.calls.append((method, kwargs))
+
+    def retrieve(self, agent_id):  # noqa: ARG002
+        return self.agent
+
+    def create(self, **kwargs):
+        self._check("create", **kwargs)
+        return self.agent
+
+    def modify(self, agent_id, **kwargs):
+        self._check("modify", agent_id, **kwargs)
+        return self.agent
+
+
+def test_context_window_limit_is_applied_through_llm_config(real_letta_client):
+    AgentState = real_letta_client.AgentState
+    policy = CompletionContextPolicy(mode="autoclear", context_window_limit=8000)
+    agent = AgentState.construct(
+        id="agent-7",
+        name="Decider",
+        message_buffer_autoclear=False,
+        llm_config={"model": "gpt-4o", "model_endpoint_type": "openai", "context_window": 128000},
+    )
+    agents = _StrictAgents(agent, importlib.import_module("letta_client.agents.client").AgentsClient)
+    client = types.SimpleNamespace(agents=agents)
+    handle = LettaAgentHandle(
+        "Decider", agent_id="agent-7", client_factory=lambda: client,
+        enforce=policy.agent_settings(), system="s", **policy.create_settings(),
+    )
+
+    handle.get()
+
+    (method, kwargs), = agents.calls
+    assert method == "modify"
+    assert kwargs["message_buffer_autoclear"] is True
+    assert kwargs["llm_config"].context_window == 8000
+    assert "context_window_limit" not in kwargs
+
+
+def test_context_window_limit_is_passed_on_create(real_letta_client):  # noqa: ARG001
+    AgentsClient = importlib.import_module("letta_client.agents.client").AgentsClient
+
+    policy = CompletionContextPolicy(mode="window", context_window_limit=8000)
+    kwargs = {"name": "Decider", "system": "s", **policy.agent_settings(), **policy.create_settings()}
+    inspect.signature(AgentsClient.create).bind(None, **kwargs)
+    assert kwargs["context_window_limit"] == 8000
@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+
+# Ensure backend path is importable
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils.progress_writer import ProgressWriter  # noqa: E402
+from utils.session_store import InMemorySessionStore  # noqa: E402
+
+
+class _FakeDb:
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.batches = []
+
+    def upsert_user_progress_batch(self, rows):
+        self.batches.append(rows)
+        return self.ok
+
+
+def _writer(db, tmp_path, **kwargs):
+    return ProgressWriter(db, journal_path=str(tmp_path / "progress.jsonl"), flush_interval_seconds=60, enabled=True, **kwargs)
+
+
+def test_records_are_coalesced_into_one_bulk_upsert(tmp_path):
+    db = _FakeDb()
+    writer = _writer(db, tmp_path)
+    writer.record("u1", 1, 2)
+    writer.record("u1", 1, 3)
+    writer.record("u2", 1, 2)
+
+    assert writer.flush() is True
+    assert len(db.batches) == 1
+    assert sorted((r["user_id"], r["step_order"]) for r in db.batches[0]) == [("u1", 3), ("u2", 2)]
+    assert writer.stats()["pending"] == 0
+    assert not os.path.exists(writer.journal_path)
+    assert not os.path.exists(f"{writer.journal_path}.flushing")
+
+
+def test_failed_flush_keeps_records_and_journal(tmp_path):
+    db = _FakeDb(ok=False)
+    writer = _writer(db, tmp_path)
+    writer.record("u1", 1, 2)
+
+    assert writer.flush() is False
+    writer.record("u1", 1, 3)
+    stats = writer.stats()
+    assert stats["pending"] == 1
+    assert stats["flush_errors"] == 1
+
+    db.ok = True
+    assert writer.flush() is True
+    assert db.batches[-1][0]["step_order"] == 3
+
+
+def test_replay_rebuilds_sessions_after_crash(tmp_path):
+    crashed = _writer(_FakeDb(ok=False), tmp_path)
+    crashed.record("u1", 4, 2)
+    crashed.flush()  # fails: journal rotated to .flushing
+    crashed.record("u1", 4, 3)
+    crashed.record("u2", 4, 5, completed=True)
+
+    store = InMemorySessionStore()
+    store.update("u2", lesson_id=4, step_order=5)
+    db = _FakeDb()
+    restarted = _writer(db, tmp_path)
+
+    assert restarted.replay(store) == 2
+    assert store.get("u1") == {"lesson_id": 4, "step_order": 3, "popup_sent_for_step": False}
+    assert store.get("u2") is None
+    assert restarted.flush() is True
+    assert {r["user_id"] for r in db.batches[0]} == {"u1", "u2"}
+
+
+def test_flush_max_records_wakes_flusher(tmp_path):
+    writer = _writer(_FakeDb(), tmp_path, flush_max_records=2)
+    writer.record("u1", 1, 2)
+    assert not writer._wake.is_set()
+    writer.record("u2", 1, 2)
+    assert writer._wake.is_set()
+
+
+def _write_journal(path, *records):
+    with open(path, "w", encoding="utf-8") as f:
+        for user_id, step_order, updated_at in records:
+            f.write(json.dumps({"user_id": user_id, "lesson_id": 1, "step_order": step_order, "completed": False, "updated_at": updated_at}) + "\n")
+
+
+def test_each_process_journals_to_its_own_file(tmp_path):
+    writer = _writer(_FakeDb(), tmp_path)
+    writer.record("u1", 1, 2)
+
+    assert writer.journal_path == str(tmp_path / f"progress.{os.getpid()}.jsonl")
+    assert os.path.exists(writer.journal_path)
+
+
+def test_replay_adopts_journals_of_dead_workers_only(tmp_path):
+    dead_pid = 2 ** 22 + 12345  # above Linux's pid_max, so never running
+    _write_journal(tmp_path / f"progress.{dead_pid}.jsonl", ("u1", 2, "2026-01-01T00:00:01"), ("u2", 3, "2026-01-01T00:00:01"))
+    _write_journal(tmp_path / "progress.jsonl", ("u1", 4, "2026-01-01T00:00:02"))
+    live = tmp_path / f"progress.{os.getppid()}.jsonl"
+    _write_journal(live, ("u3", 5, "2026-01-01T00:00:03"))
+
+    store = InMemorySessionStore()
+    db = _FakeDb()
+    writer = _writer(db, tmp_path)
+
+    assert writer.replay(store) == 2
+    # The newest record per user wins across adopted journals
+    assert store.get("u1")["step_order"] == 4
+    assert store.get("u3") is None
+    assert live.exists()
+    assert not (tmp_path / f"progress.{dead_pid}.jsonl").exists()
+    assert not (tmp_path / "progress.jsonl").exists()
+
+    assert writer.flush() is True
+    assert sorted((r["user_id"], r["step_order"]) for r in db.batches[0]) == [("u1", 4), ("u2", 3)]
+    assert not os.path.exists(f"{writer.journal_path}.flushing")
@@ -0,0 +1,83 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Ensure backend path is importable
+CURRENT_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils.session_store import InMemorySessionStore, RedisSessionStore, SessionStore, SQLiteSessionStore  # noqa: E402
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemorySessionStore()
+    if request.param == "sqlite":
+        return SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisSessionStore(client=fakeredis.FakeRedis(decode_responses=True))
+
+
+def test_update_get_delete(store):
+    assert store.get("u") is None
+
+    created = store.update("u", lesson_id=1, step_order=2)
+    assert created == {"lesson_id": 1, "step_order": 2, "popup_sent_for_step": False}
+
+    store.update("u", popup_sent_for_step=True)
+    assert store.get("u") == {"lesson_id": 1, "step_order": 2, "popup_sent_for_step": True}
+
+    store.delete("u")
+    assert store.get("u") is None
+
+
+def test_claim_popup_only_once_per_step(store):
+    store.update("u", lesson_id=1, step_order=1)
+
+    assert store.claim_popup("u", 1, 1) is True
+    assert store.claim_popup("u", 1, 1) is False
+    # Claims for a step the user is not on are refused
+    assert store.claim_popup("u", 1, 2) is False
+
+
+def test_compare_and_advance_rejects_stale_step(store):
+    store.update("u", lesson_id=1, step_order=1, popup_sent_for_step=True)
+
+    assert store.compare_and_advance("u", 1, 1, 2) is True
+    assert store.get("u") == {"lesson_id": 1, "step_order": 2, "popup_sent_for_step": False}
+
+    # A late verdict for step 1 must neither advance again nor rewind
+    assert store.compare_and_advance("u", 1, 1, 2) is False
+    assert store.get("u")["step_order"] == 2
+
+
+def test_concurrent_advances_succeed_exactly_once(store):
+    store.update("u", lesson_id=1, step_order=1)
+    results = []
+
+    def advance():
+        results.append(store.compare_and_advance("u", 1, 1, 2))
+
+    threads = [threading.Thread(target=advance) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 1
+
+
+def test_store_missing_an_operation_cannot_be_created():
+    class _NoAdvance(InMemorySessionStore):
+        compare_and_advance = SessionStore.compare_and_advance
+
+    with pytest.raises(TypeError):
+        SessionStore()
+    with pytest.raises(TypeError):
+        _NoAdvance()
@@ -1,7 +1,6 @@
 import requests
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-from brightdata import bdclient
 from bs4 import BeautifulSoup
 
 CUSTOMER_ID = 'hl_16f1d494'
@@ -23,6 +22,9 @@ def scrape_to_txt(topic: str) -> None:
     links = [result['link'] for result in data.get('organic', [])]
     print(links)
 
+    # Imported here: the SDK pulls in openai and adds over a second to app startup
+    from brightdata import bdclient
+
     client = bdclient(api_token="d88ddda820aab54aa356eeeda830f1c3be73c26b00f55fd3af20e801f64fd9b0")
 
     results = []
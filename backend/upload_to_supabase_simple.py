@@ -17,6 +17,23 @@ headers = {
     'Prefer': 'return=representation'
 }
 
+# The lesson cache lives in the backend process, so uploads ask the backend to drop it.
+# With several workers only the one serving the request is invalidated immediately; the
+# others pick up the new steps within LESSON_CACHE_TTL_SECONDS.
+LESSON_CACHE_INVALIDATE_URL = os.getenv('LESSON_CACHE_INVALIDATE_URL', 'http://localhost:5000/api/lesson-cache/invalidate')
+
+def invalidate_backend_lesson_cache():
+    """
+    Ask the running backend to drop every cached lesson and its lesson_order index: a
+    re-upload gives the same lesson_order new lesson ids.
+    """
+    try:
+        response = requests.post(LESSON_CACHE_INVALIDATE_URL, json={}, timeout=5)
+        if response.status_code != 200:
+            print(f"  ⚠️ Backend lesson cache not invalidated: {response.text}")
+    except requests.RequestException as e:
+        print(f"  ⚠️ Backend unreachable, cached lessons expire with their TTL: {e}")
+
 def upload_course_to_supabase():
     """Upload generated course using REST API"""
     
@@ -88,6 +105,9 @@ def upload_course_to_supabase():
     
     print(f"🎉 Successfully uploaded course to Supabase!")
 
+    # Make sure the backend's cached lessons do not outlive the upload
+    invalidate_backend_lesson_cache()
+
 def get_all_lessons():
     """Fetch all lessons"""
     response = requests.get(
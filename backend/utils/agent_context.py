@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .database_context import DatabaseContextProvider, db_context
+from .lesson_cache import lesson_cache
+from .progress_writer import progress_writer
+
+
+class AgentContextCache:
+    """
+    Formatted agent context strings ("Additional Context: ..."), computed once per
+    lesson/user and reused for every frame.
+
+    Lesson entries are dropped whenever the lesson cache is invalidated (lesson or course
+    regenerated); user entries whenever the user's progress changes (recorded, advanced
+    or persisted). An empty result is indistinguishable from a failed lookup, so it is
+    only kept for `empty_ttl_seconds` and then fetched again. The per-frame cost is a
+    dictionary lookup.
+
+    Configuration (environment): AGENT_CONTEXT_CACHE_MAX_ENTRIES,
+    AGENT_CONTEXT_EMPTY_TTL_SECONDS.
+    """
+
+    def __init__(self, db: DatabaseContextProvider, max_entries: Optional[int] = None, empty_ttl_seconds: Optional[float] = None):
+        self.db = db
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("AGENT_CONTEXT_CACHE_MAX_ENTRIES", "4096"))
+        self.empty_ttl_seconds = empty_ttl_seconds if empty_ttl_seconds is not None else float(os.getenv("AGENT_CONTEXT_EMPTY_TTL_SECONDS", "30"))
+        self._lock = threading.Lock()
+        # { ("lesson" | "user", id): (formatted context, expires at or None) }
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, Optional[float]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, context_type: str, identifier: Any) -> str:
+        key = (context_type, str(identifier))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = self.db.get_relevant_context(context_type, key[1])
+        expires_at = None if value else now + self.empty_ttl_seconds
+        with self._lock:
+            if expires_at is None or self.empty_ttl_seconds > 0:
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def lesson_context(self, lesson_id: Any) -> str:
+        """Formatted context for a lesson ('' if the lesson has none or the lookup failed)."""
+        return self._get("lesson", lesson_id) if lesson_id is not None else ""
+
+    def user_context(self, user_id: Optional[str]) -> str:
+        """Formatted context for a user ('' if no progress is known or the lookup failed)."""
+        return self._get("user", user_id) if user_id else ""
+
+    def invalidate_lesson(self, lesson_id: Optional[Any] = None) -> None:
+        """Drop one lesson's context, or every lesson's when `lesson_id` is None."""
+        with self._lock:
+            if lesson_id is None:
+                for key in [key for key in self._entries if key[0] == "lesson"]:
+                    del self._entries[key]
+            else:
+                self._entries.pop(("lesson", str(lesson_id)), None)
+
+    def invalidate_users(self, user_ids: List[str]) -> None:
+        """Drop the context of users whose progress changed."""
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(("user", str(user_id)), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Global instance for easy import
+agent_context = AgentContextCache(db_context)
+lesson_cache.add_invalidation_listener(agent_context.invalidate_lesson)
+progress_writer.add_change_listener(agent_context.invalidate_users)
@@ -0,0 +1,181 @@
+import bisect
+import hashlib
+import logging
+import os
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .letta_agents import LettaAgentHandle
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class _AgentHealth:
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ewma_seconds: Optional[float] = None
+        self.drained_until = 0.0
+        self.drains = 0
+        self.drain_reason: Optional[str] = None
+
+
+class AgentPool:
+    """
+    Pool of equivalent Letta agents for completion checks.
+
+    Letta processes one agent's messages one at a time, so a single shared agent serializes
+    every user's checks. Users are pinned to pool members by consistent hashing on user_id
+    (each agent owns `replicas` points on a hash ring), which spreads concurrent users over
+    the pool and keeps a user on the same agent between frames.
+
+    Each agent's health is tracked from the calls routed to it. An agent is drained (taken
+    off the ring for `drain_seconds`) after `failure_threshold` consecutive failures, or
+    when its latency EWMA exceeds `slow_factor` times the median of the other healthy agents
+    (and `min_slow_seconds`). Only the drained agent's users move, to the next agent on the
+    ring; they return once the drain expires.
+
+    Configuration (environment): AGENT_POOL_REPLICAS, AGENT_POOL_FAILURE_THRESHOLD,
+    AGENT_POOL_SLOW_FACTOR, AGENT_POOL_MIN_SLOW_SECONDS, AGENT_POOL_DRAIN_SECONDS.
+    """
+
+    def __init__(
+        self,
+        handles: List[LettaAgentHandle],
+        replicas: Optional[int] = None,
+        failure_threshold: Optional[int] = None,
+        slow_factor: Optional[float] = None,
+        min_slow_seconds: Optional[float] = None,
+        drain_seconds: Optional[float] = None,
+    ):
+        if not handles:
+            raise ValueError("AgentPool needs at least one agent")
+        self.handles = handles
+        self.replicas = replicas if replicas is not None else int(os.getenv("AGENT_POOL_REPLICAS", "64"))
+        self.failure_threshold = failure_threshold if failure_threshold is not None else int(os.getenv("AGENT_POOL_FAILURE_THRESHOLD", "3"))
+        self.slow_factor = slow_factor if slow_factor is not None else float(os.getenv("AGENT_POOL_SLOW_FACTOR", "3"))
+        self.min_slow_seconds = min_slow_seconds if min_slow_seconds is not None else float(os.getenv("AGENT_POOL_MIN_SLOW_SECONDS", "2"))
+        self.drain_seconds = drain_seconds if drain_seconds is not None else float(os.getenv("AGENT_POOL_DRAIN_SECONDS", "30"))
+        self.ewma_alpha = 0.2
+        self._lock = threading.Lock()
+        self._health = [_AgentHealth() for _ in handles]
+        # Sorted (point, agent index) pairs
+        self._ring = sorted((_hash(f"{handle.name}#{i}"), index) for index, handle in enumerate(handles) for i in range(self.replicas))
+        self._points = [point for point, _ in self._ring]
+        self.rerouted = 0
+
+    def __len__(self) -> int:
+        return len(self.handles)
+
+    def _available(self, index: int, now: float) -> bool:
+        health = self._health[index]
+        if health.drained_until and health.drained_until <= now:
+            # Drain over: back on the ring, latency history forgotten so it is judged afresh
+            health.drained_until = 0.0
+            health.consecutive_failures = 0
+            health.ewma_seconds = None
+            logger.info(f"Agent {self.handles[index].name} returned to the pool")
+        return health.drained_until == 0.0
+
+    def agent_for(self, user_id: Optional[str]) -> LettaAgentHandle:
+        """
+        Agent that serves `user_id`: its ring owner, or the next available agent on the ring
+        while the owner is drained. If every agent is drained the owner is used anyway.
+        """
+        if len(self.handles) == 1:
+            return self.handles[0]
+        start = bisect.bisect(self._points, _hash(str(user_id or ""))) % len(self._ring)
+        now = time.monotonic()
+        with self._lock:
+            owner = self._ring[start][1]
+            seen = set()
+            for offset in range(len(self._ring)):
+                index = self._ring[(start + offset) % len(self._ring)][1]
+                if index in seen:
+                    continue
+                if self._available(index, now):
+                    if index != owner:
+                        self.rerouted += 1
+                    return self.handles[index]
+                seen.add(index)
+                if len(seen) == len(self.handles):
+                    break
+            return self.handles[owner]
+
+    def _drain(self, index: int, reason: str) -> None:
+        health = self._health[index]
+        health.drained_until = time.monotonic() + self.drain_seconds
+        health.drains += 1
+        health.drain_reason = reason
+        logger.warning(f"Draining agent {self.handles[index].name} for {self.drain_seconds}s: {reason}")
+
+    def record(self, handle: LettaAgentHandle, seconds: float, ok: bool) -> None:
+        """Record the outcome of a call routed to `handle`; may drain it."""
+        index = self.handles.index(handle)
+        with self._lock:
+            health = self._health[index]
+            health.calls += 1
+            if not ok:
+                health.failures += 1
+                health.consecutive_failures += 1
+                if health.consecutive_failures >= self.failure_threshold and not health.drained_until:
+                    self._drain(index, f"{health.consecutive_failures} consecutive failures")
+                return
+            health.consecutive_failures = 0
+            health.ewma_seconds = seconds if health.ewma_seconds is None else (
+                self.ewma_alpha * seconds + (1 - self.ewma_alpha) * health.ewma_seconds
+            )
+            peers = [
+                other.ewma_seconds for i, other in enumerate(self._health)
+                if i != index and not other.drained_until and other.ewma_seconds is not None
+            ]
+            if peers and not health.drained_until and health.ewma_seconds > self.min_slow_seconds:
+                baseline = statistics.median(peers)
+                if health.ewma_seconds > self.slow_factor * baseline:
+                    self._drain(index, f"latency {health.ewma_seconds:.2f}s vs pool median {baseline:.2f}s")
+
+    def warm(self, background: bool = True) -> None:
+        for handle in self.handles:
+            handle.warm(background=background)
+
+    def status(self) -> Dict[str, Any]:
+        """Availability of each agent (Letta resolution plus pool health), for /ready."""
+        now = time.monotonic()
+        with self._lock:
+            agents = []
+            for index, handle in enumerate(self.handles):
+                agent = handle.status()
+                agent["drained"] = not self._available(index, now)
+                agents.append(agent)
+        return {
+            "size": len(self.handles),
+            "available": sum(1 for agent in agents if agent["available"] and not agent["drained"]),
+            "agents": agents,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "size": len(self.handles),
+                "rerouted": self.rerouted,
+                "agents": [
+                    {
+                        "name": handle.name,
+                        "calls": health.calls,
+                        "failures": health.failures,
+                        "ewma_ms": round(health.ewma_seconds * 1000, 1) if health.ewma_seconds is not None else None,
+                        "drained": not self._available(index, now),
+                        "drains": health.drains,
+                        "drain_reason": health.drain_reason,
+                    }
+                    for index, (handle, health) in enumerate(zip(self.handles, self._health))
+                ],
+            }
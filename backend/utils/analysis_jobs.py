@@ -0,0 +1,86 @@
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisJobRunner:
+    """
+    Bounded worker pool for asynchronous screenshot analysis.
+
+    Jobs run on at most `max_workers` threads and at most `max_pending` jobs may be
+    queued or running at once; beyond that `submit` refuses new work so callers can
+    shed load instead of growing an unbounded backlog.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("ANALYSIS_WORKERS", "4"))
+        self.max_pending = max_pending or int(os.getenv("ANALYSIS_MAX_PENDING", str(self.max_workers * 8)))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def submit(self, work: Callable[[], Any], deliver: Callable[[str, Any], None]) -> Optional[str]:
+        """
+        Queue `work` and hand its result to `deliver(job_id, result)` when done.
+
+        Returns:
+            Optional[str]: The job id, or None if the queue is full
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            return None
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self.pending += 1
+            self.submitted += 1
+        try:
+            self._executor.submit(self._run, job_id, work, deliver)
+        except Exception:
+            self._finish()
+            raise
+        return job_id
+
+    def _run(self, job_id: str, work: Callable[[], Any], deliver: Callable[[str, Any], None]) -> None:
+        try:
+            result = work()
+        except Exception as e:
+            logger.error(f"Analysis job {job_id} failed: {e}")
+            with self._lock:
+                self.failed += 1
+            result = {"status": "error", "message": f"Analysis failed: {str(e)}"}
+        try:
+            deliver(job_id, result)
+        except Exception as e:
+            logger.error(f"Failed to deliver result of job {job_id}: {e}")
+        finally:
+            self._finish()
+
+    def _finish(self) -> None:
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "failed": self.failed,
+            }
+
+
+# Global instance for easy import
+analysis_jobs = AnalysisJobRunner()
@@ -0,0 +1,344 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+from .database_context import DatabaseContextProvider, progress_row
+
+load_dotenv()
+
+# Statuses worth retrying: rate limiting and transient upstream failures
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AsyncDatabaseContextProvider:
+    """
+    asyncio counterpart of DatabaseContextProvider, talking to Supabase's PostgREST API
+    over a pooled httpx.AsyncClient.
+
+    Offers the same methods (as coroutines) with the same return values and error
+    handling. Requests share keep-alive connections (HTTP/2 when the server negotiates
+    it), have per-call timeouts, and are retried on transport errors and 429/5xx with
+    exponential backoff and full jitter.
+
+    Configuration (environment): SUPABASE_URL, SUPABASE_KEY, SUPABASE_HTTP_MAX_CONNECTIONS,
+    SUPABASE_HTTP_MAX_KEEPALIVE, SUPABASE_HTTP2, SUPABASE_HTTP_TIMEOUT, SUPABASE_HTTP_RETRIES,
+    SUPABASE_HTTP_RETRY_BACKOFF, SUPABASE_VERIFY_SSL.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        key: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        http2: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+    ):
+        self.url = url or os.environ.get("SUPABASE_URL")
+        self.key = key or os.environ.get("SUPABASE_KEY")
+        self.max_connections = max_connections if max_connections is not None else int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "20"))
+        self.max_keepalive = max_keepalive if max_keepalive is not None else int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "10"))
+        self.http2 = http2 if http2 is not None else os.getenv("SUPABASE_HTTP2", "true").lower() in ("1", "true", "yes")
+        self.timeout = timeout if timeout is not None else float(os.getenv("SUPABASE_HTTP_TIMEOUT", "5"))
+        self.retries = retries if retries is not None else int(os.getenv("SUPABASE_HTTP_RETRIES", "2"))
+        self.retry_backoff = retry_backoff if retry_backoff is not None else float(os.getenv("SUPABASE_HTTP_RETRY_BACKOFF", "0.2"))
+        self.verify = os.getenv("SUPABASE_VERIFY_SSL", "true").lower() in ("1", "true", "yes")
+        # Created on first use so the client binds to the running event loop
+        self._client: Optional[httpx.AsyncClient] = None
+        # { lesson_order: (lesson_id, expires_at) }, as in DatabaseContextProvider
+        self._lesson_ids_by_order: Dict[int, Tuple[int, float]] = {}
+        self.lesson_order_ttl_seconds = float(os.getenv("LESSON_ORDER_INDEX_TTL_SECONDS", "600"))
+
+    def _make_client(self) -> httpx.AsyncClient:
+        try:
+            return httpx.AsyncClient(
+                base_url=f"{self.url.rstrip('/')}/rest/v1",
+                headers={"apikey": self.key or "", "Authorization": f"Bearer {self.key or ''}"},
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_keepalive),
+                http2=self.http2,
+                timeout=self.timeout,
+                verify=self.verify,
+            )
+        except ImportError:
+            # HTTP/2 needs the optional `h2` package (httpx[http2])
+            print("Warning: h2 is not installed; using HTTP/1.1 for Supabase requests")
+            self.http2 = False
+            return self._make_client()
+
+    @property
+    def client(self) -> Optional[httpx.AsyncClient]:
+        if self._client is None and self.url:
+            self._client = self._make_client()
+        return self._client
+
+    async def _select(self, table: str, params: Dict[str, Any], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """GET /rest/v1/<table> with PostgREST query params, retrying transient failures."""
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.get(f"/{table}", params=params, timeout=timeout or self.timeout)
+                if response.status_code not in RETRYABLE_STATUSES or attempt >= self.retries:
+                    response.raise_for_status()
+                    return response.json()
+            except httpx.TransportError:
+                if attempt >= self.retries:
+                    raise
+            await asyncio.sleep(random.uniform(0, self.retry_backoff * (2 ** attempt)))
+            attempt += 1
+
+    def _cached_lesson_id(self, lesson_order: int) -> Optional[int]:
+        entry = self._lesson_ids_by_order.get(lesson_order)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def _remember_lesson_id(self, lesson_order: int, lesson_id: int) -> None:
+        self._lesson_ids_by_order[lesson_order] = (lesson_id, time.monotonic() + self.lesson_order_ttl_seconds)
+
+    def forget_lesson_orders(self) -> None:
+        self._lesson_ids_by_order.clear()
+
+    async def get_user_context(self, user_id: str) -> Dict[str, Any]:
+        """
+        Retrieve user-specific context (persisted progress) from database.
+
+        Returns:
+            Dict[str, Any]: {'current_lesson', 'current_step', 'lesson_completed'}, or {} if unknown
+        """
+        try:
+            if self.client is None:
+                return {}
+            rows = await self._select(
+                os.getenv("PROGRESS_TABLE", "user_progress"),
+                {"select": "lesson_id,step_order,completed", "user_id": f"eq.{user_id}", "limit": 1},
+            )
+            return DatabaseContextProvider._user_context_from_rows(rows)
+        except Exception as e:
+            print(f"Error querying user context for {user_id}: {e}")
+            return {}
+
+    async def get_lesson_context(self, lesson_id: str) -> Dict[str, Any]:
+        """
+        Retrieve lesson-specific context from database.
+
+        Returns:
+            Dict[str, Any]: {'lesson', 'lesson_description', 'lesson_order'}, or {} if unknown
+        """
+        try:
+            if self.client is None:
+                return {}
+            rows = await self._select(
+                "lesson",
+                {"select": "name,description,lesson_order", "id": f"eq.{lesson_id}", "limit": 1},
+            )
+            return DatabaseContextProvider._lesson_context_from_rows(rows)
+        except Exception as e:
+            print(f"Error querying lesson context for {lesson_id}: {e}")
+            return {}
+
+    async def get_lesson_id_by_order(self, lesson_order: int) -> Optional[int]:
+        """
+        Get lesson ID by lesson order number.
+
+        Args:
+            lesson_order (int): The lesson order number to query
+
+        Returns:
+            Optional[int]: The lesson ID if found, None otherwise
+        """
+        try:
+            cached = self._cached_lesson_id(lesson_order)
+            if cached is not None:
+                return cached
+            if self.client is None:
+                return None
+            data = await self._select("lesson", {"select": "id", "lesson_order": f"eq.{lesson_order}", "limit": 1})
+            if not data:
+                return None
+            self._remember_lesson_id(lesson_order, data[0]["id"])
+            return data[0]["id"]
+        except Exception as e:
+            print(f"Error querying lesson by order {lesson_order}: {e}")
+            return None
+
+    async def get_step_context(self, step_id: str) -> str:
+        """Get context for a specific learning step."""
+        return ""
+
+    async def get_lesson_steps_batch(self, lesson_id: int) -> Dict[int, Dict[str, str]]:
+        """
+        Get all steps for a lesson in a single query.
+
+        Args:
+            lesson_id (int): The lesson ID to query
+
+        Returns:
+            Dict[int, Dict[str, str]]: {step_order: {'name': str, 'description': str, 'finish_criteria': str}}
+        """
+        try:
+            if self.client is None:
+                return {}
+            rows = await self._select(
+                "step",
+                {"select": "step_order,name,description,finish_criteria", "lesson_id": f"eq.{lesson_id}", "order": "step_order"},
+            )
+            return DatabaseContextProvider._steps_from_rows(rows)
+        except Exception as e:
+            print(f"Error loading lesson steps for lesson {lesson_id}: {e}")
+            return {}
+
+    async def get_all_lessons_with_steps(self, page_size: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get every lesson row with its embedded `step` rows, paging through `lesson?select=*,step(*)`.
+
+        Raises:
+            Exception: Propagates query errors so callers can tell an outage from an empty table
+        """
+        if self.client is None:
+            return []
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            page = await self._select("lesson", {"select": "*,step(*)", "order": "id", "offset": offset, "limit": page_size})
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            offset += page_size
+
+    async def get_all_lesson_steps(self, page_size: int = 100) -> Dict[int, Dict[int, Dict[str, str]]]:
+        """
+        Get every lesson's steps as {lesson_id: {step_order: {...}}}.
+
+        Raises:
+            Exception: Propagates query errors so callers can tell an outage from an empty table
+        """
+        return {
+            row["id"]: DatabaseContextProvider._steps_from_rows(row.get("step") or [])
+            for row in await self.get_all_lessons_with_steps(page_size)
+        }
+
+    async def get_step_by_order_and_lesson(self, step_order: int, lesson_id: int) -> Tuple[str, str]:
+        """
+        Get step name and description by step order number and lesson ID.
+
+        Returns:
+            Tuple[str, str]: (step_name, step_description)
+        """
+        try:
+            if self.client is None:
+                return "", ""
+            data = await self._select(
+                "step",
+                {"select": "name,description", "step_order": f"eq.{step_order}", "lesson_id": f"eq.{lesson_id}", "limit": 1},
+            )
+            if data:
+                return data[0].get("name", ""), data[0].get("description", "")
+            return "", ""
+        except Exception as e:
+            print(f"Error querying step by order {step_order} and lesson {lesson_id}: {e}")
+            return "", ""
+
+    async def get_step_by_order_and_lesson_order(self, step_order: int, lesson_order: int) -> Tuple[str, str]:
+        """
+        Get step name and description by step order and lesson order, in one round trip.
+
+        Returns:
+            Tuple[str, str]: (step_name, step_description)
+        """
+        try:
+            lesson_id = self._cached_lesson_id(lesson_order)
+            if lesson_id is not None:
+                return await self.get_step_by_order_and_lesson(step_order, lesson_id)
+            if self.client is None:
+                return "", ""
+            data = await self._select(
+                "lesson",
+                {
+                    "select": "id,step(name,description)",
+                    "lesson_order": f"eq.{lesson_order}",
+                    "step.step_order": f"eq.{step_order}",
+                    "limit": 1,
+                },
+            )
+            if not data:
+                return "", ""
+            self._remember_lesson_id(lesson_order, data[0]["id"])
+            steps = data[0].get("step") or []
+            if steps:
+                return steps[0].get("name", ""), steps[0].get("description", "")
+            return "", ""
+        except Exception as e:
+            print(f"Error querying step by order {step_order} and lesson order {lesson_order}: {e}")
+            return "", ""
+
+    async def update_user_progress(self, user_id: str, lesson_id: int, step_order: Optional[int], completed: bool = False) -> bool:
+        """Update user progress in database (single-row form of upsert_user_progress_batch)."""
+        return await self.upsert_user_progress_batch([progress_row(user_id, lesson_id, step_order, completed)])
+
+    async def upsert_user_progress_batch(self, rows: List[Dict[str, Any]]) -> bool:
+        """Upsert progress rows (one per user) into the progress table in a single request."""
+        if not rows:
+            return True
+        try:
+            if self.client is None:
+                return False
+            response = await self.client.post(
+                f"/{os.getenv('PROGRESS_TABLE', 'user_progress')}",
+                params={"on_conflict": "user_id"},
+                json=rows,
+                headers={"Prefer": "resolution=merge-duplicates,return=minimal"},
+            )
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            print(f"Error upserting progress for {len(rows)} users: {e}")
+            return False
+
+    async def get_relevant_context(self, context_type: str, identifier: str) -> str:
+        """Generic method to get context based on type and identifier."""
+        if context_type == "user":
+            context = await self.get_user_context(identifier)
+        elif context_type == "lesson":
+            context = await self.get_lesson_context(identifier)
+        elif context_type == "step":
+            context = await self.get_step_context(identifier)
+        else:
+            return ""
+        return DatabaseContextProvider._format_context_for_agent(context)
+
+    async def get_step_finish_criteria(self, step_order: int, lesson_id: int) -> str:
+        """
+        Get finish criteria for a specific step from the database.
+
+        Returns:
+            str: Finish criteria for the step
+        """
+        try:
+            if self.client is None:
+                return f"Step {step_order} completion criteria"
+            data = await self._select(
+                "step",
+                {"select": "finish_criteria", "step_order": f"eq.{step_order}", "lesson_id": f"eq.{lesson_id}", "limit": 1},
+            )
+            value = data[0].get("finish_criteria") if data else None
+            return value if value else f"Step {step_order} completion criteria"
+        except Exception as e:
+            print(f"Error querying finish criteria for step {step_order} and lesson {lesson_id}: {e}")
+            return f"Step {step_order} completion criteria"
+
+    async def close_connection(self):
+        """Close pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global instance for easy import; the HTTP client is created on first use
+async_db_context = AsyncDatabaseContextProvider()
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from .analysis_jobs import analysis_jobs
+
+
+class CapturePacer:
+    """
+    Computes `next_capture_after_ms` hints so the server can shape client capture load.
+
+    Inputs:
+      - per-user frame change rate (EWMA of analyzed vs. unchanged frames): idle screens poll slower
+      - time since the last popup: users act right after a popup, so poll faster then
+      - analysis queue depth: back off as the worker pool fills
+      - global model-call budget (calls/second): back off when the fleet exceeds it; every
+        model call counts, whether on the fast or the strong completion tier
+
+    Configuration (environment):
+        CAPTURE_BASE_MS, CAPTURE_MIN_MS, CAPTURE_MAX_MS, CAPTURE_POPUP_BOOST_SECONDS,
+        MODEL_CALL_BUDGET_PER_SEC
+    """
+
+    def __init__(self, queue_load: Optional[Callable[[], float]] = None):
+        self.base_ms = int(os.getenv("CAPTURE_BASE_MS", "2000"))
+        self.min_ms = int(os.getenv("CAPTURE_MIN_MS", "1000"))
+        self.max_ms = int(os.getenv("CAPTURE_MAX_MS", "10000"))
+        self.popup_boost_seconds = float(os.getenv("CAPTURE_POPUP_BOOST_SECONDS", "15"))
+        self.model_call_budget = float(os.getenv("MODEL_CALL_BUDGET_PER_SEC", "5"))
+        self._queue_load = queue_load or self._analysis_queue_load
+        self._lock = threading.Lock()
+        # { user_id: {"change_rate": float, "last_popup": float} }
+        self._users: Dict[str, Dict[str, float]] = {}
+        # (timestamp, tier) per model call
+        self._model_calls: Deque[Tuple[float, str]] = deque()
+        self._window_seconds = 10.0
+
+    @staticmethod
+    def _analysis_queue_load() -> float:
+        stats = analysis_jobs.stats()
+        return stats["pending"] / max(1, stats["max_pending"])
+
+    def record_frame(self, user_id: str, changed: bool) -> None:
+        """Update the user's change rate; `changed` is False for frames skipped as unchanged."""
+        with self._lock:
+            user = self._users.setdefault(user_id, {"change_rate": 1.0, "last_popup": 0.0})
+            user["change_rate"] = 0.7 * user["change_rate"] + 0.3 * (1.0 if changed else 0.0)
+
+    def record_popup(self, user_id: str) -> None:
+        with self._lock:
+            user = self._users.setdefault(user_id, {"change_rate": 1.0, "last_popup": 0.0})
+            user["last_popup"] = time.monotonic()
+
+    def record_model_call(self, tier: str = "strong") -> None:
+        """Record one model call; a cascaded check that escalates records one per tier."""
+        now = time.monotonic()
+        with self._lock:
+            self._model_calls.append((now, tier))
+            self._trim(now)
+
+    def forget(self, user_id: str) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def _trim(self, now: float) -> None:
+        while self._model_calls and now - self._model_calls[0][0] > self._window_seconds:
+            self._model_calls.popleft()
+
+    def next_capture_after_ms(self, user_id: Optional[str] = None) -> int:
+        """Return how long the client should wait before sending its next frame."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            calls_per_sec = len(self._model_calls) / self._window_seconds
+            user = self._users.get(user_id) if user_id else None
+            change_rate = user["change_rate"] if user else 1.0
+            last_popup = user["last_popup"] if user else 0.0
+
+        factor = 1.0
+        if last_popup and now - last_popup < self.popup_boost_seconds:
+            factor *= 0.5
+        else:
+            # Fully idle screens poll up to 3x slower than actively changing ones
+            factor *= 1.0 + 2.0 * (1.0 - change_rate)
+        factor *= 1.0 + 3.0 * min(1.0, max(0.0, self._queue_load()))
+        if self.model_call_budget > 0 and calls_per_sec > self.model_call_budget:
+            factor *= calls_per_sec / self.model_call_budget
+
+        return int(min(self.max_ms, max(self.min_ms, self.base_ms * factor)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim(time.monotonic())
+            by_tier: Dict[str, float] = {}
+            for _, tier in self._model_calls:
+                by_tier[tier] = by_tier.get(tier, 0.0) + 1 / self._window_seconds
+            return {
+                "tracked_users": len(self._users),
+                "model_calls_per_sec": len(self._model_calls) / self._window_seconds,
+                "model_calls_per_sec_by_tier": by_tier,
+                "model_call_budget_per_sec": self.model_call_budget,
+            }
+
+
+# Global instance for easy import
+capture_pacer = CapturePacer()
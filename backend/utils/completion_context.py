@@ -0,0 +1,83 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MODES = ("autoclear", "window", "reset", "stateful")
+
+
+class CompletionContextPolicy:
+    """
+    Keeps the shared task-completion agent's context a constant size.
+
+    Every completion check from every user goes to one Letta agent; left alone its message
+    history grows without bound and so do per-call latency and cost. Modes
+    (COMPLETION_CONTEXT_MODE):
+
+      - "autoclear" (default): the agent is configured with message_buffer_autoclear, so
+        Letta keeps no history between calls (stateless checks, no extra round trips)
+      - "window": the history is reset every COMPLETION_HISTORY_WINDOW calls (bounded sawtooth)
+      - "reset": the history is reset after every call (one extra round trip per check)
+      - "stateful": previous behaviour, unbounded history
+
+    COMPLETION_CONTEXT_WINDOW_LIMIT optionally caps the agent's context window (tokens).
+    """
+
+    def __init__(self, mode: Optional[str] = None, window: Optional[int] = None, context_window_limit: Optional[int] = None):
+        self.mode = (mode or os.getenv("COMPLETION_CONTEXT_MODE", "autoclear")).lower()
+        if self.mode not in MODES:
+            logger.warning(f"Unknown COMPLETION_CONTEXT_MODE {self.mode!r}; using autoclear")
+            self.mode = "autoclear"
+        self.window = window if window is not None else int(os.getenv("COMPLETION_HISTORY_WINDOW", "50"))
+        limit = context_window_limit if context_window_limit is not None else os.getenv("COMPLETION_CONTEXT_WINDOW_LIMIT")
+        self.context_window_limit = int(limit) if limit else None
+        self._lock = threading.Lock()
+        # { agent_id: calls since its last reset }; each pool agent has its own history
+        self._calls_since_reset: Dict[str, int] = {}
+        self.resets = 0
+        self.reset_errors = 0
+
+    def agent_settings(self) -> Dict[str, Any]:
+        """AgentState fields to create the agent with, and to enforce on a reused one."""
+        return {"message_buffer_autoclear": self.mode == "autoclear"}
+
+    def create_settings(self) -> Dict[str, Any]:
+        """
+        Extra agents.create arguments. LettaAgentHandle applies context_window_limit to a
+        reused agent through its llm_config.
+        """
+        return {"context_window_limit": self.context_window_limit} if self.context_window_limit else {}
+
+    def after_call(self, client, agent_id: str) -> None:
+        """Reset the agent's message history when the mode calls for it."""
+        if self.mode not in ("window", "reset"):
+            return
+        with self._lock:
+            calls = self._calls_since_reset.get(agent_id, 0) + 1
+            if self.mode == "window" and calls < self.window:
+                self._calls_since_reset[agent_id] = calls
+                return
+            self._calls_since_reset[agent_id] = 0
+        try:
+            client.agents.messages.reset(agent_id, add_default_initial_messages=False)
+            with self._lock:
+                self.resets += 1
+        except Exception as e:
+            with self._lock:
+                self.reset_errors += 1
+            logger.warning(f"Failed to reset completion agent history: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "window": self.window if self.mode == "window" else None,
+                "resets": self.resets,
+                "reset_errors": self.reset_errors,
+            }
+
+
+# Global instance for easy import
+completion_context = CompletionContextPolicy()
@@ -0,0 +1,83 @@
+import os
+import statistics
+import threading
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+TIERS = ("fast", "strong")
+
+
+class CompletionRouter:
+    """
+    Routing policy for the YES/NO completion cascade.
+
+    With the cascade enabled, a check first goes to the fast tier (a cheap vision model,
+    COMPLETION_FAST_MODEL) which may answer YES, NO or UNSURE. Only answers that are not a
+    clean YES/NO (UNSURE, anything unparseable, or an error) escalate to the strong tier
+    (COMPLETION_STRONG_MODEL). Criteria starting with the hard marker
+    (COMPLETION_HARD_MARKER, default "[hard]") go straight to the strong tier.
+
+    Routing decisions, the escalation rate and per-tier latency are kept for /api/stats.
+
+    Configuration (environment): COMPLETION_CASCADE_ENABLED, COMPLETION_HARD_MARKER.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, hard_marker: Optional[str] = None, latency_samples: int = 1000):
+        self.enabled = enabled if enabled is not None else os.getenv("COMPLETION_CASCADE_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.hard_marker = (hard_marker if hard_marker is not None else os.getenv("COMPLETION_HARD_MARKER", "[hard]")).lower()
+        self._lock = threading.Lock()
+        # Routes: fast (answered by the fast tier), escalated_unsure, escalated_error, hard, strong_only
+        # (cascade off) and lookahead (multi-step checks, always on the strong tier)
+        self.routes: Dict[str, int] = {}
+        self._latencies = {tier: deque(maxlen=latency_samples) for tier in TIERS}
+        self._calls = {tier: 0 for tier in TIERS}
+
+    def split_hard(self, finish_criteria: str) -> Tuple[bool, str]:
+        """
+        Returns:
+            Tuple[bool, str]: (marked hard, criteria with the marker removed)
+        """
+        stripped = (finish_criteria or "").lstrip()
+        if self.hard_marker and stripped.lower().startswith(self.hard_marker):
+            return True, stripped[len(self.hard_marker):].lstrip()
+        return False, finish_criteria
+
+    @staticmethod
+    def decisive(answer: Optional[str]) -> Optional[str]:
+        """'YES' or 'NO' if `answer` is a clean decision, otherwise None (escalate)."""
+        if not answer:
+            return None
+        word = answer.strip().strip(".!\"'`* ").upper()
+        return word if word in ("YES", "NO") else None
+
+    def record_route(self, route: str) -> None:
+        with self._lock:
+            self.routes[route] = self.routes.get(route, 0) + 1
+
+    def record_latency(self, tier: str, seconds: float) -> None:
+        with self._lock:
+            self._calls[tier] += 1
+            self._latencies[tier].append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cascaded = sum(self.routes.get(route, 0) for route in ("fast", "escalated_unsure", "escalated_error"))
+            escalated = self.routes.get("escalated_unsure", 0) + self.routes.get("escalated_error", 0)
+            latency = {}
+            for tier in TIERS:
+                samples = sorted(self._latencies[tier])
+                latency[tier] = {
+                    "calls": self._calls[tier],
+                    "p50_ms": round(statistics.median(samples) * 1000, 1) if samples else None,
+                    "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1) if samples else None,
+                }
+            return {
+                "enabled": self.enabled,
+                "routes": dict(self.routes),
+                "escalation_rate": round(escalated / cascaded, 3) if cascaded else None,
+                "latency": latency,
+            }
+
+
+# Global instance for easy import
+completion_router = CompletionRouter()
@@ -1,14 +1,45 @@
 import os
-from typing import Dict, Any, Optional, Tuple
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
 load_dotenv()
 
+# User progress lives in PROGRESS_TABLE (default "user_progress"), one row per user,
+# upserted on user_id by the write-behind ProgressWriter:
+#
+#   create table user_progress (
+#       user_id     text primary key,
+#       lesson_id   bigint references lesson (id),
+#       step_order  integer,
+#       completed   boolean not null default false,
+#       updated_at  timestamptz not null
+#   );
+def progress_row(user_id: str, lesson_id: Optional[int], step_order: Optional[int], completed: bool = False) -> Dict[str, Any]:
+    """Build a user_progress row (the shape ProgressWriter journals and upserts)."""
+    return {
+        "user_id": user_id,
+        "lesson_id": lesson_id,
+        "step_order": step_order,
+        "completed": completed,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
 class DatabaseContextProvider:
     """Handles database operations and context injection for AI agents using Supabase client."""
     
     def __init__(self):
+        # Optional local mirror of lesson/step (see utils/lesson_replica.py)
+        self.replica = None
+
+        # { lesson_order: (lesson_id, expires_at) }; lesson orders only change when a course is regenerated
+        self._lesson_ids_by_order: Dict[int, Tuple[int, float]] = {}
+        self._lesson_order_lock = threading.Lock()
+        self.lesson_order_ttl_seconds = float(os.getenv("LESSON_ORDER_INDEX_TTL_SECONDS", "600"))
+
         # Create Supabase client with SSL handling
         url = os.environ.get("SUPABASE_URL")
         key = os.environ.get("SUPABASE_KEY")
@@ -34,23 +65,101 @@ class DatabaseContextProvider:
                 # Create a mock client for testing/fallback
                 self.sb = None
     
+    def attach_replica(self, replica) -> None:
+        """Serve lesson/step reads from a LessonReplica once it has completed a sync."""
+        self.replica = replica
+
+    def _local_replica(self):
+        replica = self.replica
+        return replica if replica is not None and replica.ready else None
+
+    def _cached_lesson_id(self, lesson_order: int) -> Optional[int]:
+        with self._lesson_order_lock:
+            entry = self._lesson_ids_by_order.get(lesson_order)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            return entry[0]
+
+    def _remember_lesson_id(self, lesson_order: int, lesson_id: int) -> None:
+        with self._lesson_order_lock:
+            self._lesson_ids_by_order[lesson_order] = (lesson_id, time.monotonic() + self.lesson_order_ttl_seconds)
+
+    def forget_lesson_orders(self) -> None:
+        """Drop the lesson_order -> lesson_id index, e.g. after a course is regenerated."""
+        with self._lesson_order_lock:
+            self._lesson_ids_by_order.clear()
+
     def get_user_context(self, user_id: str) -> Dict[str, Any]:
-        """Retrieve user-specific context from database."""
-        # TODO: Implement database query to get user data
-        # Example:
-        # user_data = self.db.query("SELECT * FROM users WHERE id = %s", (user_id,))
-        # return {
-        #     "user_preferences": user_data.preferences,
-        #     "learning_history": user_data.history,
-        #     "current_step": user_data.current_step
-        # }
-        return {}
+        """
+        Retrieve user-specific context (persisted progress) from database.
+
+        Args:
+            user_id (str): The user ID
+
+        Returns:
+            Dict[str, Any]: {'current_lesson', 'current_step', 'lesson_completed'}, or {} if unknown
+        """
+        try:
+            if self.sb is None:
+                return {}
+            resp = (
+                self.sb
+                .table(os.getenv("PROGRESS_TABLE", "user_progress"))
+                .select("lesson_id,step_order,completed")
+                .eq("user_id", user_id)
+                .limit(1)
+                .execute()
+            )
+            return self._user_context_from_rows(resp.data or [])
+        except Exception as e:
+            print(f"Error querying user context for {user_id}: {e}")
+            return {}
     
     def get_lesson_context(self, lesson_id: str) -> Dict[str, Any]:
-        """Retrieve lesson-specific context from database."""
-        # TODO: Implement database query to get lesson data
-        return {}
+        """
+        Retrieve lesson-specific context from database.
+
+        Args:
+            lesson_id (str): The lesson ID
+
+        Returns:
+            Dict[str, Any]: {'lesson', 'lesson_description', 'lesson_order'}, or {} if unknown
+        """
+        try:
+            if self.sb is None:
+                return {}
+            resp = (
+                self.sb
+                .table("lesson")
+                .select("name,description,lesson_order")
+                .eq("id", lesson_id)
+                .limit(1)
+                .execute()
+            )
+            return self._lesson_context_from_rows(resp.data or [])
+        except Exception as e:
+            print(f"Error querying lesson context for {lesson_id}: {e}")
+            return {}
     
+    @staticmethod
+    def _user_context_from_rows(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not rows:
+            return {}
+        row = rows[0]
+        return {
+            "current_lesson": row.get("lesson_id"),
+            "current_step": row.get("step_order"),
+            "lesson_completed": bool(row.get("completed")),
+        }
+
+    @staticmethod
+    def _lesson_context_from_rows(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not rows:
+            return {}
+        row = rows[0]
+        context = {"lesson": row.get("name"), "lesson_description": row.get("description"), "lesson_order": row.get("lesson_order")}
+        return {key: value for key, value in context.items() if value not in (None, "")}
+
     def get_lesson_id_by_order(self, lesson_order: int) -> Optional[int]:
         """
         Get lesson ID by lesson order number.
@@ -62,6 +171,12 @@ class DatabaseContextProvider:
             Optional[int]: The lesson ID if found, None otherwise
         """
         try:
+            replica = self._local_replica()
+            if replica is not None:
+                return replica.get_lesson_id_by_order(lesson_order)
+            cached = self._cached_lesson_id(lesson_order)
+            if cached is not None:
+                return cached
             if self.sb is None:
                 return None
             resp = (
@@ -73,7 +188,10 @@ class DatabaseContextProvider:
                 .execute()
             )
             data = resp.data or []
-            return data[0]["id"] if data else None
+            if not data:
+                return None
+            self._remember_lesson_id(lesson_order, data[0]["id"])
+            return data[0]["id"]
         except Exception as e:
             print(f"Error querying lesson by order {lesson_order}: {e}")
             return None
@@ -91,37 +209,107 @@ class DatabaseContextProvider:
             lesson_id (int): The lesson ID to query
             
         Returns:
-            Dict[int, Dict[str, str]]: {step_order: {'name': str, 'description': str, 'finish_criteria': str}}
+            Dict[int, Dict[str, str]]: {step_order: {'name': str, 'description': str, 'finish_criteria': str}},
+                                       or {} if the query fails
         """
         try:
-            if self.sb is None:
-                return {}
-            resp = (
-                self.sb
-                .table("step")
-                .select("step_order,name,description,finish_criteria")
-                .eq("lesson_id", lesson_id)
-                .order("step_order")
-                .execute()
-            )
-            results = resp.data or []
-            lesson_data: Dict[int, Dict[str, str]] = {}
-            for row in results:
-                step_order = row["step_order"]
-                name = row["name"]
-                description = row["description"]
-                finish_criteria = row.get("finish_criteria")
-                lesson_data[step_order] = {
-                    "name": name,
-                    "description": description,
-                    "finish_criteria": finish_criteria if finish_criteria else f"Step {step_order} completion criteria",
-                }
-            print(f"Loaded {len(lesson_data)} steps for lesson {lesson_id}")
-            return lesson_data
+            return self.fetch_lesson_steps(lesson_id)
         except Exception as e:
             print(f"Error loading lesson steps for lesson {lesson_id}: {e}")
             return {}
+
+    def fetch_lesson_steps(self, lesson_id: int) -> Dict[int, Dict[str, str]]:
+        """
+        Get all steps for a lesson, as get_lesson_steps_batch, without swallowing errors.
+
+        Raises:
+            Exception: Propagates query errors (and a missing Supabase client) so callers can
+                       tell an outage from a lesson that has no steps
+        """
+        replica = self._local_replica()
+        if replica is not None:
+            return replica.get_lesson_steps_batch(lesson_id)
+        if self.sb is None:
+            raise RuntimeError("Supabase client is not configured")
+        resp = (
+            self.sb
+            .table("step")
+            .select("step_order,name,description,finish_criteria")
+            .eq("lesson_id", lesson_id)
+            .order("step_order")
+            .execute()
+        )
+        lesson_data = self._steps_from_rows(resp.data or [])
+        print(f"Loaded {len(lesson_data)} steps for lesson {lesson_id}")
+        return lesson_data
     
+    @staticmethod
+    def _steps_from_rows(rows: List[Dict[str, Any]]) -> Dict[int, Dict[str, str]]:
+        """Shape `step` rows as {step_order: {'name', 'description', 'finish_criteria'}}."""
+        lesson_data: Dict[int, Dict[str, str]] = {}
+        for row in sorted(rows, key=lambda r: r["step_order"]):
+            step_order = row["step_order"]
+            finish_criteria = row.get("finish_criteria")
+            lesson_data[step_order] = {
+                "name": row["name"],
+                "description": row["description"],
+                "finish_criteria": finish_criteria if finish_criteria else f"Step {step_order} completion criteria",
+            }
+        return lesson_data
+
+    def get_all_lessons_with_steps(self, page_size: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get every lesson row with its embedded `step` rows, paging through `lesson?select=*,step(*)`.
+
+        Args:
+            page_size (int): Lessons fetched per round trip
+
+        Returns:
+            List[Dict[str, Any]]: Lesson rows, each with a `step` list
+
+        Raises:
+            Exception: Propagates query errors so callers can tell an outage from an empty table
+        """
+        if self.sb is None:
+            return []
+        rows: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            resp = (
+                self.sb
+                .table("lesson")
+                .select("*,step(*)")
+                .order("id")
+                .range(start, start + page_size - 1)
+                .execute()
+            )
+            page = resp.data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+            start += page_size
+        return rows
+
+    def get_all_lesson_steps(self, page_size: int = 100) -> Dict[int, Dict[int, Dict[str, str]]]:
+        """
+        Get every lesson's steps in as few round trips as possible.
+
+        Args:
+            page_size (int): Lessons fetched per round trip
+
+        Returns:
+            Dict[int, Dict[int, Dict[str, str]]]: {lesson_id: {step_order: {...}}}
+
+        Raises:
+            Exception: Propagates query errors so callers can tell an outage from an empty table
+        """
+        lessons = {
+            row["id"]: self._steps_from_rows(row.get("step") or [])
+            for row in self.get_all_lessons_with_steps(page_size)
+        }
+        print(f"Loaded {sum(len(steps) for steps in lessons.values())} steps across {len(lessons)} lessons")
+        return lessons
+
     def get_step_by_order_and_lesson(self, step_order: int, lesson_id: int) -> Tuple[str, str]:
         """
         Get step name and description by step order number and lesson ID.
@@ -134,6 +322,9 @@ class DatabaseContextProvider:
             Tuple[str, str]: (step_name, step_description)
         """
         try:
+            replica = self._local_replica()
+            if replica is not None:
+                return replica.get_step_by_order_and_lesson(step_order, lesson_id)
             if self.sb is None:
                 return "", ""
             resp = (
@@ -157,7 +348,11 @@ class DatabaseContextProvider:
     def get_step_by_order_and_lesson_order(self, step_order: int, lesson_order: int) -> Tuple[str, str]:
         """
         Get step name and description by step order and lesson order.
-        This is a convenience method that first finds the lesson by order, then the step.
+
+        Costs one round trip: a step query when the lesson_order -> lesson_id index already
+        knows the lesson, otherwise a single lesson query with the step embedded
+        (`lesson?lesson_order=eq.X&select=id,step(name,description)&step.step_order=eq.Y`)
+        that also fills the index. Served locally when a replica is attached.
         
         Args:
             step_order (int): The step order number to query
@@ -167,19 +362,64 @@ class DatabaseContextProvider:
             Tuple[str, str]: (step_name, step_description)
         """
         try:
-            # First resolve lesson_id from lesson_order
-            lesson_id = self.get_lesson_id_by_order(lesson_order)
-            if lesson_id is None:
+            lesson_id = self._cached_lesson_id(lesson_order)
+            if lesson_id is not None or self._local_replica() is not None:
+                lesson_id = lesson_id if lesson_id is not None else self.get_lesson_id_by_order(lesson_order)
+                if lesson_id is None:
+                    return "", ""
+                return self.get_step_by_order_and_lesson(step_order, lesson_id)
+            if self.sb is None:
                 return "", ""
-            return self.get_step_by_order_and_lesson(step_order, lesson_id)
+            resp = (
+                self.sb
+                .table("lesson")
+                .select("id,step(name,description)")
+                .eq("lesson_order", lesson_order)
+                .eq("step.step_order", step_order)
+                .limit(1)
+                .execute()
+            )
+            data = resp.data or []
+            if not data:
+                return "", ""
+            self._remember_lesson_id(lesson_order, data[0]["id"])
+            steps = data[0].get("step") or []
+            if steps:
+                return steps[0].get("name", ""), steps[0].get("description", "")
+            return "", ""
         except Exception as e:
             print(f"Error querying step by order {step_order} and lesson order {lesson_order}: {e}")
             return "", ""
     
-    def update_user_progress(self, user_id: str, step_id: str, progress_data: Dict[str, Any]) -> bool:
-        """Update user progress in database."""
-        # TODO: Implement database update
-        return True
+    def update_user_progress(self, user_id: str, lesson_id: int, step_order: Optional[int], completed: bool = False) -> bool:
+        """Update user progress in database (single-row form of upsert_user_progress_batch)."""
+        return self.upsert_user_progress_batch([progress_row(user_id, lesson_id, step_order, completed)])
+
+    def upsert_user_progress_batch(self, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Upsert progress rows (one per user) into the progress table in a single request.
+
+        Args:
+            rows (List[Dict[str, Any]]): user_progress rows (see progress_row), keyed by `user_id`
+
+        Returns:
+            bool: True if the rows were written
+        """
+        if not rows:
+            return True
+        try:
+            if self.sb is None:
+                return False
+            (
+                self.sb
+                .table(os.getenv("PROGRESS_TABLE", "user_progress"))
+                .upsert(rows, on_conflict="user_id")
+                .execute()
+            )
+            return True
+        except Exception as e:
+            print(f"Error upserting progress for {len(rows)} users: {e}")
+            return False
     
     def get_relevant_context(self, context_type: str, identifier: str) -> str:
         """Generic method to get context based on type and identifier."""
@@ -195,7 +435,8 @@ class DatabaseContextProvider:
         # Format context for injection into agent
         return self._format_context_for_agent(context)
     
-    def _format_context_for_agent(self, context: Dict[str, Any]) -> str:
+    @staticmethod
+    def _format_context_for_agent(context: Dict[str, Any]) -> str:
         """Format database context for agent consumption."""
         if not context:
             return ""
@@ -218,6 +459,9 @@ class DatabaseContextProvider:
             str: Finish criteria for the step
         """
         try:
+            replica = self._local_replica()
+            if replica is not None:
+                return replica.get_step_finish_criteria(step_order, lesson_id)
             if self.sb is None:
                 return f"Step {step_order} completion criteria"
             resp = (
@@ -0,0 +1,84 @@
+import threading
+from typing import Any, Callable, Dict
+
+# Returned by LatestFrameCoordinator.run when a newer frame replaced this one
+SUPERSEDED = object()
+
+
+class _UserSlot:
+    __slots__ = ("running", "pending", "next_ticket", "waiters")
+
+    def __init__(self):
+        self.running = False
+        self.pending = None  # ticket of the single queued frame, if any
+        self.next_ticket = 0
+        self.waiters = 0
+
+
+class LatestFrameCoordinator:
+    """
+    Per-user single-flight for screenshot analysis with latest-frame-wins queueing.
+
+    At most one analysis runs per user. While it runs, at most one newer frame waits
+    behind it; a frame arriving later replaces the waiting one, whose caller gets
+    SUPERSEDED back immediately instead of spending a model call on a stale frame.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._slots: Dict[str, _UserSlot] = {}
+        self.superseded = 0
+
+    def run(self, user_id: str, work: Callable[[], Any]) -> Any:
+        """
+        Run `work` for `user_id` once no other analysis is running for that user.
+
+        Args:
+            user_id (str): Key to serialize on
+            work (Callable): Zero-argument function performing the analysis
+
+        Returns:
+            Any: The result of `work`, or SUPERSEDED if a newer frame took this one's place
+        """
+        with self._changed:
+            slot = self._slots.setdefault(user_id, _UserSlot())
+            ticket = slot.next_ticket
+            slot.next_ticket += 1
+
+            if slot.running or slot.pending is not None:
+                # Take the queue position; whoever held it is now stale
+                slot.pending = ticket
+                slot.waiters += 1
+                self._changed.notify_all()
+                while slot.running and slot.pending == ticket:
+                    self._changed.wait()
+                slot.waiters -= 1
+                if slot.pending != ticket:
+                    self.superseded += 1
+                    self._release_if_idle(user_id, slot)
+                    return SUPERSEDED
+                slot.pending = None
+
+            slot.running = True
+
+        try:
+            return work()
+        finally:
+            with self._changed:
+                slot.running = False
+                self._release_if_idle(user_id, slot)
+                self._changed.notify_all()
+
+    def _release_if_idle(self, user_id: str, slot: _UserSlot) -> None:
+        # Drop bookkeeping for users with nothing in flight so the dict stays bounded
+        if not slot.running and slot.pending is None and slot.waiters == 0:
+            self._slots.pop(user_id, None)
+
+    def active_users(self) -> int:
+        with self._lock:
+            return sum(1 for slot in self._slots.values() if slot.running)
+
+
+# Global instance for easy import
+frame_coordinator = LatestFrameCoordinator()
@@ -0,0 +1,151 @@
+import base64
+import io
+import logging
+import os
+import threading
+import time
+from typing import Dict, Hashable, Optional, Union
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; dedup is disabled without it
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Fingerprint grid (columns x rows of mean brightness); a 1920x1080 frame gives 15x15 px cells,
+# small enough that typing a character or highlighting a button moves at least one cell
+GRID_SIZE = (128, 72)
+# Brightness change (0-255) a cell may show before it counts as changed; absorbs encoder noise
+CELL_TOLERANCE = int(os.getenv("FRAME_DEDUP_CELL_TOLERANCE", "4"))
+
+
+def frame_fingerprint(base64_image: Union[str, bytes]) -> Optional[bytes]:
+    """
+    Compute a brightness-grid fingerprint for a screenshot.
+
+    The image is shrunk (box filter) to a GRID_SIZE grayscale grid, so each byte is the
+    mean brightness of one screen cell. Rendering noise (re-encoding, anti-aliasing)
+    moves cells by a level or two; real UI changes move at least one cell well past
+    CELL_TOLERANCE.
+
+    Args:
+        base64_image (str | bytes): Screenshot as a base64 string (data URL prefix allowed)
+            or as raw image bytes
+
+    Returns:
+        Optional[bytes]: Grid fingerprint, or None if the frame cannot be decoded
+    """
+    if Image is None or not base64_image:
+        return None
+    if isinstance(base64_image, (bytes, bytearray)):
+        return fingerprint_bytes(bytes(base64_image))
+    try:
+        if base64_image.startswith("data:"):
+            base64_image = base64_image.split(",", 1)[-1]
+        raw = base64.b64decode(base64_image, validate=True)
+        return fingerprint_bytes(raw)
+    except Exception as e:
+        logger.debug(f"Could not fingerprint frame: {e}")
+        return None
+
+
+def fingerprint_bytes(raw: bytes) -> Optional[bytes]:
+    """Compute the grid fingerprint for already decoded image bytes."""
+    if Image is None or not raw:
+        return None
+    try:
+        with Image.open(io.BytesIO(raw)) as img:
+            # draft() lets JPEG decoders skip most of the work for small targets
+            img.draft("L", (GRID_SIZE[0] * 4, GRID_SIZE[1] * 4))
+            return img.convert("L").resize(GRID_SIZE, Image.BOX).tobytes()
+    except Exception as e:
+        logger.debug(f"Could not fingerprint frame: {e}")
+        return None
+
+
+def frame_distance(a: bytes, b: bytes, tolerance: int = CELL_TOLERANCE) -> int:
+    """Number of grid cells whose brightness differs by more than `tolerance`."""
+    if len(a) != len(b):
+        return len(a) or 1
+    return sum(1 for x, y in zip(a, b) if abs(x - y) > tolerance)
+
+
+class FrameDeduplicator:
+    """
+    Remembers the last analyzed frame per user and scope (e.g. lesson/step) so that
+    frames which have not visibly changed can reuse the previous verdict instead of
+    paying for another vision model call.
+
+    A remembered verdict is reused for at most `max_skips` consecutive frames and
+    `max_age_seconds`, so a change the fingerprint misses delays a step by a bounded
+    amount instead of pinning the old verdict.
+
+    Configuration (environment): FRAME_DEDUP_ENABLED, FRAME_DEDUP_THRESHOLD (changed
+    cells allowed), FRAME_DEDUP_CELL_TOLERANCE, FRAME_DEDUP_MAX_SKIPS,
+    FRAME_DEDUP_MAX_AGE_SECONDS.
+    """
+
+    def __init__(self, threshold: Optional[int] = None, max_skips: Optional[int] = None, max_age_seconds: Optional[float] = None):
+        if threshold is None:
+            threshold = int(os.getenv("FRAME_DEDUP_THRESHOLD", "0"))
+        self.threshold = threshold
+        self.max_skips = max_skips if max_skips is not None else int(os.getenv("FRAME_DEDUP_MAX_SKIPS", "5"))
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else float(os.getenv("FRAME_DEDUP_MAX_AGE_SECONDS", "30"))
+        self.enabled = os.getenv("FRAME_DEDUP_ENABLED", "true").lower() != "false"
+        self._lock = threading.Lock()
+        # { user_id: [scope, fingerprint, verdict, remembered_at, skips] }
+        self._last: Dict[str, list] = {}
+        self.skipped = 0
+
+    def previous_verdict(self, user_id: str, scope: Hashable, fingerprint: Optional[bytes]) -> Optional[str]:
+        """
+        Return the last verdict for this user if the frame is unchanged within the threshold.
+
+        Args:
+            user_id (str): User the frame belongs to
+            scope (Hashable): What the verdict was computed for, e.g. (lesson_id, step_order)
+            fingerprint (Optional[bytes]): Fingerprint of the new frame
+
+        Returns:
+            Optional[str]: The cached verdict, or None if the frame must be analyzed
+        """
+        if not self.enabled or fingerprint is None:
+            return None
+        with self._lock:
+            entry = self._last.get(user_id)
+            if not entry:
+                return None
+            last_scope, last_fingerprint, verdict, remembered_at, skips = entry
+            if last_scope != scope or frame_distance(last_fingerprint, fingerprint) > self.threshold:
+                return None
+            # Bounded reuse: re-check the screen every so often even if it looks the same
+            if skips >= self.max_skips or time.monotonic() - remembered_at > self.max_age_seconds:
+                return None
+            entry[4] = skips + 1
+            self.skipped += 1
+            return verdict
+
+    def remember(self, user_id: str, scope: Hashable, fingerprint: Optional[bytes], verdict: str) -> None:
+        """Record the verdict for the frame that was just analyzed."""
+        if not self.enabled or fingerprint is None:
+            return
+        # Never pin an error response to a frame; the next frame should retry
+        if str(verdict).strip().upper() not in ("YES", "NO"):
+            return
+        with self._lock:
+            self._last[user_id] = [scope, fingerprint, verdict, time.monotonic(), 0]
+
+    def forget(self, user_id: str) -> None:
+        """Drop any remembered frame for a user (e.g. when their step changes)."""
+        with self._lock:
+            self._last.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._last.clear()
+            self.skipped = 0
+
+
+# Global instance for easy import
+frame_deduplicator = FrameDeduplicator()
@@ -0,0 +1,140 @@
+import base64
+import io
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Union
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; frames are forwarded unchanged without it
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+
+@dataclass
+class PreparedImage:
+    """An image ready to be sent to the vision model."""
+    data: bytes
+    media_type: str
+    bytes_in: int
+    bytes_out: int
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.data).decode("ascii")
+
+
+def sniff_media_type(raw: bytes) -> str:
+    """Best-effort media type from magic bytes; screenshots from Electron are PNG."""
+    if raw.startswith(b"\x89PNG"):
+        return "image/png"
+    if raw.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if raw[:4] == b"RIFF" and raw[8:12] == b"WEBP":
+        return "image/webp"
+    if raw[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "image/png"
+
+
+def decode_base64_image(base64_image: str) -> bytes:
+    """Decode a base64 screenshot, accepting an optional data URL prefix."""
+    data = base64_image or ""
+    if data.startswith("data:"):
+        data = data.split(",", 1)[-1]
+    return base64.b64decode(data)
+
+
+class ImagePreparer:
+    """
+    Downscales and re-encodes screenshots before they are sent to the vision model.
+
+    Configuration (environment):
+        IMAGE_PREP_ENABLED   - "false" to forward frames unchanged (default "true")
+        IMAGE_MAX_EDGE       - target long edge in pixels (default 1280)
+        IMAGE_GRAYSCALE      - "true" to drop colour (default "false")
+        IMAGE_FORMAT         - "jpeg" or "webp" (default "jpeg")
+        IMAGE_QUALITY        - encoder quality 1-95 (default 70)
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        max_edge: Optional[int] = None,
+        grayscale: Optional[bool] = None,
+        image_format: Optional[str] = None,
+        quality: Optional[int] = None,
+    ):
+        self.enabled = enabled if enabled is not None else os.getenv("IMAGE_PREP_ENABLED", "true").lower() != "false"
+        self.max_edge = max_edge if max_edge is not None else int(os.getenv("IMAGE_MAX_EDGE", "1280"))
+        self.grayscale = grayscale if grayscale is not None else os.getenv("IMAGE_GRAYSCALE", "false").lower() == "true"
+        fmt = (image_format or os.getenv("IMAGE_FORMAT", "jpeg")).lower()
+        self.image_format = fmt if fmt in _FORMATS else "jpeg"
+        self.quality = quality if quality is not None else int(os.getenv("IMAGE_QUALITY", "70"))
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.total_bytes_in = 0
+        self.total_bytes_out = 0
+
+    def prepare_bytes(self, raw: bytes) -> PreparedImage:
+        """Downscale and re-encode raw image bytes, falling back to the original on failure."""
+        result = self._transform(raw)
+        with self._lock:
+            self.requests += 1
+            self.total_bytes_in += result.bytes_in
+            self.total_bytes_out += result.bytes_out
+        logger.info(f"Prepared image: {result.bytes_in} -> {result.bytes_out} bytes ({result.media_type})")
+        return result
+
+    def prepare(self, image: Union[str, bytes]) -> PreparedImage:
+        """Prepare a screenshot given either as raw bytes or as a base64 string."""
+        if isinstance(image, (bytes, bytearray)):
+            return self.prepare_bytes(bytes(image))
+        return self.prepare_bytes(decode_base64_image(image))
+
+    def _transform(self, raw: bytes) -> PreparedImage:
+        passthrough = PreparedImage(raw, sniff_media_type(raw), len(raw), len(raw))
+        if not self.enabled or Image is None or not raw:
+            return passthrough
+        try:
+            pil_format, media_type = _FORMATS[self.image_format]
+            with Image.open(io.BytesIO(raw)) as img:
+                # JPEG sources can be decoded at reduced scale directly
+                img.draft("L" if self.grayscale else "RGB", (self.max_edge, self.max_edge))
+                img = img.convert("L" if self.grayscale else "RGB")
+                if self.max_edge > 0 and max(img.size) > self.max_edge:
+                    img.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+                out = io.BytesIO()
+                img.save(out, format=pil_format, quality=self.quality)
+            data = out.getvalue()
+        except Exception as e:
+            logger.warning(f"Image preparation failed, forwarding original frame: {e}")
+            return passthrough
+        # Never make a frame bigger than what the client sent
+        if len(data) >= len(raw):
+            return passthrough
+        return PreparedImage(data, media_type, len(raw), len(data))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled and Image is not None,
+                "max_edge": self.max_edge,
+                "grayscale": self.grayscale,
+                "format": self.image_format,
+                "quality": self.quality,
+                "requests": self.requests,
+                "bytes_in": self.total_bytes_in,
+                "bytes_out": self.total_bytes_out,
+            }
+
+
+# Global instance for easy import
+image_preparer = ImagePreparer()
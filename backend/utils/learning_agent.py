@@ -1,12 +1,23 @@
 import os
 import logging
+import re
 import time
-from typing import Dict, Optional, Union
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
 
 from dotenv import load_dotenv
-from letta_client import Letta, MessageCreate, TextContent, ImageContent
-from .database_context import db_context
+from .frame_dedup import frame_deduplicator, frame_fingerprint
+from .verdict_cache import verdict_cache
+from .image_prep import image_preparer
+from .capture_pacing import capture_pacer
+from .popup_dispatcher import popup_dispatcher
+from .session_store import SessionStore, create_session_store
+from .lesson_repository import lesson_repository
+from .progress_writer import progress_writer
+from .agent_context import agent_context
+from .letta_agents import LettaAgentHandle, get_letta_client
+from .completion_context import completion_context
+from .agent_pool import AgentPool
+from .completion_router import completion_router
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,40 +25,54 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# Initialize Lettuce client with error handling
-try:
-    client = Letta(
-        token=os.getenv("LETTA_API_KEY")
-    )
-except Exception as e:
-    logger.error(f"Failed to initialize Lettuce client: {e}")
-    raise
+
+def __getattr__(name: str):
+    """`client` and `task_completion_agent` are resolved on first access (see utils/letta_agents.py)."""
+    if name == "client":
+        return get_letta_client()
+    if name == "task_completion_agent":
+        return task_agent.get()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # In-memory caches/state
-# lesson_cache: { lesson_id: { step_order: { 'name', 'description', 'finish_criteria' } } }
-lesson_cache: Dict[int, Dict[int, Dict[str, str]]] = {}
+# Lesson steps are loaded through lesson_repository (see utils/lesson_repository.py)
 
 # user_state: { user_id: { 'lesson_id': int, 'step_order': int, 'popup_sent_for_step': bool } }
-user_state: Dict[str, Dict[str, Union[int, bool]]] = {}
+# Backend selected by SESSION_STORE (memory, sqlite or redis); see utils/session_store.py
+user_state: SessionStore = create_session_store()
+
+
+def _enter_step(user_id: str, lesson_id: int, step_order: int) -> None:
+    """Record that the user is on (lesson_id, step_order), resetting the popup flag if the step changed."""
+    current = user_state.get(user_id)
+    if current and current["lesson_id"] == lesson_id and current["step_order"] == step_order:
+        return
+    user_state.update(user_id, lesson_id=lesson_id, step_order=step_order, popup_sent_for_step=False)
 
 
 def _ensure_lesson_loaded(lesson_id: int) -> Optional[Dict[int, Dict[str, str]]]:
     """Load all steps for a lesson into memory if not already cached."""
     try:
-        if lesson_id not in lesson_cache:
-            logger.info(f"Loading all lesson steps in batch for lesson {lesson_id}...")
-            lesson_cache[lesson_id] = db_context.get_lesson_steps_batch(lesson_id)
-        return lesson_cache[lesson_id]
+        return lesson_repository.get_steps(lesson_id)
     except Exception as e:
         logger.error(f"Failed to load lesson {lesson_id}: {e}")
         return None
 
 
-def handle_screenshot_event(user_id: str, lesson_id: int, step_order: int, base64_image: str) -> Dict[str, Union[str, int]]:
+def handle_screenshot_event(user_id: str, lesson_id: int, step_order: int, base64_image: Union[str, bytes]) -> Dict[str, Union[str, int]]:
     """
     Event-driven handler: called whenever a new screenshot arrives.
     Uses in-memory lesson data; sends popup once per step, then checks completion on subsequent screenshots.
+    The screenshot may be a base64 string or raw image bytes from the binary ingest route.
+    Every result carries `next_capture_after_ms`, the server's hint for when to send the next frame.
     """
+    result = _advance_on_screenshot(user_id, lesson_id, step_order, base64_image)
+    result["next_capture_after_ms"] = capture_pacer.next_capture_after_ms(user_id)
+    return result
+
+
+def _advance_on_screenshot(user_id: str, lesson_id: int, step_order: int, base64_image: Union[str, bytes]) -> Dict[str, Union[str, int]]:
+    """Popup/completion/progression logic behind handle_screenshot_event."""
     try:
         # Ensure lesson data is cached
         lesson_data = _ensure_lesson_loaded(lesson_id)
@@ -56,42 +81,96 @@ def handle_screenshot_event(user_id: str, lesson_id: int, step_order: int, base6
             return {"completed": False, "error": "Lesson or step not found"}
 
         # Update user state
-        state = user_state.setdefault(user_id, {"lesson_id": lesson_id, "step_order": step_order, "popup_sent_for_step": False})
-        state["lesson_id"] = lesson_id
-        state["step_order"] = step_order
+        _enter_step(user_id, lesson_id, step_order)
 
         step_info = lesson_data[step_order]
         step_description = step_info["description"]
         finish_criteria = step_info["finish_criteria"]
 
-        # If popup not yet sent for this step, generate and send it now, then return
-        if not state.get("popup_sent_for_step"):
+        # If popup not yet sent for this step, generate and send it now, then return.
+        # claim_popup is atomic, so concurrent frames/workers send it only once.
+        if user_state.claim_popup(user_id, lesson_id, step_order):
             popup_message = generate_and_send_popup_message(base64_image, step_description, user_id)
-            state["popup_sent_for_step"] = True
             return {"completed": False, "step_order": step_order}
 
-        # Otherwise, check completion using this latest screenshot
-        completion_result = analyze_screenshot(base64_image, finish_criteria, lesson_id)
+        # Otherwise, check completion using this latest screenshot.
+        # Unchanged frames reuse the previous verdict instead of calling the model again.
+        scope = (lesson_id, step_order)
+        fingerprint = frame_fingerprint(base64_image)
+        completion_result = frame_deduplicator.previous_verdict(user_id, scope, fingerprint)
+        skipped = {"skipped": "unchanged"} if completion_result is not None else {}
+        capture_pacer.record_frame(user_id, changed=completion_result is None)
+        # Furthest step this frame shows as done (the current one unless lookahead finds a later one)
+        furthest = step_order
+        lookahead = _lookahead_orders(lesson_data, step_order)
+        if completion_result is None and lookahead:
+            furthest, completion_result = _furthest_completed_step(base64_image, lesson_data, [step_order] + lookahead, lesson_id, user_id)
+            frame_deduplicator.remember(user_id, scope, fingerprint, completion_result)
+        elif completion_result is None:
+            completion_result = analyze_screenshot(base64_image, finish_criteria, lesson_id, user_id)
+            frame_deduplicator.remember(user_id, scope, fingerprint, completion_result)
         is_completed = completion_result.strip().upper() == "YES"
+        if is_completed and furthest != step_order:
+            skipped = {**skipped, "steps_completed": len([o for o in lesson_data if step_order <= o <= furthest])}
         
         if is_completed:
-            next_step_order = step_order + 1
+            next_step_order = furthest + 1
             if next_step_order in lesson_data:
-                # Advance to next step; reset popup flag
-                state["step_order"] = next_step_order
-                state["popup_sent_for_step"] = False
-                return {"completed": True, "next_step_order": next_step_order}
+                # Advance to next step and reset popup flag, unless another frame already moved the user
+                if user_state.compare_and_advance(user_id, lesson_id, step_order, next_step_order):
+                    progress_writer.record(user_id, lesson_id, next_step_order)
+                else:
+                    logger.info(f"User {user_id} already moved past step {step_order}; not advancing again")
+                return {"completed": True, "next_step_order": next_step_order, **skipped}
             else:
                 # Lesson complete
-                user_state.pop(user_id, None)
-                return {"completed": True, "lesson_completed": True}
+                progress_writer.record(user_id, lesson_id, furthest, completed=True)
+                user_state.delete(user_id)
+                frame_deduplicator.forget(user_id)
+                capture_pacer.forget(user_id)
+                return {"completed": True, "lesson_completed": True, **skipped}
 
         # Not completed; wait for another screenshot
-        return {"completed": False, "step_order": step_order}
+        return {"completed": False, "step_order": step_order, **skipped}
     except Exception as e:
         logger.error(f"Error in handle_screenshot_event: {e}")
         return {"completed": False, "error": f"Internal error: {str(e)}"}
 
+# Lookahead: check the current step and up to this many following steps in one model call
+COMPLETION_LOOKAHEAD_STEPS = max(0, int(os.getenv("COMPLETION_LOOKAHEAD_STEPS", "0")))
+
+
+def _lookahead_orders(lesson_data: Dict[int, Dict[str, str]], step_order: int) -> List[int]:
+    """Orders of the steps after `step_order` to check alongside it (empty when lookahead is off)."""
+    if not COMPLETION_LOOKAHEAD_STEPS:
+        return []
+    return sorted(order for order in lesson_data if order > step_order)[:COMPLETION_LOOKAHEAD_STEPS]
+
+
+def _furthest_completed_step(base64_image: Union[str, bytes], lesson_data: Dict[int, Dict[str, str]], orders: List[int], lesson_id: int, user_id: str) -> Tuple[int, str]:
+    """
+    Check the frame against every step in `orders` in one call.
+
+    A later step's criteria showing as met means the earlier ones were done too, even
+    when their own result is no longer on screen, so the furthest YES wins.
+
+    If the combined check failed or gave no explicit answer for the current step, the
+    current step falls back to the single-step check.
+
+    Returns:
+        Tuple[int, str]: (furthest completed step order, "YES"), or (orders[0], verdict for
+                         the current step) when no step is known to be completed
+    """
+    verdicts = analyze_screenshot_steps(base64_image, [lesson_data[order]["finish_criteria"] for order in orders], lesson_id, user_id)
+    verdicts = verdicts or [None] * len(orders)
+    completed = [order for order, done in zip(orders, verdicts) if done]
+    if completed:
+        return completed[-1], "YES"
+    if verdicts[0] is None:
+        return orders[0], analyze_screenshot(base64_image, lesson_data[orders[0]]["finish_criteria"], lesson_id, user_id)
+    return orders[0], "NO"
+
+
 # Agent: Task completion decider
 SYSTEM_PROMPT = """You are a task completion decider. Your ONLY job is to determine if a user has completed a task by comparing their screenshot against the finish criteria.
 
@@ -105,36 +184,74 @@ OUTPUT FORMAT:
 - Do not provide explanations, reasoning, or additional text
 - Be precise: only say "YES" if the screenshot exactly matches the finish criteria"""
 
-# Initialize task completion agent with error handling
-try:
-    task_completion_agent = client.agents.create(
-        name="Task Completion Decider",
+# Fast tier of the completion cascade: may defer to the strong model (see utils/completion_router.py)
+SCREENER_SYSTEM_PROMPT = """You are a task completion screener. Decide if a user has completed a task by comparing their screenshot against the finish criteria.
+
+OUTPUT FORMAT:
+- Answer with ONLY "YES", "NO" or "UNSURE"
+- Answer "UNSURE" whenever the screenshot is ambiguous or you are not confident
+- Do not provide explanations, reasoning, or additional text"""
+
+# Task completion agents: reused across boots (by LETTA_TASK_AGENT_IDS/LETTA_TASK_AGENT_ID, saved
+# id or name) and resolved on first use, so importing this module makes no network calls. Their
+# history is bounded per COMPLETION_CONTEXT_MODE (see utils/completion_context.py)
+TASK_AGENT_POOL_SIZE = max(1, int(os.getenv("TASK_AGENT_POOL_SIZE", "1")))
+_task_agent_ids = [i.strip() for i in os.getenv("LETTA_TASK_AGENT_IDS", os.getenv("LETTA_TASK_AGENT_ID", "")).split(",")]
+_screener_agent_ids = [i.strip() for i in os.getenv("LETTA_SCREENER_AGENT_IDS", "").split(",")]
+
+
+def _task_agent_handle(index: int) -> LettaAgentHandle:
+    # The first agent keeps the original name so existing deployments reuse it
+    return LettaAgentHandle(
+        "Task Completion Decider" if index == 0 else f"Task Completion Decider {index + 1}",
+        agent_id=(_task_agent_ids[index] if index < len(_task_agent_ids) else None) or None,
+        enforce=completion_context.agent_settings(),
         system=SYSTEM_PROMPT,
-        model="openai/gpt-4o",
+        model=os.getenv("COMPLETION_STRONG_MODEL", "openai/gpt-4o"),
         embedding="openai/text-embedding-3-small",
         tools=[],
-        include_base_tools=False
+        include_base_tools=False,
+        **completion_context.create_settings()
     )
-    logger.info("Successfully created Lettuce task completion agent")
-except Exception as e:
-    logger.error(f"Failed to create Lettuce task agent: {e}")
-    raise
 
 
-def analyze_screenshot(base64_image: str, finish_criteria: str, lesson_id: Optional[str] = None) -> str:
-    """Analyze screenshot to determine if task completion criteria are met."""
-    try:
-        # Get context from database
-        context = ""
-        
-        if lesson_id:
-            # Note: This will need to be updated to use async when called from async context
-            context += db_context.get_relevant_context("lesson", lesson_id)
-        
-        prompt = SYSTEM_PROMPT + context
+def _screener_agent_handle(index: int) -> LettaAgentHandle:
+    return LettaAgentHandle(
+        "Task Completion Screener" if index == 0 else f"Task Completion Screener {index + 1}",
+        agent_id=(_screener_agent_ids[index] if index < len(_screener_agent_ids) else None) or None,
+        enforce=completion_context.agent_settings(),
+        system=SCREENER_SYSTEM_PROMPT,
+        model=os.getenv("COMPLETION_FAST_MODEL", "openai/gpt-4o-mini"),
+        embedding="openai/text-embedding-3-small",
+        tools=[],
+        include_base_tools=False,
+        **completion_context.create_settings()
+    )
+
+
+# Users are spread over the pool by consistent hashing on user_id (see utils/agent_pool.py)
+task_agents = AgentPool([_task_agent_handle(i) for i in range(TASK_AGENT_POOL_SIZE)])
+task_agent = task_agents.handles[0]
+# Fast tier of the cascade; only resolved when COMPLETION_CASCADE_ENABLED is set
+screener_agents = AgentPool([_screener_agent_handle(i) for i in range(TASK_AGENT_POOL_SIZE)])
 
+# Opt back into resolving the agent at import, failing the boot if Letta is unreachable
+if os.getenv("LETTA_EAGER_INIT", "false").lower() in ("1", "true", "yes"):
+    for _handle in task_agents.handles + (screener_agents.handles if completion_router.enabled else []):
+        _handle.get()
+
+
+def _ask_agents(pool: AgentPool, user_id: Optional[str], prompt: str, image_data: str, media_type: str) -> Optional[str]:
+    """Send one screenshot + prompt to the pool agent for `user_id`; return its reply text, or None."""
+    from letta_client import MessageCreate, TextContent, ImageContent
+
+    client = get_letta_client()
+    agent = pool.agent_for(user_id)
+    started = time.monotonic()
+    try:
+        agent_id = agent.id
         response = client.agents.messages.create(
-            agent_id=task_completion_agent.id,
+            agent_id=agent_id,
             messages=[
                 MessageCreate(
                     role="user",
@@ -142,25 +259,92 @@ def analyze_screenshot(base64_image: str, finish_criteria: str, lesson_id: Optio
                         ImageContent(
                             source={
                                 "type": "base64",
-                                "media_type": "image/jpeg",
-                                "data": base64_image,
+                                "media_type": media_type,
+                                "data": image_data,
                             }
                         ),
-                        TextContent(
-                            text=f"FINISH CRITERIA: {finish_criteria}\n\nIs the task completed? Answer YES or NO."
-                        )
+                        TextContent(text=prompt)
                     ],
                 )
             ],
         )
+    except Exception:
+        pool.record(agent, time.monotonic() - started, ok=False)
+        raise
+    pool.record(agent, time.monotonic() - started, ok=True)
+    completion_context.after_call(client, agent_id)
+
+    # Extract the response content
+    for message in response.messages or []:
+        if hasattr(message, 'content') and message.content:
+            logger.info(f"Agent response ({agent.name}): {message.content}")
+            return str(message.content)
+    return None
+
+
+def _prepare_image(base64_image: Union[str, bytes]) -> Tuple[str, str]:
+    """Downscale/re-encode before upload; fall back to the raw frame if it cannot be decoded."""
+    try:
+        prepared = image_preparer.prepare(base64_image)
+        return prepared.to_base64(), prepared.media_type
+    except Exception as prep_err:
+        logger.warning(f"Could not prepare screenshot, sending as-is: {prep_err}")
+        return base64_image, "image/jpeg"
+
+
+def analyze_screenshot(base64_image: Union[str, bytes], finish_criteria: str, lesson_id: Optional[str] = None, user_id: Optional[str] = None) -> str:
+    """
+    Analyze screenshot (base64 string or raw bytes) to determine if task completion criteria are met.
+    The check runs on the pool agent that `user_id` hashes to; with the cascade enabled the fast
+    tier answers first and only unsure answers or hard criteria reach the strong model.
+    """
+    try:
+        # Identical frame/criteria pairs (client retries, duplicate tabs) reuse the cached verdict
+        cache_key = verdict_cache.make_key(base64_image, finish_criteria)
+        cached = verdict_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Precomputed per lesson and user; the system prompt itself is configured on the agent
+        context = (agent_context.lesson_context(lesson_id) if lesson_id else "") + agent_context.user_context(user_id)
+        image_data, media_type = _prepare_image(base64_image)
+
+        hard, criteria = completion_router.split_hard(finish_criteria)
+        if not completion_router.enabled:
+            route = "strong_only"
+        elif hard:
+            route = "hard"
+        else:
+            capture_pacer.record_model_call("fast")
+            started = time.monotonic()
+            try:
+                answer = _ask_agents(
+                    screener_agents, user_id, image_data=image_data, media_type=media_type,
+                    prompt=f"{context}FINISH CRITERIA: {criteria}\n\nIs the task completed? Answer YES, NO or UNSURE.",
+                )
+                route = "escalated_unsure"
+            except Exception as e:
+                logger.warning(f"Fast completion check failed, escalating: {e}")
+                answer, route = None, "escalated_error"
+            completion_router.record_latency("fast", time.monotonic() - started)
+            decision = completion_router.decisive(answer)
+            if decision is not None:
+                completion_router.record_route("fast")
+                verdict_cache.put(cache_key, decision)
+                return decision
+        completion_router.record_route(route)
+
+        capture_pacer.record_model_call("strong")
+        started = time.monotonic()
+        answer = _ask_agents(
+            task_agents, user_id, image_data=image_data, media_type=media_type,
+            prompt=f"{context}FINISH CRITERIA: {criteria}\n\nIs the task completed? Answer YES or NO.",
+        )
+        completion_router.record_latency("strong", time.monotonic() - started)
+        if answer is not None:
+            verdict_cache.put(cache_key, answer)
+            return answer
 
-        # Extract the response content
-        if response.messages:
-            for message in response.messages:
-                if hasattr(message, 'content') and message.content:
-                    logger.info(f"Agent response: {message.content}")
-                    return str(message.content)
-        
         logger.warning("No response received from agent")
         return "No response received from agent"
     except Exception as e:
@@ -168,6 +352,74 @@ def analyze_screenshot(base64_image: str, finish_criteria: str, lesson_id: Optio
         return "ERROR"
 
 
+_STEP_VERDICT_LINE = re.compile(r"^\W*(?:step\s*)?(\d+)\W+(YES|NO)\b", re.IGNORECASE | re.MULTILINE)
+
+
+def _parse_step_verdicts(answer: Optional[str], count: int) -> List[Optional[bool]]:
+    """
+    Parse "<n>: YES/NO" lines into one verdict per criterion. Criteria without a line of
+    their own (including every criterion when the reply is a bare YES/NO) are None: unknown.
+    """
+    verdicts: List[Optional[bool]] = [None] * count
+    for number, word in _STEP_VERDICT_LINE.findall(answer or ""):
+        if 1 <= int(number) <= count:
+            verdicts[int(number) - 1] = word.upper() == "YES"
+    return verdicts
+
+
+def analyze_screenshot_steps(base64_image: Union[str, bytes], criteria: List[str], lesson_id: Optional[int] = None, user_id: Optional[str] = None) -> Optional[List[Optional[bool]]]:
+    """
+    Check one screenshot against several steps' finish criteria in a single structured call.
+
+    Args:
+        base64_image (Union[str, bytes]): Screenshot, as for analyze_screenshot
+        criteria (List[str]): Finish criteria, current step first
+        lesson_id (int): Lesson, for the agent context
+        user_id (str): User, to pick the pool agent
+
+    Returns:
+        Optional[List[Optional[bool]]]: Whether each criterion is met (None where the model gave
+                                        no explicit answer), or None if the check failed
+    """
+    try:
+        # Per-criterion verdicts share cache entries with analyze_screenshot
+        cache_keys = [verdict_cache.make_key(base64_image, c) for c in criteria]
+        cached = [verdict_cache.get(key) for key in cache_keys]
+        if all(verdict is not None for verdict in cached):
+            return [verdict.strip().upper() == "YES" for verdict in cached]
+
+        cleaned = [completion_router.split_hard(c)[1] for c in criteria]
+        numbered = "\n".join(f"{i}. {c}" for i, c in enumerate(cleaned, start=1))
+
+        context = (agent_context.lesson_context(lesson_id) if lesson_id else "") + agent_context.user_context(user_id)
+        image_data, media_type = _prepare_image(base64_image)
+
+        # Multi-step checks go to the strong tier: several criteria in one answer is the harder task
+        completion_router.record_route("lookahead")
+        capture_pacer.record_model_call("strong")
+        started = time.monotonic()
+        answer = _ask_agents(
+            task_agents, user_id, image_data=image_data, media_type=media_type,
+            prompt=(
+                f"{context}FINISH CRITERIA (one per step, in order):\n{numbered}\n\n"
+                f"For each numbered criterion, is it met in this screenshot? "
+                f"Answer with one line per criterion in the form \"<number>: YES\" or \"<number>: NO\"."
+            ),
+        )
+        completion_router.record_latency("strong", time.monotonic() - started)
+        verdicts = _parse_step_verdicts(answer, len(criteria))
+        if all(done is None for done in verdicts):
+            logger.warning(f"No per-step verdicts in lookahead response: {answer!r}")
+        # Only explicit answers are cached; an unknown must not pin a NO for single-step checks
+        for key, done in zip(cache_keys, verdicts):
+            if done is not None:
+                verdict_cache.put(key, "YES" if done else "NO")
+        return verdicts
+    except Exception as e:
+        logger.error(f"Error analyzing screenshot with lookahead: {e}")
+        return None
+
+
 def generate_and_send_popup_message(base64_image: str, step_description: str, user_id: Optional[str] = None) -> str:
     """
     Send the step description as the popup message via WebSocket (no screenshot or model call).
@@ -183,6 +435,9 @@ def generate_and_send_popup_message(base64_image: str, step_description: str, us
     try:
         popup_message = (step_description or "").strip() or ""
         logger.info(f"Generated popup message (from description): {popup_message}")
+        if user_id:
+            # Users act right after a popup; capture faster for a while
+            capture_pacer.record_popup(user_id)
         # Send popup message via WebSocket API
         send_popup_via_websocket(popup_message, user_id)
         return popup_message
@@ -193,7 +448,10 @@ def generate_and_send_popup_message(base64_image: str, step_description: str, us
 
 def send_popup_via_websocket(message: str, user_id: Optional[str] = None) -> bool:
     """
-    Send popup message to frontend via WebSocket API.
+    Send popup message to frontend via WebSocket.
+
+    Delivery goes through `popup_dispatcher`; inside the Flask app it emits on Socket.IO
+    in process, otherwise it falls back to POSTing to the /api/send-popup route.
     
     Args:
         message (str): Popup message to send
@@ -203,30 +461,7 @@ def send_popup_via_websocket(message: str, user_id: Optional[str] = None) -> boo
         bool: True if successful, False otherwise
     """
     try:
-        import requests
-        
-        # WebSocket API endpoint (adjust URL as needed)
-        websocket_api_url = "http://localhost:5000/api/send-popup"
-        
-        payload = {
-            "message": message,
-            "type": "popup",
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        if user_id:
-            payload["user_id"] = user_id
-        
-        # Send to WebSocket API
-        response = requests.post(websocket_api_url, json=payload, timeout=10)
-        
-        if response.status_code == 200:
-            logger.info(f"Popup sent successfully via WebSocket: {message[:50]}...")
-            return True
-        else:
-            logger.error(f"Failed to send popup via WebSocket: {response.status_code}")
-            return False
-            
+        return popup_dispatcher.send(message, user_id)["delivered"]
     except Exception as e:
         logger.error(f"Error sending popup via WebSocket: {e}")
         return False
@@ -253,10 +488,7 @@ def execute_learning_flow(lesson_id: int, step_order: int, base64_image: str, us
         logger.info(f"Starting learning flow for Lesson ID {lesson_id}, Step {step_order}")
         
         # PERFORMANCE OPTIMIZATION: Ensure ALL lesson data is loaded (cached)
-        if lesson_id not in lesson_cache:
-            logger.info("Loading all lesson steps in batch...")
-            lesson_cache[lesson_id] = db_context.get_lesson_steps_batch(lesson_id)
-        lesson_data = lesson_cache[lesson_id]
+        lesson_data = _ensure_lesson_loaded(lesson_id)
         
         if not lesson_data:
             logger.warning("No lesson data found - END")
@@ -278,14 +510,11 @@ def execute_learning_flow(lesson_id: int, step_order: int, base64_image: str, us
         
         # Generate popup and send via WebSocket (only once per step/user)
         if user_id:
-            state = user_state.setdefault(user_id, {"lesson_id": lesson_id, "step_order": step_order, "popup_sent_for_step": False})
-            state["lesson_id"] = lesson_id
-            state["step_order"] = step_order
-            if not state.get("popup_sent_for_step"):
+            _enter_step(user_id, lesson_id, step_order)
+            if user_state.claim_popup(user_id, lesson_id, step_order):
                 logger.info("Generating popup message and sending via WebSocket...")
                 popup_message = generate_and_send_popup_message(base64_image, step_description, user_id)
                 logger.info(f"Generated and sent popup: {popup_message}")
-                state["popup_sent_for_step"] = True
         else:
             logger.info("Generating popup message and sending via WebSocket...")
             popup_message = generate_and_send_popup_message(base64_image, step_description)
@@ -313,8 +542,8 @@ def execute_learning_flow(lesson_id: int, step_order: int, base64_image: str, us
                 # Check if next step exists (using cached data - no database call!)
                 if next_step_order in lesson_data:
                     # Reset popup state for next step and loop back
-                    if user_id and user_id in user_state:
-                        user_state[user_id]["popup_sent_for_step"] = False
+                    if user_id and user_state.compare_and_advance(user_id, lesson_id, step_order, next_step_order):
+                        agent_context.invalidate_users([user_id])
                     logger.info(f"Looping back to start with Step {next_step_order}")
                     return execute_learning_flow_with_data(lesson_data, lesson_id, next_step_order, base64_image, user_id)
                 else:
@@ -369,14 +598,11 @@ def execute_learning_flow_with_data(lesson_data: Dict[int, Dict[str, str]], less
         
         # Generate popup and send via WebSocket (only once per step/user)
         if user_id:
-            state = user_state.setdefault(user_id, {"lesson_id": lesson_id, "step_order": step_order, "popup_sent_for_step": False})
-            state["lesson_id"] = lesson_id
-            state["step_order"] = step_order
-            if not state.get("popup_sent_for_step"):
+            _enter_step(user_id, lesson_id, step_order)
+            if user_state.claim_popup(user_id, lesson_id, step_order):
                 logger.info("Generating popup message and sending via WebSocket...")
                 popup_message = generate_and_send_popup_message(base64_image, step_description, user_id)
                 logger.info(f"Generated and sent popup: {popup_message}")
-                state["popup_sent_for_step"] = True
         else:
             logger.info("Generating popup message and sending via WebSocket...")
             popup_message = generate_and_send_popup_message(base64_image, step_description)
@@ -404,8 +630,8 @@ def execute_learning_flow_with_data(lesson_data: Dict[int, Dict[str, str]], less
                 # Check if next step exists (using cached data - no database call!)
                 if next_step_order in lesson_data:
                     # Reset popup state for next step and loop back
-                    if user_id and user_id in user_state:
-                        user_state[user_id]["popup_sent_for_step"] = False
+                    if user_id and user_state.compare_and_advance(user_id, lesson_id, step_order, next_step_order):
+                        agent_context.invalidate_users([user_id])
                     logger.info(f"Looping back to start with Step {next_step_order}")
                     return execute_learning_flow_with_data(lesson_data, lesson_id, next_step_order, base64_image, user_id)
                 else:
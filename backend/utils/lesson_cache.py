@@ -0,0 +1,158 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# Lesson steps as returned by DatabaseContextProvider.get_lesson_steps_batch
+# { step_order: { 'name', 'description', 'finish_criteria' } }
+LessonSteps = Dict[int, Dict[str, str]]
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate deep size in bytes of the nested dict/str/int structures we cache."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class LessonCache:
+    """
+    Bounded per-worker cache of lesson steps.
+
+    Entries expire after `ttl_seconds`; the least recently used lessons are evicted once
+    `max_entries` or `max_bytes` is exceeded. Writers to the lesson/step tables call
+    `invalidate` so regenerated courses are picked up without a restart; other workers
+    converge within one TTL.
+
+    Configuration (environment): LESSON_CACHE_MAX_ENTRIES, LESSON_CACHE_MAX_BYTES,
+    LESSON_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("LESSON_CACHE_MAX_ENTRIES", "256"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("LESSON_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("LESSON_CACHE_TTL_SECONDS", "600"))
+        self._lock = threading.Lock()
+        # { lesson_id: (loaded_at, expires_at, steps, size_bytes) }
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Called with the lesson_id (None = all) after every invalidate, e.g. to drop derived caches
+        self._invalidation_listeners: List[Callable[[Optional[int]], None]] = []
+
+    def add_invalidation_listener(self, listener: Callable[[Optional[int]], None]) -> None:
+        self._invalidation_listeners.append(listener)
+
+    def _drop(self, lesson_id: int) -> None:
+        entry = self._entries.pop(lesson_id, None)
+        if entry is not None:
+            self._bytes -= entry[3]
+
+    def get(self, lesson_id: int) -> Optional[LessonSteps]:
+        """Return cached steps for a lesson, or None on a miss or expired entry."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(lesson_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] <= now:
+                self._drop(lesson_id)
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(lesson_id)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, lesson_id: int, steps: LessonSteps, ttl_seconds: Optional[float] = None) -> None:
+        """Cache steps for a lesson; `ttl_seconds` overrides the default TTL for this entry."""
+        size = estimate_size(steps)
+        now = time.monotonic()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._drop(lesson_id)
+            self._entries[lesson_id] = (now, now + ttl, steps, size)
+            self._bytes += size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def reserve(self, entries: int) -> bool:
+        """Raise `max_entries` to at least `entries` (e.g. the warm-up set); True if it grew."""
+        with self._lock:
+            if entries <= self.max_entries:
+                return False
+            self.max_entries = entries
+            return True
+
+    def invalidate(self, lesson_id: Optional[int] = None) -> None:
+        """Drop one lesson, or every lesson when `lesson_id` is None."""
+        with self._lock:
+            if lesson_id is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+            elif lesson_id in self._entries:
+                self._drop(lesson_id)
+                self.invalidations += 1
+        for listener in self._invalidation_listeners:
+            listener(lesson_id)
+
+    def __contains__(self, lesson_id: int) -> bool:
+        with self._lock:
+            entry = self._entries.get(lesson_id)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Per-entry view for the introspection endpoint, most recently used last."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "lesson_id": lesson_id,
+                    "steps": len(steps),
+                    "bytes": size,
+                    "age_seconds": round(now - loaded_at, 3),
+                    "expires_in_seconds": round(expires_at - now, 3),
+                }
+                for lesson_id, (loaded_at, expires_at, steps, size) in self._entries.items()
+            ]
+
+
+# Global instance for easy import
+lesson_cache = LessonCache()
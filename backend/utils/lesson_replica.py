@@ -0,0 +1,261 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .database_context import DatabaseContextProvider, db_context
+
+logger = logging.getLogger(__name__)
+
+
+class LessonReplica:
+    """
+    Local SQLite mirror of the Supabase `lesson` and `step` tables.
+
+    Once attached to a DatabaseContextProvider, its lesson/step read methods are answered
+    from the mirror (indexed on lesson_order and (lesson_id, step_order)) instead of a
+    remote HTTPS call. A background thread keeps the mirror in sync:
+
+      - incremental pulls of rows whose watermark column (LESSON_REPLICA_WATERMARK_COLUMN,
+        default "updated_at") is at or after the last one seen; rows sharing that timestamp
+        may commit after a pull, so they are fetched again and upserted;
+      - a full refresh when there is no watermark yet, when the tables have no such column,
+        and every LESSON_REPLICA_FULL_REFRESH_SECONDS so deleted rows disappear.
+
+    The mirror file survives restarts, so the replica keeps serving from the last sync
+    while Supabase is unreachable.
+
+    Configuration (environment): LESSON_REPLICA_PATH, LESSON_REPLICA_SYNC_SECONDS,
+    LESSON_REPLICA_FULL_REFRESH_SECONDS, LESSON_REPLICA_WATERMARK_COLUMN.
+    """
+
+    def __init__(self, path: str, source: DatabaseContextProvider, sync_seconds: Optional[float] = None, full_refresh_seconds: Optional[float] = None, watermark_column: Optional[str] = None):
+        self.path = path
+        self.source = source
+        self.sync_seconds = sync_seconds if sync_seconds is not None else float(os.getenv("LESSON_REPLICA_SYNC_SECONDS", "30"))
+        self.full_refresh_seconds = full_refresh_seconds if full_refresh_seconds is not None else float(os.getenv("LESSON_REPLICA_FULL_REFRESH_SECONDS", "3600"))
+        self.watermark_column = watermark_column or os.getenv("LESSON_REPLICA_WATERMARK_COLUMN", "updated_at")
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.syncs = 0
+        self.full_refreshes = 0
+        self.sync_errors = 0
+        self.last_sync_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        conn = self._connection()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS lesson (
+                id INTEGER PRIMARY KEY,
+                lesson_order INTEGER,
+                name TEXT,
+                watermark TEXT
+            );
+            CREATE INDEX IF NOT EXISTS lesson_by_order ON lesson (lesson_order);
+            CREATE TABLE IF NOT EXISTS step (
+                lesson_id INTEGER NOT NULL,
+                step_order INTEGER NOT NULL,
+                name TEXT,
+                description TEXT,
+                finish_criteria TEXT,
+                watermark TEXT,
+                PRIMARY KEY (lesson_id, step_order)
+            );
+            CREATE TABLE IF NOT EXISTS replica_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._connection().execute("SELECT value FROM replica_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set_meta(conn: sqlite3.Connection, key: str, value: Optional[str]) -> None:
+        conn.execute(
+            "INSERT INTO replica_meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    @property
+    def ready(self) -> bool:
+        """True once the mirror holds a completed full refresh (from this run or a previous one)."""
+        return self._meta("last_full_refresh") is not None
+
+    # ---- reads (same contracts as DatabaseContextProvider) ----
+
+    def get_lesson_id_by_order(self, lesson_order: int) -> Optional[int]:
+        row = self._connection().execute(
+            "SELECT id FROM lesson WHERE lesson_order = ? ORDER BY id LIMIT 1", (lesson_order,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_lesson_steps_batch(self, lesson_id: int) -> Dict[int, Dict[str, str]]:
+        rows = self._connection().execute(
+            "SELECT step_order, name, description, finish_criteria FROM step WHERE lesson_id = ? ORDER BY step_order",
+            (lesson_id,),
+        ).fetchall()
+        return DatabaseContextProvider._steps_from_rows(
+            [{"step_order": r[0], "name": r[1], "description": r[2], "finish_criteria": r[3]} for r in rows]
+        )
+
+    def get_step_by_order_and_lesson(self, step_order: int, lesson_id: int) -> Tuple[str, str]:
+        row = self._connection().execute(
+            "SELECT name, description FROM step WHERE lesson_id = ? AND step_order = ?", (lesson_id, step_order)
+        ).fetchone()
+        return (row[0] or "", row[1] or "") if row else ("", "")
+
+    def get_step_finish_criteria(self, step_order: int, lesson_id: int) -> str:
+        row = self._connection().execute(
+            "SELECT finish_criteria FROM step WHERE lesson_id = ? AND step_order = ?", (lesson_id, step_order)
+        ).fetchone()
+        return row[0] if row and row[0] else f"Step {step_order} completion criteria"
+
+    # ---- sync ----
+
+    def _lesson_values(self, row: Dict[str, Any]) -> tuple:
+        return (row["id"], row.get("lesson_order"), row.get("name"), row.get(self.watermark_column))
+
+    def _step_values(self, row: Dict[str, Any]) -> tuple:
+        return (
+            row["lesson_id"], row["step_order"], row.get("name"), row.get("description"),
+            row.get("finish_criteria"), row.get(self.watermark_column),
+        )
+
+    @staticmethod
+    def _max_watermark(values: List[Optional[str]], current: Optional[str]) -> Optional[str]:
+        present = [v for v in values if v is not None]
+        if current is not None:
+            present.append(current)
+        return max(present) if present else None
+
+    def full_refresh(self) -> None:
+        """Replace the mirror with every lesson and step, in one paged embedded query."""
+        lessons = self.source.get_all_lessons_with_steps()
+        steps = [step for lesson in lessons for step in (lesson.get("step") or [])]
+        watermark = self._max_watermark(
+            [lesson.get(self.watermark_column) for lesson in lessons] + [s.get(self.watermark_column) for s in steps], None
+        )
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM step")
+            conn.execute("DELETE FROM lesson")
+            conn.executemany("INSERT INTO lesson VALUES (?, ?, ?, ?)", [self._lesson_values(lesson) for lesson in lessons])
+            conn.executemany("INSERT OR REPLACE INTO step VALUES (?, ?, ?, ?, ?, ?)", [self._step_values(s) for s in steps])
+            self._set_meta(conn, "watermark", watermark)
+            self._set_meta(conn, "last_full_refresh", str(time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.full_refreshes += 1
+        logger.info(f"Lesson replica refreshed: {len(lessons)} lessons, {len(steps)} steps")
+
+    def _pull_incremental(self, watermark: str) -> None:
+        sb = self.source.sb
+        lessons = sb.table("lesson").select("*").gte(self.watermark_column, watermark).order(self.watermark_column).execute().data or []
+        steps = sb.table("step").select("*").gte(self.watermark_column, watermark).order(self.watermark_column).execute().data or []
+        new_watermark = self._max_watermark(
+            [lesson.get(self.watermark_column) for lesson in lessons] + [s.get(self.watermark_column) for s in steps], watermark
+        )
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO lesson VALUES (?, ?, ?, ?)", [self._lesson_values(lesson) for lesson in lessons])
+            conn.executemany("INSERT OR REPLACE INTO step VALUES (?, ?, ?, ?, ?, ?)", [self._step_values(s) for s in steps])
+            self._set_meta(conn, "watermark", new_watermark)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def sync(self) -> bool:
+        """
+        Pull changes from Supabase, incrementally when possible.
+
+        Returns:
+            bool: True if the mirror is now up to date; False if Supabase could not be reached
+                  (the mirror keeps serving its previous contents)
+        """
+        with self._sync_lock:
+            try:
+                if self.source.sb is None:
+                    raise RuntimeError("Supabase client unavailable")
+                watermark = self._meta("watermark")
+                last_full = self._meta("last_full_refresh")
+                due = last_full is None or time.time() - float(last_full) >= self.full_refresh_seconds
+                if watermark is None or due:
+                    self.full_refresh()
+                else:
+                    try:
+                        self._pull_incremental(watermark)
+                    except Exception as e:
+                        logger.warning(f"Incremental lesson replica pull failed ({e}); doing a full refresh")
+                        self.full_refresh()
+                self.syncs += 1
+                self.last_sync_at = time.time()
+                self.last_error = None
+                return True
+            except Exception as e:
+                self.sync_errors += 1
+                self.last_error = str(e)
+                logger.error(f"Lesson replica sync failed, serving last synced data: {e}")
+                return False
+
+    def _run(self) -> None:
+        self.sync()
+        while not self._stop.wait(self.sync_seconds):
+            self.sync()
+
+    def start(self) -> None:
+        """Sync now and every `sync_seconds` after in a daemon thread; reads stay remote until the first sync."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="lesson-replica-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connection()
+        return {
+            "ready": self.ready,
+            "lessons": conn.execute("SELECT COUNT(*) FROM lesson").fetchone()[0],
+            "steps": conn.execute("SELECT COUNT(*) FROM step").fetchone()[0],
+            "watermark": self._meta("watermark"),
+            "syncs": self.syncs,
+            "full_refreshes": self.full_refreshes,
+            "sync_errors": self.sync_errors,
+            "last_sync_at": self.last_sync_at,
+            "last_error": self.last_error,
+        }
+
+
+def create_lesson_replica(source: DatabaseContextProvider = db_context) -> Optional[LessonReplica]:
+    """
+    Build and attach the replica if LESSON_REPLICA_PATH is set; otherwise return None and
+    leave every read remote.
+    """
+    path = os.getenv("LESSON_REPLICA_PATH")
+    if not path:
+        return None
+    replica = LessonReplica(path, source)
+    source.attach_replica(replica)
+    return replica
@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from .database_context import DatabaseContextProvider, db_context
+from .lesson_cache import LessonCache, LessonSteps, lesson_cache
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One in-progress fetch of a lesson; followers wait on `done` and share its outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.steps: Optional[LessonSteps] = None
+        self.error: Optional[BaseException] = None
+
+
+class LessonRepository:
+    """
+    Read-through access to lesson steps used by every route and the learning agent.
+
+    Steps come from `cache` when present; otherwise they are loaded once from the
+    database and cached for the cache window. Concurrent misses for the same lesson
+    wait on a single in-flight fetch and share its result or error (single-flight), so
+    each lesson costs at most one remote fetch per window. Lessons with no steps are
+    cached for LESSON_NEGATIVE_TTL_SECONDS so unknown ids do not hit Supabase on every
+    frame; a failed fetch (Supabase unreachable) raises and is never cached.
+    """
+
+    def __init__(self, db: DatabaseContextProvider, cache: LessonCache, negative_ttl_seconds: Optional[float] = None):
+        self.db = db
+        self.cache = cache
+        self.negative_ttl_seconds = negative_ttl_seconds if negative_ttl_seconds is not None else float(os.getenv("LESSON_NEGATIVE_TTL_SECONDS", "30"))
+        self._lock = threading.Lock()
+        # { lesson_id: _Flight } for fetches currently in progress
+        self._in_flight: Dict[int, _Flight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.remote_fetches = 0
+        self.coalesced = 0
+        self.fetch_errors = 0
+
+    def get_steps(self, lesson_id: int) -> LessonSteps:
+        """
+        Get all steps for a lesson.
+
+        Args:
+            lesson_id (int): The lesson ID
+
+        Returns:
+            Dict[int, Dict[str, str]]: {step_order: {'name', 'description', 'finish_criteria'}}
+        """
+        steps = self.cache.get(lesson_id)
+        if steps is not None:
+            with self._lock:
+                self.hits += 1
+            return steps
+
+        with self._lock:
+            self.misses += 1
+            flight = self._in_flight.get(lesson_id)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[lesson_id] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.steps
+
+        try:
+            # A previous leader may have filled the cache between our miss and taking the flight
+            steps = self.cache.get(lesson_id)
+            if steps is None:
+                logger.info(f"Loading all lesson steps in batch for lesson {lesson_id}...")
+                with self._lock:
+                    self.remote_fetches += 1
+                steps = self.db.fetch_lesson_steps(lesson_id)
+                self.cache.put(lesson_id, steps, ttl_seconds=None if steps else self.negative_ttl_seconds)
+            flight.steps = steps
+            return steps
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.fetch_errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(lesson_id, None)
+            flight.done.set()
+
+    def get_step(self, lesson_id: int, step_order: int) -> Optional[Dict[str, str]]:
+        """Get a single step of a lesson, or None if it does not exist."""
+        return self.get_steps(lesson_id).get(step_order)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "remote_fetches": self.remote_fetches,
+                "coalesced": self.coalesced,
+                "fetch_errors": self.fetch_errors,
+                "in_flight": len(self._in_flight),
+            }
+
+
+# Global instance for easy import
+lesson_repository = LessonRepository(db_context, lesson_cache)
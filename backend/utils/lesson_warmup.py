@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .database_context import DatabaseContextProvider, db_context
+from .lesson_cache import LessonCache, LessonSteps, estimate_size, lesson_cache
+
+logger = logging.getLogger(__name__)
+
+
+class LessonWarmup:
+    """
+    Optional startup phase that preloads every lesson into the lesson cache.
+
+    On start, a snapshot left by a previous run (if any) is loaded into the cache right
+    away so a restarted worker can serve lessons immediately; the full set is then
+    refreshed from Supabase in the background with one paged `lesson?select=*,step(*)`
+    query and written back to the snapshot. `ready` turns true once that refresh has
+    finished (successfully or not; on failure lessons are still loaded lazily).
+
+    The cache's entry limit is raised to fit the warm-up set so preloading does not evict
+    the lessons it just loaded; a warning is logged when that happens, and when the set is
+    larger than LESSON_CACHE_MAX_BYTES (those lessons are still evicted and loaded lazily).
+
+    Configuration (environment): LESSON_WARMUP_ENABLED, LESSON_SNAPSHOT_PATH,
+    LESSON_WARMUP_PAGE_SIZE.
+    """
+
+    def __init__(self, db: DatabaseContextProvider, cache: LessonCache, snapshot_path: Optional[str] = None, page_size: Optional[int] = None):
+        self.db = db
+        self.cache = cache
+        self.enabled = os.getenv("LESSON_WARMUP_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.snapshot_path = snapshot_path if snapshot_path is not None else os.getenv("LESSON_SNAPSHOT_PATH", "lesson_snapshot.json")
+        self.page_size = page_size if page_size is not None else int(os.getenv("LESSON_WARMUP_PAGE_SIZE", "100"))
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.status = "not_started"
+        self.lessons_from_snapshot = 0
+        self.lessons_loaded = 0
+        self.duration_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def _load_snapshot(self) -> int:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable lesson snapshot {self.snapshot_path}: {e}")
+            return 0
+        # JSON object keys are strings; restore the int lesson ids and step orders
+        lessons = {int(lesson_id): {int(order): step for order, step in steps.items()} for lesson_id, steps in raw.get("lessons", {}).items()}
+        self._fill_cache(lessons)
+        return len(lessons)
+
+    def _fill_cache(self, lessons: Dict[int, LessonSteps]) -> None:
+        lessons = {lesson_id: steps for lesson_id, steps in lessons.items() if steps}
+        if self.cache.reserve(len(lessons)):
+            logger.warning(f"Lesson warm-up has {len(lessons)} lessons; raised the lesson cache size to fit them (set LESSON_CACHE_MAX_ENTRIES to silence this)")
+        total_bytes = sum(estimate_size(steps) for steps in lessons.values())
+        if total_bytes > self.cache.max_bytes:
+            logger.warning(f"Lesson warm-up set is {total_bytes} bytes, over the lesson cache's {self.cache.max_bytes}; some lessons will be evicted and loaded lazily (raise LESSON_CACHE_MAX_BYTES)")
+        for lesson_id, steps in lessons.items():
+            self.cache.put(lesson_id, steps)
+
+    def _write_snapshot(self, lessons: Dict[int, LessonSteps]) -> None:
+        if not self.snapshot_path:
+            return
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"written_at": time.time(), "lessons": lessons}, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def refresh(self) -> None:
+        """Load every lesson from the database into the cache and rewrite the snapshot."""
+        started = time.monotonic()
+        try:
+            lessons = self.db.get_all_lesson_steps(page_size=self.page_size)
+            self._fill_cache(lessons)
+            if lessons:
+                self._write_snapshot(lessons)
+            with self._lock:
+                self.lessons_loaded = len(lessons)
+                self.status = "warm"
+            logger.info(f"Lesson warm-up loaded {len(lessons)} lessons in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            logger.error(f"Lesson warm-up failed, falling back to lazy loading: {e}")
+            with self._lock:
+                self.error = str(e)
+                self.status = "failed"
+        finally:
+            with self._lock:
+                self.duration_seconds = round(time.monotonic() - started, 3)
+            self._done.set()
+
+    def start(self, background: bool = True) -> None:
+        """Serve from the snapshot immediately and refresh from the database (in a thread by default)."""
+        with self._lock:
+            if self._thread is not None or self._done.is_set():
+                return
+            if not self.enabled:
+                self.status = "disabled"
+                self._done.set()
+                return
+            self.lessons_from_snapshot = self._load_snapshot()
+            self.status = "serving_snapshot" if self.lessons_from_snapshot else "loading"
+            if background:
+                self._thread = threading.Thread(target=self.refresh, name="lesson-warmup", daemon=True)
+                self._thread.start()
+        if not background:
+            self.refresh()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self._done.is_set(),
+                "status": self.status,
+                "lessons_from_snapshot": self.lessons_from_snapshot,
+                "lessons_loaded": self.lessons_loaded,
+                "duration_seconds": self.duration_seconds,
+                "error": self.error,
+            }
+
+
+# Global instance for easy import; app.py starts it
+lesson_warmup = LessonWarmup(db_context, lesson_cache)
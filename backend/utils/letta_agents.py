@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_letta_client():
+    """
+    Shared Letta client, built on first use so importing the app needs neither the
+    letta_client package import nor network access.
+
+    Configuration (environment): LETTA_API_KEY, LETTA_BASE_URL (optional, e.g. a self-hosted server).
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from letta_client import Letta
+
+            kwargs = {"token": os.getenv("LETTA_API_KEY")}
+            if os.getenv("LETTA_BASE_URL"):
+                kwargs["base_url"] = os.getenv("LETTA_BASE_URL")
+            _client = Letta(**kwargs)
+        return _client
+
+
+def _agent_state_fields() -> Optional[Set[str]]:
+    """Field names of letta_client's AgentState, or None if the model is unavailable."""
+    try:
+        from letta_client import AgentState
+    except ImportError:
+        return None
+    fields = getattr(AgentState, "model_fields", None) or getattr(AgentState, "__fields__", None)
+    return set(fields) if fields else None
+
+
+def _with_context_window(llm_config, context_window: int):
+    """Copy of an agent's LlmConfig with a different context window."""
+    if hasattr(llm_config, "model_copy"):
+        return llm_config.model_copy(update={"context_window": context_window})
+    return llm_config.copy(update={"context_window": context_window})
+
+
+class LettaAgentHandle:
+    """
+    Lazily resolved Letta agent.
+
+    On first use the agent is found, in order, via:
+      1. an explicit id (`agent_id`, or the LETTA_AGENT_STATE_PATH file written by an earlier run);
+      2. an existing agent with the same name on the server;
+      3. creating it (and recording its id in LETTA_AGENT_STATE_PATH when set).
+
+    So worker boots and test runs no longer create a new orphan agent each time, and a
+    Letta outage surfaces as an unavailable agent instead of an import error.
+    """
+
+    def __init__(self, name: str, agent_id: Optional[str] = None, client_factory=get_letta_client, enforce: Optional[Dict[str, Any]] = None, **create_kwargs: Any):
+        self.name = name
+        self.configured_id = agent_id
+        # Settings the agent must have; applied on create and patched onto reused agents
+        self.enforce = enforce or {}
+        self.create_kwargs = create_kwargs
+        self._client_factory = client_factory
+        self._lock = threading.Lock()
+        self._agent = None
+        self._warming = False
+        self.source: Optional[str] = None
+        self.error: Optional[str] = None
+        self.resolved_in_seconds: Optional[float] = None
+
+    @property
+    def client(self):
+        return self._client_factory()
+
+    def _state_path(self) -> Optional[str]:
+        return os.getenv("LETTA_AGENT_STATE_PATH") or None
+
+    def _persisted_id(self) -> Optional[str]:
+        path = self._state_path()
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f).get(self.name)
+        except (OSError, ValueError):
+            return None
+
+    def _persist_id(self, agent_id: str) -> None:
+        path = self._state_path()
+        if not path:
+            return
+        state: Dict[str, str] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+        state[self.name] = agent_id
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def _enforce_settings(self, agent):
+        fields = _agent_state_fields()
+        stale = {}
+        for key, value in self.enforce.items():
+            if (key not in fields) if fields is not None else not hasattr(agent, key):
+                logger.warning(f"Not enforcing {key} on Letta agent {self.name}: not an AgentState field")
+            elif getattr(agent, key, None) != value:
+                stale[key] = value
+        # context_window_limit is only an agents.create argument; a reused agent keeps it in llm_config
+        limit = self.create_kwargs.get("context_window_limit")
+        llm_config = getattr(agent, "llm_config", None)
+        if limit and llm_config is not None and getattr(llm_config, "context_window", None) != limit:
+            stale["llm_config"] = _with_context_window(llm_config, limit)
+        if not stale:
+            return agent
+        logger.info(f"Updating Letta agent {self.name} settings: {sorted(stale)}")
+        return self.client.agents.modify(agent.id, **stale)
+
+    def _resolve(self):
+        return self._enforce_settings(self._find_or_create())
+
+    def _find_or_create(self):
+        agents = self.client.agents
+        known_id = self.configured_id or self._persisted_id()
+        if known_id:
+            try:
+                self.source = "configured_id"
+                return agents.retrieve(known_id)
+            except Exception as e:
+                logger.warning(f"Letta agent {known_id} ({self.name}) not found, looking up by name: {e}")
+        try:
+            existing = agents.list(name=self.name, limit=1)
+            if existing:
+                self.source = "lookup"
+                self._persist_id(existing[0].id)
+                return existing[0]
+        except Exception as e:
+            logger.warning(f"Could not look up Letta agent {self.name} by name: {e}")
+        agent = agents.create(name=self.name, **self.create_kwargs, **self.enforce)
+        self.source = "created"
+        self._persist_id(agent.id)
+        return agent
+
+    def get(self):
+        """Return the agent, resolving it on first call; raises if Letta is unavailable."""
+        if self._agent is not None:
+            return self._agent
+        with self._lock:
+            if self._agent is None:
+                started = time.monotonic()
+                try:
+                    self._agent = self._resolve()
+                    self.error = None
+                    logger.info(f"Letta agent {self.name} ready ({self.source}): {self._agent.id}")
+                except Exception as e:
+                    self.error = str(e)
+                    logger.error(f"Failed to initialize Letta agent {self.name}: {e}")
+                    raise
+                finally:
+                    self.resolved_in_seconds = round(time.monotonic() - started, 3)
+            return self._agent
+
+    @property
+    def id(self) -> str:
+        return self.get().id
+
+    def warm(self, background: bool = True) -> None:
+        """Resolve the agent ahead of the first request; failures are reported via `status`."""
+        with self._lock:
+            if self._agent is not None or self._warming:
+                return
+            self._warming = True
+
+        def run():
+            try:
+                self.get()
+            except Exception:
+                pass
+            finally:
+                self._warming = False
+
+        if background:
+            threading.Thread(target=run, name=f"letta-warm-{self.name}", daemon=True).start()
+        else:
+            run()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._agent = None
+            self.source = None
+
+    def status(self) -> Dict[str, Any]:
+        agent = self._agent
+        return {
+            "name": self.name,
+            "available": agent is not None,
+            "agent_id": agent.id if agent is not None else None,
+            "source": self.source,
+            "error": self.error,
+            "resolved_in_seconds": self.resolved_in_seconds,
+        }
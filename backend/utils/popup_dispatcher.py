@@ -0,0 +1,119 @@
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PopupEmitter(ABC):
+    """Interface for delivering a popup payload to connected clients."""
+
+    @abstractmethod
+    def emit(self, popup_data: Dict[str, Any]) -> bool:
+        ...
+
+
+class SocketIOPopupEmitter(PopupEmitter):
+    """Emits popups directly on a Flask-SocketIO server, in process."""
+
+    def __init__(self, socketio):
+        self.socketio = socketio
+
+    @classmethod
+    def from_message_queue(cls, url: str) -> "SocketIOPopupEmitter":
+        """
+        Write-only emitter for processes that do not serve Socket.IO themselves (other
+        workers, scripts); messages are relayed to clients by whichever server holds them.
+        """
+        from flask_socketio import SocketIO
+
+        return cls(SocketIO(message_queue=url))
+
+    def emit(self, popup_data: Dict[str, Any]) -> bool:
+        user_id = popup_data.get("user_id")
+        if user_id:
+            # Send to specific user room (joined via join_user_room)
+            self.socketio.emit('popup_message', popup_data, room=user_id)
+        else:
+            # Send to all connected clients
+            self.socketio.emit('popup_message', popup_data)
+        return True
+
+
+class HttpPopupEmitter(PopupEmitter):
+    """
+    Posts popups to the backend's /api/send-popup route.
+
+    Only used when no in-process emitter has been installed, e.g. when the learning agent
+    runs outside the Flask app.
+    """
+
+    def __init__(self, url: Optional[str] = None, timeout: float = 10):
+        self.url = url or os.getenv("POPUP_API_URL", "http://localhost:5000/api/send-popup")
+        self.timeout = timeout
+
+    def emit(self, popup_data: Dict[str, Any]) -> bool:
+        import requests
+
+        payload = {key: value for key, value in popup_data.items() if value is not None}
+        response = requests.post(self.url, json=payload, timeout=self.timeout)
+        if response.status_code == 200:
+            return True
+        logger.error(f"Failed to send popup via HTTP: {response.status_code}")
+        return False
+
+
+class PopupDispatcher:
+    """Builds popup payloads and hands them to the configured emitter."""
+
+    def __init__(self, emitter: Optional[PopupEmitter] = None):
+        self._lock = threading.Lock()
+        self._emitter = emitter or self._default_emitter()
+
+    @staticmethod
+    def _default_emitter() -> PopupEmitter:
+        queue_url = os.getenv("SOCKETIO_MESSAGE_QUEUE")
+        if queue_url:
+            return SocketIOPopupEmitter.from_message_queue(queue_url)
+        return HttpPopupEmitter()
+
+    def set_emitter(self, emitter: PopupEmitter) -> None:
+        with self._lock:
+            self._emitter = emitter
+
+    @property
+    def emitter(self) -> PopupEmitter:
+        with self._lock:
+            return self._emitter
+
+    def send(self, message: str, user_id: Optional[str] = None, popup_type: str = "popup", timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Deliver a popup message.
+
+        Args:
+            message (str): Popup message text
+            user_id (str): Optional user ID for targeted messaging; broadcast if omitted
+            popup_type (str): Popup type understood by the overlay
+            timestamp (str): Optional ISO timestamp; defaults to now
+
+        Returns:
+            dict: The popup payload, with a `delivered` flag
+        """
+        popup_data = {
+            "message": message,
+            "type": popup_type,
+            "timestamp": timestamp or datetime.now().isoformat(),
+            "user_id": user_id,
+        }
+        delivered = self.emitter.emit(popup_data)
+        if delivered:
+            target = f"user {user_id}" if user_id else "all clients"
+            logger.info(f"Popup sent to {target}: {message[:50]}...")
+        return {**popup_data, "delivered": delivered}
+
+
+# Global instance for easy import; app.py installs the in-process Socket.IO emitter
+popup_dispatcher = PopupDispatcher()
@@ -0,0 +1,277 @@
+import glob
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .database_context import DatabaseContextProvider, db_context, progress_row
+from .session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+# Progress record shape: a user_progress row (see database_context.progress_row)
+# { 'user_id', 'lesson_id', 'step_order', 'completed', 'updated_at' }
+ProgressRecord = Dict[str, Any]
+
+
+def _process_alive(pid: int) -> bool:
+    """Whether a process with this pid is running (journals of dead workers are adopted)."""
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        # PROCESS_QUERY_LIMITED_INFORMATION; STILL_ACTIVE exit code is 259
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ProgressWriter:
+    """
+    Write-behind persistence of user progress.
+
+    `record` is called on every step advance and costs one append to a local journal
+    (JSON lines). Records are coalesced per user in memory and flushed to Supabase as one
+    bulk upsert once `flush_max_records` users are pending or every
+    `flush_interval_seconds`, so the screenshot path never waits on a database write.
+    A flushed journal is rotated away; on restart `replay` rebuilds session state
+    from whatever was not yet flushed and queues it again.
+
+    Each process journals to its own file (PROGRESS_JOURNAL_PATH with the pid added, e.g.
+    progress_journal.1234.jsonl), so one worker's rotation never touches records another
+    worker is still appending. `replay` also adopts the journals of workers that are no
+    longer running.
+
+    Configuration (environment): PROGRESS_WRITER_ENABLED, PROGRESS_JOURNAL_PATH,
+    PROGRESS_FLUSH_MAX_RECORDS, PROGRESS_FLUSH_INTERVAL_SECONDS, PROGRESS_JOURNAL_FSYNC.
+    """
+
+    def __init__(self, db: DatabaseContextProvider, journal_path: Optional[str] = None, flush_max_records: Optional[int] = None, flush_interval_seconds: Optional[float] = None, enabled: Optional[bool] = None):
+        self.db = db
+        self.enabled = enabled if enabled is not None else os.getenv("PROGRESS_WRITER_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.journal_base = journal_path or os.getenv("PROGRESS_JOURNAL_PATH", "progress_journal.jsonl")
+        root, ext = os.path.splitext(self.journal_base)
+        self.journal_path = f"{root}.{os.getpid()}{ext}"
+        self.flush_max_records = flush_max_records if flush_max_records is not None else int(os.getenv("PROGRESS_FLUSH_MAX_RECORDS", "100"))
+        self.flush_interval_seconds = flush_interval_seconds if flush_interval_seconds is not None else float(os.getenv("PROGRESS_FLUSH_INTERVAL_SECONDS", "5"))
+        self.fsync = os.getenv("PROGRESS_JOURNAL_FSYNC", "false").lower() in ("1", "true", "yes")
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._journal = None
+        # { user_id: latest record not yet flushed }
+        self._pending: Dict[str, ProgressRecord] = {}
+        self.recorded = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        # Called with the user ids whose progress just changed (recorded or persisted)
+        self._change_listeners: List[Callable[[List[str]], None]] = []
+
+    def add_change_listener(self, listener: Callable[[List[str]], None]) -> None:
+        self._change_listeners.append(listener)
+
+    def _notify(self, user_ids: List[str]) -> None:
+        for listener in self._change_listeners:
+            listener(user_ids)
+
+    @property
+    def _flushing_path(self) -> str:
+        return f"{self.journal_path}.flushing"
+
+    def _append(self, record: ProgressRecord) -> None:
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write(json.dumps(record) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def record(self, user_id: str, lesson_id: int, step_order: Optional[int], completed: bool = False) -> None:
+        """
+        Queue the user's current position (or lesson completion) for persistence.
+
+        Args:
+            user_id (str): User whose progress changed
+            lesson_id (int): Lesson the user is on
+            step_order (int): Step the user is now on (the last step when `completed`)
+            completed (bool): True when the user finished the lesson
+        """
+        self._notify([user_id])
+        if not self.enabled:
+            return
+        record = progress_row(user_id, lesson_id, step_order, completed)
+        with self._lock:
+            self._append(record)
+            self._pending[user_id] = record
+            self.recorded += 1
+            full = len(self._pending) >= self.flush_max_records
+        if full:
+            self._wake.set()
+
+    def flush(self) -> bool:
+        """
+        Upsert every pending record in one request.
+
+        Returns:
+            bool: True if nothing was pending or the upsert succeeded; on failure the
+                  records stay queued (and journaled) for the next attempt
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return True
+                batch = self._pending
+                self._pending = {}
+                # Rotate the journal: the rotated file covers exactly `batch` (and any earlier failed batch)
+                if self._journal is not None:
+                    self._journal.close()
+                    self._journal = None
+                if os.path.exists(self.journal_path):
+                    if os.path.exists(self._flushing_path):
+                        with open(self._flushing_path, "a", encoding="utf-8") as dst, open(self.journal_path, "r", encoding="utf-8") as src:
+                            dst.write(src.read())
+                        os.remove(self.journal_path)
+                    else:
+                        os.replace(self.journal_path, self._flushing_path)
+
+            rows: List[ProgressRecord] = list(batch.values())
+            if self.db.upsert_user_progress_batch(rows):
+                if os.path.exists(self._flushing_path):
+                    os.remove(self._flushing_path)
+                with self._lock:
+                    self.flushed += len(rows)
+                    self.flushes += 1
+                # The database now holds the new progress; drop anything derived from the old rows
+                self._notify(list(batch))
+                return True
+
+            with self._lock:
+                self.flush_errors += 1
+                # Newer records recorded during the attempt win over the failed batch
+                for user_id, record in batch.items():
+                    self._pending.setdefault(user_id, record)
+            return False
+
+    def _orphaned_journals(self) -> List[str]:
+        """Journals (and their .flushing files) left by processes that are no longer running."""
+        root, ext = os.path.splitext(self.journal_base)
+        owner = re.compile(re.escape(root) + r"(?:\.(\d+))?" + re.escape(ext) + r"(?:\.flushing)?$")
+        orphans = []
+        for path in sorted(glob.glob(f"{glob.escape(root)}*{ext}") + glob.glob(f"{glob.escape(root)}*{ext}.flushing")):
+            match = owner.match(path)
+            # Un-suffixed journals predate per-process journals and have no live owner
+            if match and path not in (self.journal_path, self._flushing_path) and not (match.group(1) and _process_alive(int(match.group(1)))):
+                orphans.append(path)
+        return orphans
+
+    def _adopt_orphans(self) -> None:
+        """Move orphaned journals into this process's .flushing file so the next flush covers them."""
+        for path in self._orphaned_journals():
+            claimed = f"{self.journal_path}.adopting"
+            try:
+                # Atomic claim: if another worker got there first the source is gone
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            with open(self._flushing_path, "a", encoding="utf-8") as dst, open(claimed, "r", encoding="utf-8") as src:
+                dst.write(src.read())
+            os.remove(claimed)
+            logger.info(f"Adopted progress journal {path}")
+
+    def _read_journal(self) -> Dict[str, ProgressRecord]:
+        latest: Dict[str, ProgressRecord] = {}
+        for path in (self._flushing_path, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-append
+                        continue
+                    # Adopted journals interleave; the newest record per user wins
+                    current = latest.get(record["user_id"])
+                    if current is None or record.get("updated_at", "") >= current.get("updated_at", ""):
+                        latest[record["user_id"]] = record
+        return latest
+
+    def replay(self, store: SessionStore) -> int:
+        """
+        Rebuild session state from unflushed journal records and queue them for flushing.
+
+        Returns:
+            int: Number of users restored
+        """
+        if not self.enabled:
+            return 0
+        with self._lock:
+            self._adopt_orphans()
+        latest = self._read_journal()
+        for user_id, record in latest.items():
+            if record.get("completed"):
+                store.delete(user_id)
+            else:
+                store.update(user_id, lesson_id=record["lesson_id"], step_order=record["step_order"], popup_sent_for_step=False)
+        with self._lock:
+            for user_id, record in latest.items():
+                self._pending.setdefault(user_id, record)
+        if latest:
+            logger.info(f"Replayed progress for {len(latest)} users from {self.journal_path}")
+        return len(latest)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def start(self, store: SessionStore) -> None:
+        """Replay the journal into `store` and start the background flusher."""
+        if not self.enabled or self._thread is not None:
+            return
+        self.replay(store)
+        self._thread = threading.Thread(target=self._run, name="progress-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher and make a final flush attempt."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval_seconds + 5)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "pending": len(self._pending),
+                "recorded": self.recorded,
+                "flushed": self.flushed,
+                "flushes": self.flushes,
+                "flush_errors": self.flush_errors,
+            }
+
+
+# Global instance for easy import; app.py starts it
+progress_writer = ProgressWriter(db_context)
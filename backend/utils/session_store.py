@@ -0,0 +1,319 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+# Session state shape: { 'lesson_id': int, 'step_order': int, 'popup_sent_for_step': bool }
+SessionState = Dict[str, Any]
+
+
+class SessionStore(ABC):
+    """
+    Per-user learning session state shared by every request thread (and, for the SQLite
+    and Redis backends, every worker process).
+
+    Progression goes through the atomic `claim_popup` and `compare_and_advance`
+    operations, so concurrent frames for the same user cannot send a popup twice or
+    move a step forward/backward based on a stale read.
+    """
+
+    @abstractmethod
+    def get(self, user_id: str) -> Optional[SessionState]:
+        """Return a copy of the user's state, or None if they have no session."""
+        ...
+
+    @abstractmethod
+    def update(self, user_id: str, **fields: Any) -> SessionState:
+        """
+        Merge `fields` into the user's state, creating it if needed, and return the result.
+        New sessions start with popup_sent_for_step=False unless given.
+        """
+        ...
+
+    @abstractmethod
+    def delete(self, user_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def claim_popup(self, user_id: str, lesson_id: int, step_order: int) -> bool:
+        """
+        Atomically mark the popup for (lesson_id, step_order) as sent.
+
+        Returns:
+            bool: True if the caller should send the popup; False if it was already sent
+                  or the user is no longer on that step
+        """
+        ...
+
+    @abstractmethod
+    def compare_and_advance(self, user_id: str, lesson_id: int, from_step: int, to_step: int) -> bool:
+        """
+        Atomically move the user from `from_step` to `to_step` (resetting the popup flag),
+        only if they are still on `lesson_id`/`from_step`.
+
+        Returns:
+            bool: True if this call advanced the user
+        """
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+def _new_state(fields: Dict[str, Any]) -> SessionState:
+    state = {"lesson_id": None, "step_order": None, "popup_sent_for_step": False}
+    state.update(fields)
+    return state
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store, sharded by user id so unrelated users do not contend on one lock."""
+
+    def __init__(self, shards: int = 16):
+        self._shards: List[Dict[str, SessionState]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def _shard(self, user_id: str):
+        index = zlib.crc32(str(user_id).encode("utf-8")) % len(self._shards)
+        return self._shards[index], self._locks[index]
+
+    def get(self, user_id: str) -> Optional[SessionState]:
+        shard, lock = self._shard(user_id)
+        with lock:
+            state = shard.get(user_id)
+            return dict(state) if state is not None else None
+
+    def update(self, user_id: str, **fields: Any) -> SessionState:
+        shard, lock = self._shard(user_id)
+        with lock:
+            state = shard.get(user_id)
+            if state is None:
+                state = shard[user_id] = _new_state(fields)
+            else:
+                state.update(fields)
+            return dict(state)
+
+    def delete(self, user_id: str) -> None:
+        shard, lock = self._shard(user_id)
+        with lock:
+            shard.pop(user_id, None)
+
+    def claim_popup(self, user_id: str, lesson_id: int, step_order: int) -> bool:
+        shard, lock = self._shard(user_id)
+        with lock:
+            state = shard.get(user_id)
+            if not state or state["lesson_id"] != lesson_id or state["step_order"] != step_order or state["popup_sent_for_step"]:
+                return False
+            state["popup_sent_for_step"] = True
+            return True
+
+    def compare_and_advance(self, user_id: str, lesson_id: int, from_step: int, to_step: int) -> bool:
+        shard, lock = self._shard(user_id)
+        with lock:
+            state = shard.get(user_id)
+            if not state or state["lesson_id"] != lesson_id or state["step_order"] != from_step:
+                return False
+            state["step_order"] = to_step
+            state["popup_sent_for_step"] = False
+            return True
+
+    def clear(self) -> None:
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.clear()
+
+
+class SQLiteSessionStore(SessionStore):
+    """Durable store backed by a local SQLite file; safe across worker processes on one host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS session_state (
+                    user_id TEXT PRIMARY KEY,
+                    lesson_id INTEGER,
+                    step_order INTEGER,
+                    popup_sent_for_step INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_state(row) -> SessionState:
+        return {"lesson_id": row[0], "step_order": row[1], "popup_sent_for_step": bool(row[2])}
+
+    def get(self, user_id: str) -> Optional[SessionState]:
+        row = self._connection().execute(
+            "SELECT lesson_id, step_order, popup_sent_for_step FROM session_state WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
+        return self._row_to_state(row) if row else None
+
+    def update(self, user_id: str, **fields: Any) -> SessionState:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = self.get(user_id)
+            state = _new_state(fields) if current is None else {**current, **fields}
+            conn.execute(
+                """
+                INSERT INTO session_state (user_id, lesson_id, step_order, popup_sent_for_step, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    lesson_id = excluded.lesson_id,
+                    step_order = excluded.step_order,
+                    popup_sent_for_step = excluded.popup_sent_for_step,
+                    updated_at = excluded.updated_at
+                """,
+                (user_id, state["lesson_id"], state["step_order"], int(bool(state["popup_sent_for_step"])), time.time()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return state
+
+    def delete(self, user_id: str) -> None:
+        self._connection().execute("DELETE FROM session_state WHERE user_id = ?", (user_id,))
+
+    def claim_popup(self, user_id: str, lesson_id: int, step_order: int) -> bool:
+        cursor = self._connection().execute(
+            """
+            UPDATE session_state SET popup_sent_for_step = 1, updated_at = ?
+            WHERE user_id = ? AND lesson_id = ? AND step_order = ? AND popup_sent_for_step = 0
+            """,
+            (time.time(), user_id, lesson_id, step_order),
+        )
+        return cursor.rowcount == 1
+
+    def compare_and_advance(self, user_id: str, lesson_id: int, from_step: int, to_step: int) -> bool:
+        cursor = self._connection().execute(
+            """
+            UPDATE session_state SET step_order = ?, popup_sent_for_step = 0, updated_at = ?
+            WHERE user_id = ? AND lesson_id = ? AND step_order = ?
+            """,
+            (to_step, time.time(), user_id, lesson_id, from_step),
+        )
+        return cursor.rowcount == 1
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM session_state")
+
+
+class RedisSessionStore(SessionStore):
+    """Store shared by every worker and host through a Redis-protocol server (one hash per user)."""
+
+    # KEYS[1] = session hash; ARGV = lesson_id, step_order
+    _CLAIM_POPUP = """
+        if redis.call('HGET', KEYS[1], 'lesson_id') == ARGV[1]
+           and redis.call('HGET', KEYS[1], 'step_order') == ARGV[2]
+           and redis.call('HGET', KEYS[1], 'popup_sent_for_step') == '0' then
+            redis.call('HSET', KEYS[1], 'popup_sent_for_step', '1')
+            return 1
+        end
+        return 0
+    """
+    # KEYS[1] = session hash; ARGV = lesson_id, from_step, to_step
+    _COMPARE_AND_ADVANCE = """
+        if redis.call('HGET', KEYS[1], 'lesson_id') == ARGV[1]
+           and redis.call('HGET', KEYS[1], 'step_order') == ARGV[2] then
+            redis.call('HSET', KEYS[1], 'step_order', ARGV[3], 'popup_sent_for_step', '0')
+            return 1
+        end
+        return 0
+    """
+
+    def __init__(self, url: Optional[str] = None, prefix: str = "session:", ttl_seconds: Optional[int] = None, client=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+        self._claim_popup = self.client.register_script(self._CLAIM_POPUP)
+        self._compare_and_advance = self.client.register_script(self._COMPARE_AND_ADVANCE)
+
+    def _key(self, user_id: str) -> str:
+        return f"{self.prefix}{user_id}"
+
+    @staticmethod
+    def _decode(raw: Dict[str, str]) -> SessionState:
+        def as_int(value):
+            return int(value) if value not in (None, "") else None
+
+        return {
+            "lesson_id": as_int(raw.get("lesson_id")),
+            "step_order": as_int(raw.get("step_order")),
+            "popup_sent_for_step": raw.get("popup_sent_for_step") == "1",
+        }
+
+    @staticmethod
+    def _encode(fields: Dict[str, Any]) -> Dict[str, str]:
+        encoded = {}
+        for key, value in fields.items():
+            if key == "popup_sent_for_step":
+                encoded[key] = "1" if value else "0"
+            else:
+                encoded[key] = "" if value is None else str(value)
+        return encoded
+
+    def get(self, user_id: str) -> Optional[SessionState]:
+        raw = self.client.hgetall(self._key(user_id))
+        return self._decode(raw) if raw else None
+
+    def update(self, user_id: str, **fields: Any) -> SessionState:
+        key = self._key(user_id)
+        with self.client.pipeline() as pipe:
+            pipe.hsetnx(key, "popup_sent_for_step", "0")
+            if fields:
+                pipe.hset(key, mapping=self._encode(fields))
+            pipe.expire(key, self.ttl_seconds)
+            pipe.hgetall(key)
+            raw = pipe.execute()[-1]
+        return self._decode(raw)
+
+    def delete(self, user_id: str) -> None:
+        self.client.delete(self._key(user_id))
+
+    def claim_popup(self, user_id: str, lesson_id: int, step_order: int) -> bool:
+        return bool(self._claim_popup(keys=[self._key(user_id)], args=[lesson_id, step_order]))
+
+    def compare_and_advance(self, user_id: str, lesson_id: int, from_step: int, to_step: int) -> bool:
+        return bool(self._compare_and_advance(keys=[self._key(user_id)], args=[lesson_id, from_step, to_step]))
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+def create_session_store() -> SessionStore:
+    """
+    Build the store selected by SESSION_STORE ("memory", "sqlite" or "redis").
+
+    SQLite uses SESSION_STORE_PATH (default "session_state.db"); Redis uses
+    SESSION_STORE_URL (default "redis://localhost:6379/0").
+    """
+    backend = os.getenv("SESSION_STORE", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_STORE_PATH", "session_state.db"))
+    if backend == "redis":
+        return RedisSessionStore(os.getenv("SESSION_STORE_URL", "redis://localhost:6379/0"))
+    return InMemorySessionStore()
@@ -0,0 +1,119 @@
+import base64
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+
+def normalize_criteria(finish_criteria: Optional[str]) -> str:
+    """Collapse whitespace and case so cosmetically different criteria share entries."""
+    return " ".join((finish_criteria or "").split()).lower()
+
+
+def image_digest(base64_image: Union[str, bytes]) -> str:
+    """
+    Digest of the decoded image bytes, so the same frame hashes the same regardless of
+    data URL prefixes, base64 line wrapping, or whether it arrived as raw bytes.
+    """
+    if isinstance(base64_image, (bytes, bytearray)):
+        return hashlib.sha256(base64_image).hexdigest()
+    data = base64_image or ""
+    if data.startswith("data:"):
+        data = data.split(",", 1)[-1]
+    try:
+        raw = base64.b64decode(data)
+    except Exception:
+        raw = data.encode("utf-8", errors="ignore")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class VerdictCache:
+    """
+    Bounded LRU + TTL cache of completion verdicts keyed by (image digest, finish criteria).
+
+    Entries expire after `ttl_seconds` and the least recently used ones are evicted once
+    either `max_entries` or `max_bytes` is exceeded.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "4096"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("VERDICT_CACHE_TTL_SECONDS", "300"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("VERDICT_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+        self._lock = threading.Lock()
+        # { key: (expires_at, verdict, size_bytes) }
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(base64_image: Union[str, bytes], finish_criteria: Optional[str]) -> Tuple[str, str]:
+        return image_digest(base64_image), normalize_criteria(finish_criteria)
+
+    @staticmethod
+    def _entry_size(key: Tuple[str, str], verdict: str) -> int:
+        return sys.getsizeof(key[0]) + sys.getsizeof(key[1]) + sys.getsizeof(verdict)
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        """Return the cached verdict for `key`, or None on a miss or expired entry."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, verdict, size = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._bytes -= size
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return verdict
+
+    def put(self, key: Tuple[str, str], verdict: str) -> None:
+        """Store a verdict; only definitive YES/NO answers are cached."""
+        if str(verdict).strip().upper() not in ("YES", "NO"):
+            return
+        size = self._entry_size(key, verdict)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, verdict, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Global instance for easy import
+verdict_cache = VerdictCache()
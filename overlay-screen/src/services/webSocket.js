@@ -2,6 +2,8 @@ import { io } from "socket.io-client";
 
 let socket = null;
 let listener = null;
+let verdictListener = null;
+let resumeFramesAt = 0;
 
 function deriveBaseUrl(inputUrl) {
   try {
@@ -46,9 +48,44 @@ export function connectWebSocket(url) {
     }
   });
 
+  // Verdicts for frames sent over the socket (and async HTTP jobs)
+  socket.on("screenshot_verdict", (data) => {
+    if (typeof verdictListener === "function") {
+      try {
+        verdictListener(data);
+      } catch (_e) {
+      }
+    }
+  });
+
+  // Server-side flow control: hold off sending frames for the requested time
+  socket.on("slow_down", (data) => {
+    resumeFramesAt = Date.now() + (data?.retry_after_ms || 1000);
+  });
+
   return socket;
 }
 
+// Send a screenshot as binary over the existing socket instead of an HTTP POST.
+// `image` is an ArrayBuffer/Uint8Array; returns false if the server asked us to slow down.
+export function sendScreenshotFrame(image, metadata = {}) {
+  if (!socket || !socket.connected || Date.now() < resumeFramesAt) {
+    return false;
+  }
+  socket.emit("screenshot_frame", { image, ...metadata });
+  return true;
+}
+
+export function subscribeVerdicts(callback) {
+  if (typeof callback === "function") {
+    verdictListener = callback;
+    return () => {
+      if (verdictListener === callback) verdictListener = null;
+    };
+  }
+  return () => {};
+}
+
 export function subscribeWebSocket(callback) {
   if (typeof callback === "function") {
     listener = callback;
@@ -69,10 +106,14 @@ export function disconnectWebSocket() {
     socket = null;
   }
   listener = null;
+  verdictListener = null;
+  resumeFramesAt = 0;
 }
 
 export default {
   connectWebSocket,
   subscribeWebSocket,
+  subscribeVerdicts,
+  sendScreenshotFrame,
   disconnectWebSocket,
 };